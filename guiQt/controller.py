@@ -34,13 +34,13 @@ from PyQt5.QtWidgets import QMessageBox
 
 from . import model, view, thread
 import hdrCore.image, hdrCore.processing, hdrCore.utils
-import hdrCore.coreC
+import hdrCore.coreC, hdrCore.executor, hdrCore.batch, hdrCore.cache, hdrCore.lazy, hdrCore.profiling
+from hdrCore import trace
 import preferences.preferences as pref
 
 # zj add for semi-auto curve 
-import torch
-from hdrCore.net import Net
-from torch.autograd import Variable
+# heavy dependencies (torch, through hdrCore.net) are imported on first use of auto tone curve (see hdrCore.lazy)
+net = hdrCore.lazy.module('hdrCore.net')
 
 # -----------------------------------------------------------------------------
 # --- package methods ---------------------------------------------------------
@@ -108,7 +108,7 @@ class ImageGalleryController():
     """ image gallery controller """
 
     def __init__(self, parent):
-        if pref.verbose: print(" [CONTROL] >> ImageGalleryController.__init__()")
+        trace.debug('CONTROL', "ImageGalleryController.__init__()")
 
         self.parent = parent    # AppView
         self.view = view.ImageGalleryView(self)
@@ -190,31 +190,40 @@ class ImageGalleryController():
             self.view.repaint()
 
     def selectImage(self, id):
-        if pref.verbose: print(" [CONTROL] >> ImageGalleryController.selectImage()")
+        trace.debug('CONTROL', "ImageGalleryController.selectImage()")
 
         nbImagePage = GalleryMode.nbRow(self.view.shapeMode)*GalleryMode.nbCol(self.view.shapeMode)
         idxImage = self.view.pageNumber*nbImagePage+id
         # check id
         if (idxImage < len(self.model.processPipes)):
-            # update selected image
-            processPipe = self.model.processPipes[idxImage]
-            if processPipe:
-                if self.parent.dock.setProcessPipe(processPipe):
-                    self.model.setSelectedImage(idxImage)
+            # editing process-pipe: resident or built in background from gallery thumbnail (shown meanwhile)
+            pp = self.model.requestProcessPipe(idxImage, self.endSelectImage)
+            if isinstance(pp, model.ThumbnailProcessPipe):
+                self.parent.statusBar().showMessage("preparing image for editing: "+pp.filename)
+                if self.parent.dock.view.active == 0: self.parent.dock.view.childControllers[0].view.imageWidgetController.setImage(pp.getImage())
+
+    def endSelectImage(self, idxImage, processPipe):
+        """called (GUI thread) when the editing process-pipe of a selected image is available: only the last selection is set."""
+        trace.debug('CONTROL', "ImageGalleryController.endSelectImage(",idxImage,")")
+
+        if (idxImage != self.model.pendingSelection) or (processPipe == None): return
+        if self.parent.dock.setProcessPipe(processPipe):
+            self.model.setSelectedImage(idxImage)
+            self.parent.statusBar().clearMessage()
 
     def getSelectedProcessPipe(self):
-        if pref.verbose:  print(" [CONTROL] >> ImageGalleryController.getSelectedProcessPipe()")
+        trace.debug('CONTROL', "ImageGalleryController.getSelectedProcessPipe()")
         return self.model.getSelectedProcessPipe()
 
     def setProcessPipeWidgetQPixmap(self, qPixmap):
         idxProcessPipe = self.model.selectedImage()
         nbImagePage = GalleryMode.nbRow(self.view.shapeMode)*GalleryMode.nbCol(self.view.shapeMode)
         idxImageWidget = idxProcessPipe%nbImagePage
-        if pref.verbose:  print(" >> ImageGalleryController.setProcessPipeWidgetQPixmap(...)[ image id:",idxProcessPipe,">> image widget controller:",idxImageWidget,"]")
+        trace.debug('CONTROL', "ImageGalleryController.setProcessPipeWidgetQPixmap(...)[ image id:",idxProcessPipe,">> image widget controller:",idxImageWidget,"]")
         self.view.imagesControllers[idxImageWidget].setQPixmap(qPixmap)
 
     def save(self):
-        if pref.verbose: print(" [CONTROL] >> ImageGalleryController.save()")
+        trace.debug('CONTROL', "ImageGalleryController.save()")
         self.model.save()
 
     def currentPage(self): return self.view.currentPage()
@@ -252,13 +261,20 @@ class AppController(object):
             callBackEndExportHDR(self, img)
             callBackExportAllHDR(self)            
             callBackEndAllExportHDR(self, img)  
+            callBackAutoToneCurveAll(self)
+            callBackEndAutoToneCurveAll(self, autoTone)
+            callBackShowFrameProfile(self, on)
+            showFrameProfile(self, frame)
+            callBackExportProfile(self)
+            callBackResetProfile(self)
 
     """
 
     def __init__(self, app):
-        if pref.verbose: print(" [CONTROL] >> AppController.__init__()")
+        trace.debug('CONTROL', "AppController.__init__()")
 
         self.screenSize = getScreenSize(app)# get screens size
+        thread.guiInvoker()# created in GUI thread: computing threads update widgets through it
 
         # attributes
         self.hdrDisplay = HDRviewerController(self)
@@ -274,7 +290,7 @@ class AppController(object):
     def callBackSelectDir(self):
         """Callback of export HDR menu: open file dialog, store image filenames (self.imagesName), set directory to model
         """
-        if pref.verbose: print(" [CONTROL] >> AppController.callBackSelectDir()")
+        trace.debug('CONTROL', "AppController.callBackSelectDir()")
         dirName = QFileDialog.getExistingDirectory(None, 'Select Directory', self.model.directory)
         if dirName != "":
             # save current images (metadata)
@@ -288,14 +304,15 @@ class AppController(object):
     def callBackSave(self): self.view.imageGalleryController.save()
     # -----------------------------------------------------------------------------
     def callBackQuit(self):
-        if pref.verbose: print(" [CB] >> AppController.callBackQuit()")
+        trace.debug('CB', "AppController.callBackQuit()")
         self.view.imageGalleryController.save()
         self.hdrDisplay.close()
+        hdrCore.executor.tileExecutor().close()
         sys.exit()
     # -----------------------------------------------------------------------------
     def callBackDisplayHDR(self):
 
-        if pref.verbose:  print(" [CONTROL] >> AppController.callBackDisplayHDR()")
+        trace.debug('CONTROL', "AppController.callBackDisplayHDR()")
 
         selectedProcessPipe = self.view.imageGalleryController.model.getSelectedProcessPipe()
 
@@ -303,45 +320,31 @@ class AppController(object):
             self.view.statusBar().showMessage('displaying HDR image, full size image computation: start, please wait !')
             self.view.statusBar().repaint()
             # save current processpipe metada
-            originalImage = copy.deepcopy(selectedProcessPipe.originalImage)
-            originalImage.metadata.metadata['processpipe'] = selectedProcessPipe.toDict()
+            originalImage = selectedProcessPipe.originalImage
+            selectedProcessPipe.updateProcessPipeMetadata()
             originalImage.metadata.save()
 
-            # load full size image
-            img = hdrCore.image.Image.read(originalImage.path+'/'+originalImage.name)
+            # structural copy of selectedProcessPipe (no image copy)
+            processpipe = selectedProcessPipe.clone()
 
-            # turn off: autoResize
-            hdrCore.processing.ProcessPipe.autoResize = False 
-            # make a copy of selectedProcessPipe  
-            processpipe = copy.deepcopy(selectedProcessPipe)
-
-            # set size to display size
+            # full size image resized to display size: read in thread (or render daemon)
             size = pref.getDisplayShape()
-            img = img.process(hdrCore.processing.resize(),size=(None, size[1]))
-
-            # set image to process-pipe
-            processpipe.setImage(img)
-
-            thread.cCompute(self.callBackEndDisplay, processpipe, toneMap=False, progress=self.view.statusBar().showMessage)
+            thread.cCompute(self.callBackEndDisplay, processpipe, toneMap=False, progress=self.view.statusBar().showMessage,
+                            filename=originalImage.path+'/'+originalImage.name, size=size[1], target=pref.getHDRdisplay(),
+                            context=hdrCore.processing.RenderContext.full())
     # -----------------------------------------------------------------------------
     def callBackEndDisplay(self, img):
 
-        if pref.verbose:  print(" [CONTROL] >> AppController.callBackEndDisplay()")
+        trace.debug('CONTROL', "AppController.callBackEndDisplay()")
 
-        # turn off: autoResize
-        hdrCore.processing.ProcessPipe.autoResize = True  
-        
         self.view.statusBar().showMessage('displaying HDR image, full size image computation: done !')
 
-        # clip, scale
-        img = img.process(hdrCore.processing.clip())
-        img.colorData = img.colorData*pref.getDisplayScaling()
-
+        # img: clipped and scaled to display (see thread.cCompute)
         colour.write_image(img.colorData,"temp.hdr", method='Imageio') # local copy for display
         self.hdrDisplay.displayFile("temp.hdr")
     # -----------------------------------------------------------------------------
     def callBackCloseDisplayHDR(self):
-        if pref.verbose: print(" [CONTROL] >> AppController.callBackCloseDisplayHDR()")
+        trace.debug('CONTROL', "AppController.callBackCloseDisplayHDR()")
         self.hdrDisplay.displaySplash()
     # -----------------------------------------------------------------------------
     def callBackCompareRawEditedHDR(self):
@@ -351,7 +354,7 @@ class AppController(object):
         Display side by side original image and edited version.        
         """
 
-        if pref.verbose:  print(" [CONTROL] >> AppController.callBackCompareOriginalInputHDR()")
+        trace.debug('CONTROL', "AppController.callBackCompareOriginalInputHDR()")
 
         # process real size image
         # get selected process pipe
@@ -360,7 +363,8 @@ class AppController(object):
         if selectedProcessPipe:         # check if a process pipe is selected
 
             # read original image
-            img = hdrCore.image.Image.read(selectedProcessPipe.originalImage.path+'/'+selectedProcessPipe.originalImage.name)
+            filename = selectedProcessPipe.originalImage.path+'/'+selectedProcessPipe.originalImage.name
+            img = hdrCore.image.Image.read(filename)
 
             # resize
             screenY, screenX = pref.getDisplayShape()
@@ -376,26 +380,29 @@ class AppController(object):
             # original image after resize
             ori = copy.deepcopy(img)
 
-            # build process pipe from selected one them compute
-            pp = hdrCore.processing.ProcessPipe()
-            hdrCore.processing.ProcessPipe.autoResize = False   # stop autoResize
-            params= []
-            for p in selectedProcessPipe.processNodes: 
-                pp.append(copy.deepcopy(p.process),paramDict=None, name=copy.deepcopy(p.name))
-                params.append({p.name:p.params})
-            img.metadata.metadata['processpipe'] = params
-            pp.setImage(img)
-
-            res = hdrCore.coreC.coreCcompute(img, pp)
-            res = res.process(hdrCore.processing.clip())
+            # edited image: render cache or build process pipe from selected one them compute
+            cache = hdrCore.cache.renderCache()
+            key = cache.key(filename, selectedProcessPipe.toDict(), imgXp, pref.getHDRdisplay()['tag'], geometry=False, backend='cpp', toneMap=False)
+            res = cache.get(key, filename)
+            if res == None:
+                pp = hdrCore.processing.ProcessPipe()
+                params= []
+                for p in selectedProcessPipe.processNodes: 
+                    pp.append(copy.deepcopy(p.process),paramDict=None, name=copy.deepcopy(p.name))
+                    params.append({p.name:p.params})
+                img.metadata.metadata['processpipe'] = params
+                pp.setImage(img, hdrCore.processing.RenderContext.full())
+
+                res = hdrCore.coreC.coreCcompute(img, pp)
+                res = res.process(hdrCore.processing.clip())
+                res.colorData = res.colorData*pref.getDisplayScaling()
+                cache.put(key, res)
             
             imgYres, imgXres, _ = res.colorData.shape
 
-            hdrCore.processing.ProcessPipe.autoResize = True    # return to autoResize
-
             # make comparison image
             oriColorData = ori.colorData*pref.getDisplayScaling()
-            resColorData = res.colorData*pref.getDisplayScaling()
+            resColorData = res.colorData
             display = np.ones((screenY,screenX,3))*0.2
             marginY = int((screenY - imgY)/2)
             marginYres = int((screenY - imgYres)/2)
@@ -414,7 +421,7 @@ class AppController(object):
         Export the image associated to selected process pipe
         """
 
-        if pref.verbose:  print(" [CONTROL] >> AppController.callBackExportHDR()") 
+        trace.debug('CONTROL', "AppController.callBackExportHDR()")
 
         selectedProcessPipe = self.view.imageGalleryController.model.getSelectedProcessPipe()
 
@@ -428,32 +435,22 @@ class AppController(object):
             self.view.statusBar().repaint()
 
             # save current processpipe metada
-            originalImage = copy.deepcopy(selectedProcessPipe.originalImage)
-            originalImage.metadata.metadata['processpipe'] = selectedProcessPipe.toDict()
+            originalImage = selectedProcessPipe.originalImage
+            selectedProcessPipe.updateProcessPipeMetadata()
             originalImage.metadata.save()
 
-            # load full size image
-            img = hdrCore.image.Image.read(originalImage.path+'/'+originalImage.name)
-
-            # turn off: autoResize
-            hdrCore.processing.ProcessPipe.autoResize = False 
-            # make a copy of selectedProcessPipe  
-            processpipe = copy.deepcopy(selectedProcessPipe)
-
-            # set image to process-pipe
-            processpipe.setImage(img)
+            # structural copy of selectedProcessPipe (no image copy)
+            processpipe = selectedProcessPipe.clone()
 
-            thread.cCompute(self.callBackEndExportHDR, processpipe, toneMap=False, progress=self.view.statusBar().showMessage)
+            # full size image: read in thread (or render daemon)
+            thread.cCompute(self.callBackEndExportHDR, processpipe, toneMap=False, progress=self.view.statusBar().showMessage,
+                            filename=originalImage.path+'/'+originalImage.name, target=pref.getHDRdisplay(),
+                            context=hdrCore.processing.RenderContext.full())
     # -----------------------------------------------------------------------------
     def callBackEndExportHDR(self, img):
-        # turn off: autoResize
-        hdrCore.processing.ProcessPipe.autoResize = True  
-        
         self.view.statusBar().showMessage('exporting HDR image ('+pref.getHDRdisplay()['tag']+'), full size image computation: done !')
 
-        # clip, scale
-        img = img.process(hdrCore.processing.clip())
-        img.colorData = img.colorData*pref.getDisplayScaling()
+        # img: clipped and scaled to display (see thread.cCompute)
 
         if self.dirName:
             pathExport = os.path.join(self.dirName, img.name[:-4]+pref.getHDRdisplay()['post']+'.hdr')
@@ -467,90 +464,142 @@ class AppController(object):
             self.hdrDisplay.displayFile("temp.hdr")
     # -----------------------------------------------------------------------------
     def callBackExportAllHDR(self):
-        if pref.verbose:  print(" [CONTROL] >> AppController.callBackExportAllHDR()")
+        trace.debug('CONTROL', "AppController.callBackExportAllHDR()")
 
-        self.processPipes = self.view.imageGalleryController.getProcessPipes()
+        gallery = self.view.imageGalleryController.model
 
         # select dir where to save export
         self.dirName = QFileDialog.getExistingDirectory(None, 'Select Directory where to export HDR file', self.model.directory)
-        self.view.statusBar().showMessage('exporting '+str(len(self.processPipes))+' HDR images ... please wait')
-        self.view.statusBar().repaint()
-        self.imageToExport = len(self.processPipes) ; self.imageExportDone = 0
+        if (not self.dirName) or (len(gallery.imageFilenames) == 0): return
 
-        if (len(self.processPipes) > 0):
-            pp = self.processPipes[0]
+        # save current processpipe metada
+        gallery.save()
 
-            # save current processpipe metada
-            originalImage = copy.deepcopy(pp.originalImage)
-            originalImage.metadata.metadata['processpipe'] = pp.toDict()
-            originalImage.metadata.save()
-
-            # load full size image
-            img = hdrCore.image.Image.read(originalImage.path+'/'+originalImage.name)
-
-            # turn off: autoResize
-            hdrCore.processing.ProcessPipe.autoResize = False 
-            # make a copy of selectedProcessPipe  
-            processpipe = copy.deepcopy(pp)
+        # one job per image: parameters of loaded images, sidecar parameters (or default) of others
+        jobs = []
+        for i, filename in enumerate(gallery.imageFilenames):
+            pp = gallery.processPipes[i]
+            if pp != None:  processPipeDict, useSidecar = pp.toDict(), False
+            else:           processPipeDict, useSidecar = model.EditImageModel.buildProcessPipe().toDict(), True
+            jobs.append(hdrCore.batch.ExportJob(filename, processPipeDict, self.dirName, pref.getHDRdisplay(), useSidecar=useSidecar))
 
-            # set image to process-pipe
-            processpipe.setImage(img)
+        self.view.statusBar().showMessage('exporting '+str(len(jobs))+' HDR images ... please wait')
+        self.view.statusBar().repaint()
 
-            thread.cCompute(self.callBackEndAllExportHDR, processpipe, toneMap=False, progress=self.view.statusBar().showMessage)            
+        self.batchExport = thread.RequestBatchExport(self.callBackEndAllExportHDR, jobs, progress=self.view.statusBar().showMessage)
     # -----------------------------------------------------------------------------
-    def callBackEndAllExportHDR(self, img):
-        # last image ?
-        self.imageExportDone +=1
-
-        self.view.statusBar().showMessage('exporting HDR images ('+pref.getHDRdisplay()['tag']+'):'+str(int(100*self.imageExportDone/self.imageToExport))+'% done !')
-
-        # clip, scale
-        img = img.process(hdrCore.processing.clip())
-        img.colorData = img.colorData*pref.getDisplayScaling()
-
-        if self.dirName:
-            pathExport = os.path.join(self.dirName, img.name[:-4]+pref.getHDRdisplay()['post']+'.hdr')
-            img.type = hdrCore.image.imageType.HDR
-            img.metadata.metadata['processpipe'] = None
-            img.metadata.metadata['display'] = pref.getHDRdisplay()['tag']
+    def callBackEndAllExportHDR(self, report):
+        trace.debug('CONTROL', "AppController.callBackEndAllExportHDR(",report,")")
 
-            img.write(pathExport)
-
-        if self.imageExportDone == self.imageToExport :
-            # turn off: autoResize
-            hdrCore.processing.ProcessPipe.autoResize = True
-        else:
-            pp = self.processPipes[self.imageExportDone]
-
-            if not pp:
-                img = hdrCore.image.Image.read(self.imagesName[self.imageExportDone], thumb=True)
-                pp = model.EditImageModel.buildProcessPipe()
-                pp.setImage(img)                      
-
-
-            # save current processpipe metada
-            originalImage = copy.deepcopy(pp.originalImage)
-            originalImage.metadata.metadata['processpipe'] = pp.toDict()
-            originalImage.metadata.save()
-
-            # load full size image
-            img = hdrCore.image.Image.read(originalImage.path+'/'+originalImage.name)
+        message = 'exporting HDR images ('+pref.getHDRdisplay()['tag']+'): '+str(report['done'])+'/'+str(report['jobs'])+' done'
+        if report['failed'] > 0: message += ', '+str(report['failed'])+' failed: '+', '.join(map(os.path.basename, report['failures'].keys()))
+        message += ' ('+'{:.1f}'.format(report['time'])+'s, '+str(report['workers'])+' workers)'
+        self.view.statusBar().showMessage(message)
+    # -----------------------------------------------------------------------------
+    def callBackAutoToneCurveAll(self):
+        """Callback of auto tone curve menu: predicts tone curves of all images of the gallery in a single inference
+            (see hdrCore.batch.BatchAutoToneCurve). Histograms of computed process-pipes are read from their statistics,
+            other ones are computed from thumbnails in background.
+        """
+        trace.debug('CONTROL', "AppController.callBackAutoToneCurveAll()")
+
+        gallery = self.view.imageGalleryController.model
+        if len(gallery.imageFilenames) == 0: return
+
+        # parameters of loaded images (None: sidecar parameters), histograms of computed process-pipes
+        processPipeDicts, histograms = [], []
+        with gallery.lock:
+            for pp in gallery.processPipes:
+                histogram = None
+                if isinstance(pp, hdrCore.processing.ProcessPipe):
+                    node = pp.processNodes[pp.getProcessNodeByName("tonecurve")-1]
+                    if (not node.requireUpdate) and node.outputImage:
+                        histogram = node.statistics().histogram(hdrCore.batch.BatchAutoToneCurve.nbBins, space='stored', subsample=False)[0]
+                processPipeDicts.append(pp.toDict() if pp != None else None)
+                histograms.append(histogram)
+
+        autoTone = hdrCore.batch.BatchAutoToneCurve(gallery.imageFilenames, processPipeDicts, histograms)
+        self.view.statusBar().showMessage('auto tone curve of '+str(len(gallery.imageFilenames))+' images ... please wait')
+        self.view.statusBar().repaint()
 
-            # turn off: autoResize
-            hdrCore.processing.ProcessPipe.autoResize = False 
-            # make a copy of selectedProcessPipe  
-            processpipe = copy.deepcopy(pp)
+        # callback and progress are called in GUI thread (see guiQt.thread.RequestBatchAutoToneCurve)
+        self.autoToneCurve = thread.RequestBatchAutoToneCurve(self.callBackEndAutoToneCurveAll, autoTone, progress=self.view.statusBar().showMessage)
+    # -----------------------------------------------------------------------------
+    def callBackEndAutoToneCurveAll(self, autoTone):
+        """set predicted tone curves (called in GUI thread): the edited process-pipe gets its tone curve as the tone curve
+            widget does (computed by RequestCompute), parameters of other images are written in their sidecar (with the
+            current parameters of resident process-pipes) then their thumbnails are rendered again.
+        """
+        trace.debug('CONTROL', "AppController.callBackEndAutoToneCurveAll(",autoTone.report,")")
+
+        gallery = self.view.imageGalleryController.model
+        if gallery.imageFilenames != autoTone.filenames: return # directory changed
+
+        editController = self.view.dock.view.childControllers[0]
+        for i, processPipeDict in enumerate(autoTone.results()):
+            if processPipeDict is None: continue
+            toneCurve = copy.deepcopy(autoTone.toneCurves[i])
+            pp = gallery.processPipes[i]
+            if isinstance(pp, hdrCore.processing.ProcessPipe) and (pp is editController.model.processpipe):
+                # edited image: widgets then latest-wins computation (the process-pipe is not modified here)
+                editController.view.tonecurve.setValues(toneCurve, callBackActive=True)
+                editController.changeToneCurve(toneCurve)
+                continue
+            with gallery.lock:
+                pp = gallery.processPipes[i]
+                if isinstance(pp, hdrCore.processing.ProcessPipe):
+                    # resident process-pipe: current parameters (edits done meanwhile) with predicted tone curve
+                    processPipeDict = pp.toDict()
+                    for pMeta in processPipeDict:
+                        if "tonecurve" in pMeta: pMeta["tonecurve"] = toneCurve
+                    gallery.lru.pop(i, None)
+                hdrCore.batch.writeSidecar(autoTone.filenames[i], processPipeDict)
+                if pp != None: gallery.processPipes[i] = None # rendered again with new parameters
+        gallery.loadPage(self.view.imageGalleryController.currentPage())
+
+        report = autoTone.report()
+        message = 'auto tone curve: '+str(report['done'])+'/'+str(report['images'])+' images'
+        if report['failed'] > 0: message += ', '+str(report['failed'])+' failed: '+', '.join(map(os.path.basename, report['failures'].keys()))
+        message += ' (histograms: '+'{:.1f}'.format(report['histograms'])+'s, inference: '+'{:.3f}'.format(report['inference'])+'s)'
+        self.view.statusBar().showMessage(message)
+    # -----------------------------------------------------------------------------
+    def callBackShowFrameProfile(self, on):
+        """Callback of profiling menu: status bar shows breakdown of last computation (frame, see hdrCore.profiling)."""
+        trace.debug('CONTROL', "AppController.callBackShowFrameProfile(",on,")")
 
-            # set image to process-pipe
-            processpipe.setImage(img)
+        if on:  hdrCore.profiling.profiler().addListener(self.showFrameProfile)
+        else:   hdrCore.profiling.profiler().removeListener(self.showFrameProfile)
+    # -----------------------------------------------------------------------------
+    def showFrameProfile(self, frame):
+        """profiler listener (called from computing thread): frame breakdown is shown in status bar by GUI thread."""
+        message = hdrCore.profiling.Profiler.breakdown(frame)
+        thread.invokeInGui(lambda: self.view.statusBar().showMessage(message))
+    # -----------------------------------------------------------------------------
+    def callBackExportProfile(self):
+        """Callback of profiling menu: save recorded events as Chrome trace JSON file and summary table (.txt file)."""
+        trace.debug('CONTROL', "AppController.callBackExportProfile()")
+
+        filename, _ = QFileDialog.getSaveFileName(None, 'Export profile (Chrome trace)', os.path.join(self.model.directory, 'uHDR.trace.json'), 'Chrome trace (*.json)')
+        if not filename: return
+
+        profiler = hdrCore.profiling.profiler()
+        profiler.chromeTrace(filename)
+        table = profiler.table()
+        with open(os.path.splitext(filename)[0]+'.txt', 'w') as f: f.write(table+'\n')
+        trace.info('PROFILING', "computation profile:\n"+table)
+        self.view.statusBar().showMessage('profile exported: '+filename+' ('+str(len(profiler.events))+' events)')
+    # -----------------------------------------------------------------------------
+    def callBackResetProfile(self):
+        trace.debug('CONTROL', "AppController.callBackResetProfile()")
 
-            thread.cCompute(self.callBackEndAllExportHDR, processpipe, toneMap=False, progress=self.view.statusBar().showMessage)            
+        hdrCore.profiling.profiler().reset()
+        self.view.statusBar().showMessage('profile reset')
 # ------------------------------------------------------------------------------------------
 # --- class MultiDockController() ----------------------------------------------------------
 # ------------------------------------------------------------------------------------------
 class MultiDockController():
     def __init__(self,parent=None, HDRcontroller = None):
-        if pref.verbose: print(" [CONTROL] >> MultiDockController.__init__()")
+        trace.debug('CONTROL', "MultiDockController.__init__()")
 
         self.parent = parent
         self.view = view.MultiDockView(self, HDRcontroller)
@@ -561,11 +610,11 @@ class MultiDockController():
     def activateMIAM(self):  self.switch(2)
     # ---------------------------------------------------------------------------------------
     def switch(self,nb):
-        if pref.verbose:  print(" [CONTROL] >> MultiDockController.switch()")
+        trace.debug('CONTROL', "MultiDockController.switch()")
         self.view.switch(nb)
     # --------------------------------------------------------------------------------------
     def setProcessPipe(self, processPipe): 
-        if pref.verbose: print(" [CONTROL] >> MultiDockController.setProcessPipe(",processPipe.getImage().name,")")
+        trace.debug('CONTROL', "MultiDockController.setProcessPipe(",lambda: processPipe.getImage().name,")")
 
         return self.view.setProcessPipe(processPipe)
 # ------------------------------------------------------------------------------------------
@@ -574,7 +623,7 @@ class MultiDockController():
 class EditImageController:
 
     def __init__(self, parent=None, HDRcontroller = None):
-        if pref.verbose: print(" [CONTROL] >> EditImageController.__init__(",")")
+        trace.debug('CONTROL', "EditImageController.__init__(",")")
 
         self.parent = parent
 
@@ -585,7 +634,7 @@ class EditImageController:
         self.model = model.EditImageModel(self)
     # -----------------------------------------------------------------------------
     def setProcessPipe(self, processPipe): 
-        if pref.verbose: print(" [CONTROL] >> EditImageController.setProcessPipe(",")")
+        trace.debug('CONTROL', "EditImageController.setProcessPipe(",")")
 
         if self.model.setProcessPipe(processPipe):
 
@@ -605,14 +654,14 @@ class EditImageController:
     def getProcessPipe(self) : return self.model.getProcessPipe()
     # -----------------------------------------------------------------------------
     def buildView(self,processPipe=None):
-        if pref.verbose: print(" [CONTROL] >> EditImageController.buildView(",")")
+        trace.debug('CONTROL', "EditImageController.buildView(",")")
 
         """ called when MultiDockController recall a controller/view """
         self.view = view.EditImageView(self, build=True)
         if processPipe: self.setProcessPipe(processPipe)
     # -----------------------------------------------------------------------------
     def autoExposure(self): 
-        if pref.verbose: print(" [CONTROL] >> EditImageController.autoExposure(",")")
+        trace.debug('CONTROL', "EditImageController.autoExposure(",")")
         if self.model.processpipe:
       
             img = self.model.autoExposure()
@@ -625,31 +674,31 @@ class EditImageController:
             self.parent.controller.parent.controller.view.imageGalleryController.setProcessPipeWidgetQPixmap(qPixmap)
     # -----------------------------------------------------------------------------
     def changeExposure(self,value):
-        if pref.verbose: print(" [CONTROL] >> EditImageController.changeExposure(",value,")")
+        trace.debug('CONTROL', "EditImageController.changeExposure(",value,")")
         if self.model.processpipe: self.model.changeExposure(value)
     # -----------------------------------------------------------------------------
     def changeContrast(self,value):
-        if pref.verbose: print(" [CONTROL] >> EditImageController.changeContrast(",value,")")
+        trace.debug('CONTROL', "EditImageController.changeContrast(",value,")")
         if self.model.processpipe: self.model.changeContrast(value)
     # -----------------------------------------------------------------------------
     def changeToneCurve(self,controlPoints):
-        if pref.verbose: print(" [CONTROL] >> EditImageController.changeToneCurve("")")
+        trace.debug('CONTROL', "EditImageController.changeToneCurve("")")
         if self.model.processpipe: self.model.changeToneCurve(controlPoints)
     # -----------------------------------------------------------------------------
     def changeLightnessMask(self, maskValues):
-        if pref.verbose: print(" [CONTROL] >> EditImageController.changeLightnessMask(",maskValues,")")
+        trace.debug('CONTROL', "EditImageController.changeLightnessMask(",maskValues,")")
         if self.model.processpipe: self.model.changeLightnessMask(maskValues)
     # -----------------------------------------------------------------------------
     def changeSaturation(self,value):
-        if pref.verbose: print(" [CONTROL] >> EditImageController.changeSaturation(",value,")")
+        trace.debug('CONTROL', "EditImageController.changeSaturation(",value,")")
         if self.model.processpipe: self.model.changeSaturation(value)
     # -----------------------------------------------------------------------------
     def changeColorEditor(self,values, idName):
-        if pref.verbose: print(" [CONTROL] >> EditImageController.changeColorEditor(",values,")")
+        trace.debug('CONTROL', "EditImageController.changeColorEditor(",values,")")
         if self.model.processpipe: self.model.changeColorEditor(values, idName)
     # -----------------------------------------------------------------------------
     def changeGeometry(self,values):
-        if pref.verbose: print(" [CONTROL] >> EditImageController.changeGeometry(",values,")")
+        trace.debug('CONTROL', "EditImageController.changeGeometry(",values,")")
         if self.model.processpipe: self.model.changeGeometry(values)
     # -----------------------------------------------------------------------------
     def updateImage(self,imgTM):
@@ -674,7 +723,7 @@ class EditImageController:
 class ImageInfoController:
 
     def __init__(self, parent=None):
-        if pref.verbose: print(" [CONTROL] >> ImageInfoController.__init__()")
+        trace.debug('CONTROL', "ImageInfoController.__init__()")
 
         self.parent = parent
         self.view = view.ImageInfoView(self)
@@ -683,27 +732,27 @@ class ImageInfoController:
         self.callBackActive = True
     # -----------------------------------------------------------------------------
     def setProcessPipe(self, processPipe): 
-        if pref.verbose: print(" [CONTROL] >> ImageInfoController.setProcessPipe(",processPipe.getImage().name,")")
+        trace.debug('CONTROL', "ImageInfoController.setProcessPipe(",lambda: processPipe.getImage().name,")")
         self.model.setProcessPipe(processPipe)
         self.view.setProcessPipe(processPipe)
         return True
     # -----------------------------------------------------------------------------
     def buildView(self,processPipe=None):
-        if pref.verbose: print(" [CONTROL] >> ImageInfoController.buildView()")
+        trace.debug('CONTROL', "ImageInfoController.buildView()")
 
         """ called when MultiDockController recall a controller/view """
         self.view = view.ImageInfoView(self)
         if processPipe: self.setProcessPipe(processPipe)
     # -----------------------------------------------------------------------------
     def metadataChange(self,metaGroup,metaTag, on_off): 
-        if pref.verbose: print(" [CONTROL] >> ImageInfoController.useCaseChange(",metaGroup,",", metaTag,",", on_off,")")
+        trace.debug('CONTROL', "ImageInfoController.useCaseChange(",metaGroup,",", metaTag,",", on_off,")")
         self.model.changeMeta(metaGroup,metaTag, on_off)
 # ------------------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------------------
 class AdvanceSliderController():
     def __init__(self, parent,name, defaultValue, range, step,callBackValueChange=None,callBackAutoPush= None):
-        if pref.verbose: print(" [CONTROL] >> AdvanceSliderController.__init__(",") ")
+        trace.debug('CONTROL', "AdvanceSliderController.__init__(",") ")
         self.parent = parent
 
         self.view = view.AdvanceSliderView(self,  name, defaultValue, range, step)
@@ -721,14 +770,14 @@ class AdvanceSliderController():
 
         value = self.view.slider.value()*self.step
 
-        if pref.verbose: print(" [CB] >> AdvanceSliderController.sliderChange(",value,")[callBackActive:",self.callBackActive,"] ")
+        trace.debug('CB', "AdvanceSliderController.sliderChange(",value,")[callBackActive:",self.callBackActive,"] ")
 
         self.model.value = value
         self.view.editValue.setText(str(value))
         if self.callBackActive and self.callBackValueChange: self.callBackValueChange(value)
     # -----------------------------------------------------------------------------
     def setValue(self, value, callBackActive = True):
-        if pref.verbose: print(" [CONTROL] >> AdvanceSliderController.setValue(",value,") ")
+        trace.debug('CONTROL', "AdvanceSliderController.setValue(",value,") ")
 
         """ set value value in 'model' range"""
         self.callBackActive = callBackActive
@@ -739,13 +788,13 @@ class AdvanceSliderController():
         self.callBackActive = True
     # -----------------------------------------------------------------------------
     def reset(self):
-        if pref.verbose : print(" [CB] >> AdvanceSliderController.reset(",") ")
+        trace.debug('CB', "AdvanceSliderController.reset(",") ")
 
         self.setValue(self.defaultValue,callBackActive = False)
         if self.callBackValueChange: self.callBackValueChange(self.defaultValue)
     # -----------------------------------------------------------------------------
     def auto(self):
-        if pref.verbose: print(" [CB] >> AdvanceSliderController.auto(",") ")
+        trace.debug('CB', "AdvanceSliderController.auto(",") ")
 
         if self.callBackAutoPush: self.callBackAutoPush()
 # ------------------------------------------------------------------------------------------
@@ -768,10 +817,9 @@ class ToneCurveController():
         # zj add semi-auto curve
         # machine learning network and weight file 
         self.weightFile = 'MSESig505_0419.pth'
-        self.networkModel = None  
     # -----------------------------------------------------------------------------
     def sliderChange(self, key, value):
-        if pref.verbose: print(" [CB] >> ToneCurveController.sliderChange(",key,",",value,")[callBackActive:",self.callBackActive,"] ")
+        trace.debug('CB', "ToneCurveController.sliderChange(",key,",",value,")[callBackActive:",self.callBackActive,"] ")
 
         if self.callBackActive:
             newValues = self.model.setValue(key, value, autoScale = False)
@@ -799,7 +847,7 @@ class ToneCurveController():
             self.callBackActive =  True
     # -----------------------------------------------------------------------------
     def setValues(self, valuesDict,callBackActive = False):
-        if pref.verbose: print(" [CONTROL] >> ToneCurveController.setValue(",valuesDict,") ")
+        trace.debug('CONTROL', "ToneCurveController.setValue(",valuesDict,") ")
 
         self.callBackActive = callBackActive
 
@@ -828,30 +876,11 @@ class ToneCurveController():
         processPipe = self.parent.controller.model.getProcessPipe()
         if processPipe != None :
             idExposure = processPipe.getProcessNodeByName("tonecurve")
-            bins = np.linspace(0,1,50+1)
-
-            imageBeforeColorData = processPipe.processNodes[idExposure-1].outputImage.colorData
-            imageBeforeColorData[imageBeforeColorData>1]=1
-            imageBeforeY = colour.sRGB_to_XYZ(imageBeforeColorData, apply_cctf_decoding=False)[:,:,1]
-            nphistBefore  = np.histogram(imageBeforeY, bins)[0]
-            nphistBefore  = nphistBefore/np.amax(nphistBefore)
+            # histogram shared with plotCurve (computed once per node version)
+            nphistBefore  = processPipe.processNodes[idExposure-1].statistics().histogram(50, space='stored', subsample=False)[0]
 
-            npImgHistCumuNorm = np.empty_like(nphistBefore)
-            npImgHistCumu = np.cumsum(nphistBefore)
-            npImgHistCumuNorm = npImgHistCumu/np.max(npImgHistCumu)
-            
-            #predict keypoint value
-            if self.networkModel == None:
-                self.networkModel = Net(50,5)
-                self.networkModel.load_state_dict(torch.load(self.weightFile))
-                self.networkModel.eval()
-
-            with torch.no_grad():
-                x = Variable(torch.FloatTensor([npImgHistCumuNorm.tolist(),]), requires_grad=True)
-                y_predict = self.networkModel(x)
-
-            kpc = (y_predict[0]*100).tolist() 
-            kpcDict = {'start':[0.0,0.0], 'shadows': [10.0,kpc[0]], 'blacks': [30.0,kpc[1]], 'mediums': [50.0,kpc[2]], 'whites': [70.0,kpc[3]], 'highlights': [90.0,kpc[4]], 'end': [100.0,100.0]}
+            #predict keypoint value (network loaded and traced once per process, usually by warm-up phase, see hdrCore.net.autoCurveNet)
+            kpcDict = net.predictToneCurves([nphistBefore], self.weightFile)[0]
             self.setValues(kpcDict,callBackActive = True)
             self.parent.controller.changeToneCurve(kpcDict) 
      
@@ -859,7 +888,7 @@ class ToneCurveController():
 
     # -----------------------------------------------------------------------------
     def reset(self, key):
-        if pref.verbose: print(" [CONTROL] >> ToneCurveController.reset(",key,") ")
+        trace.debug('CONTROL', "ToneCurveController.reset(",key,") ")
 
         valuesDefault = copy.deepcopy(self.model.default[key])[1]
         controls = self.model.setValue(key, valuesDefault)
@@ -880,39 +909,16 @@ class ToneCurveController():
 
             bins = np.linspace(0,1,50+1)
 
-            if self.showInput:
-                imageInput = copy.deepcopy(processPipe.getInputImage())
-                if imageInput.linear: imageInputColorData =colour.cctf_encoding(imageInput.colorData, function='sRGB')
-                else: imageInputColorData = imageInput.colorData
-                imageInputColorData[imageInputColorData>1]=1
-                imageInputY = colour.sRGB_to_XYZ(imageInputColorData, apply_cctf_decoding=False)[:,:,1]
-                nphistInput  = np.histogram(imageInputY, bins)[0]
-                nphistInput  = nphistInput/np.amax(nphistInput)
-                self.view.curve.plot(bins[:-1]*100,nphistInput*100,'k--',  clear=False)
-
-            if self.showbefore:
-                imageBeforeColorData = processPipe.processNodes[idExposure-1].outputImage.colorData
-                imageBeforeColorData[imageBeforeColorData>1]=1
-                imageBeforeY = colour.sRGB_to_XYZ(imageBeforeColorData, apply_cctf_decoding=False)[:,:,1]
-                nphistBefore  = np.histogram(imageBeforeY, bins)[0]
-                nphistBefore  = nphistBefore/np.amax(nphistBefore)
-                self.view.curve.plot(bins[:-1]*100,nphistBefore*100,'b--',  clear=False)
-
-            if self.showAfter:
-                imageAftercolorData = processPipe.processNodes[idExposure].outputImage.colorData
-                imageAftercolorData[imageAftercolorData>1]=1
-                imageAfterY  = colour.sRGB_to_XYZ(imageAftercolorData,  apply_cctf_decoding=False)[:,:,1]
-                nphistAfter   = np.histogram(imageAfterY, bins)[0]
-                nphistAfter   =nphistAfter/np.amax(nphistAfter)
-                self.view.curve.plot(bins[:-1]*100,nphistAfter*100,'b',     clear=False)
-
-            if self.showOutput:
-                imageAftercolorData = processPipe.getImage(toneMap=True).colorData
-                imageAftercolorData[imageAftercolorData>1]=1
-                imageAfterY  = colour.sRGB_to_XYZ(imageAftercolorData,  apply_cctf_decoding=False)[:,:,1]
-                nphistAfter   = np.histogram(imageAfterY, bins)[0]
-                nphistAfter   =nphistAfter/np.amax(nphistAfter)
-                self.view.curve.plot(bins[:-1]*100,nphistAfter*100,'b',     clear=False)
+            # luminance histograms (clamped to 1) from shared statistics (hdrCore.statistics)
+            def plotHistogram(img, space, style):
+                nphist = img.statistics().histogram(50, space=space, subsample=False)[0]
+                nphist = nphist/np.amax(nphist)
+                self.view.curve.plot(bins[:-1]*100,nphist*100,style, clear=False)
+
+            if self.showInput:  plotHistogram(processPipe.getInputImage(), 'display', 'k--')
+            if self.showbefore: plotHistogram(processPipe.processNodes[idExposure-1].outputImage, 'stored', 'b--')
+            if self.showAfter:  plotHistogram(processPipe.processNodes[idExposure].outputImage, 'stored', 'b')
+            if self.showOutput: plotHistogram(processPipe.getImage(toneMap=True), 'stored', 'b')
 
             controlPointCoordinates= np.asarray(list(self.model.control.values()))
             self.view.curve.plot(controlPointCoordinates[1:-1,0],controlPointCoordinates[1:-1,1],'ro', clear=False)
@@ -927,7 +933,7 @@ class ToneCurveController():
 # ------------------------------------------------------------------------------------------
 class LightnessMaskController():
     def __init__(self, parent):
-        if pref.verbose: print(" [CONTROL] >> MaskLightnessController.__init__(",")")
+        trace.debug('CONTROL', "MaskLightnessController.__init__(",")")
 
         self.parent= parent
         self.model = model.LightnessMaskModel(self)
@@ -936,13 +942,13 @@ class LightnessMaskController():
         self.callBackActive = True
     # -----------------------------------------------------------------------------
     def maskChange(self,key, on_off):
-        if pref.verbose: print(" [CB] >> MaskLightnessController.maskChange(",key,",",on_off,")[callBackActive:",self.callBackActive,"] ")
+        trace.debug('CB', "MaskLightnessController.maskChange(",key,",",on_off,")[callBackActive:",self.callBackActive,"] ")
 
         maskState = self.model.maskChange(key, on_off)  
         self.parent.controller.changeLightnessMask(maskState) 
     # -----------------------------------------------------------------------------
     def setValues(self, values,callBackActive = False):
-        if pref.verbose: print(" [CONTROL] >> LightnessMaskController.setValue(",values,") ")
+        trace.debug('CONTROL', "LightnessMaskController.setValue(",values,") ")
 
         self.callBackActive = callBackActive
 
@@ -960,7 +966,7 @@ class LightnessMaskController():
 # ------------------------------------------------------------------------------------------
 class HDRviewerController():
     def __init__(self, parent):
-        if pref.verbose: print(" [CONTROL] >> HDRviewerController.__init__(",")")
+        trace.debug('CONTROL', "HDRviewerController.__init__(",")")
 
         self.parent= parent
         self.model = model.HDRviewerModel(self)
@@ -1078,7 +1084,7 @@ class HDRviewerController():
 # ------------------------------------------------------------------------------------------
 class LchColorSelectorController:
     def __init__(self, parent, idName = None):
-        if pref.verbose: print(" [CONTROL] >> LchColorSelectorController.__init__(",") ")
+        trace.debug('CONTROL', "LchColorSelectorController.__init__(",") ")
         self.parent = parent
         self.model =    model.LchColorSelectorModel(self)
         self.view =     view.LchColorSelectorView(self)
@@ -1120,7 +1126,7 @@ class LchColorSelectorController:
         if self.callBackActive : self.parent.controller.changeColorEditor(values, self.idName)
 
     def setValues(self, values, callBackActive = False):
-        if pref.verbose: print(" [CONTROL] >> LchColorSelectorController.setValue(",values,") ")
+        trace.debug('CONTROL', "LchColorSelectorController.setValue(",values,") ")
 
         self.callBackActive = callBackActive
         # slider hue selection
@@ -1168,7 +1174,7 @@ class LchColorSelectorController:
 
     # -----
     def resetSelection(self): 
-        if pref.verbose: print(" [CONTROL] >> LchColorSelectorController.resetSelection(",") ")
+        trace.debug('CONTROL', "LchColorSelectorController.resetSelection(",") ")
 
         default = copy.deepcopy(self.model.default)
         current = copy.deepcopy(self.model.getValues())
@@ -1179,7 +1185,7 @@ class LchColorSelectorController:
         self.callBackActive = True
 
     def resetEdit(self): 
-        if pref.verbose: print(" [CONTROL] >> LchColorSelectorController.resetEdit(",") ")
+        trace.debug('CONTROL', "LchColorSelectorController.resetEdit(",") ")
 
         default = copy.deepcopy(self.model.default)
         current = copy.deepcopy(self.model.getValues())
@@ -1193,7 +1199,7 @@ class LchColorSelectorController:
 # ------------------------------------------------------------------------------------------
 class GeometryController:
     def __init__(self, parent ):
-        if pref.verbose: print(" [CONTROL] >> GeometryController.__init__(",") ")
+        trace.debug('CONTROL', "GeometryController.__init__(",") ")
         self.parent = parent
         self.model =    model.GeometryModel(self)
         self.view =     view.GeometryView(self)
@@ -1209,7 +1215,7 @@ class GeometryController:
         if self.callBackActive : self.parent.controller.changeGeometry(values)
 
     def setValues(self, values, callBackActive = False):
-        if pref.verbose: print(" [CONTROL] >> GeometryController.setValue(",values,") ")
+        trace.debug('CONTROL', "GeometryController.setValue(",values,") ")
 
         up =        values['up']        if 'up' in values.keys()        else 0.0
         rotation =  values['rotation']  if 'rotation' in values.keys()  else 0.0
@@ -1227,26 +1233,32 @@ class GeometryController:
 # ------------------------------------------------------------------------------------------
 class ImageAestheticsController:
     def __init__(self, parent=None, HDRcontroller = None):
-        if pref.verbose: print(" [CONTROL] >> AestheticsImageController.__init__(",")")
+        trace.debug('CONTROL', "AestheticsImageController.__init__(",")")
 
         self.parent = parent
         self.model = model.ImageAestheticsModel(self)
         self.view = view.ImageAestheticsView(self)
     # --------------------------------------------------------------------------------------
     def buildView(self,processPipe=None):
-        if pref.verbose: print(" [CONTROL] >> AestheticsImageController.buildView()")
+        trace.debug('CONTROL', "AestheticsImageController.buildView()")
 
         # called when MultiDockController recall a controller/view 
         self.view = view.ImageAestheticsView(self)
         if processPipe: self.setProcessPipe(processPipe)
     # --------------------------------------------------------------------------------------
     def setProcessPipe(self, processPipe): 
-        if pref.verbose: print(" [CONTROL] >> AestheticsImageController.setProcessPipe()")
+        trace.debug('CONTROL', "AestheticsImageController.setProcessPipe()")
 
         self.model.setProcessPipe(processPipe)
         self.view.setProcessPipe(processPipe, self.model.getPaletteImage())
 
         return True
+    # --------------------------------------------------------------------------------------
+    def updatePalette(self):
+        """called when aesthetics models of current process-pipe are computed (background, see guiQt.thread.RequestAestheticsCompute)."""
+        trace.debug('CONTROL', "AestheticsImageController.updatePalette()")
+
+        self.view.paletteImageWidgetController.setImage(self.model.getPaletteImage())
 # ------------------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------------------
 # --- message widget functions -------------------------------------------------------------
@@ -1273,7 +1285,7 @@ def okCancelBox(title, text):
 # ------------------------------------------------------------------------------------------
 class  ColorEditorsAutoController:
     def __init__(self, parent, controlledColorEditors, stepName ):
-        if pref.verbose: print(" [CONTROL] >> ColorEditorsAutoController.__init__(",") ")
+        trace.debug('CONTROL', "ColorEditorsAutoController.__init__(",") ")
 
         self.parent = parent
         self.controlled = controlledColorEditors
@@ -1285,7 +1297,7 @@ class  ColorEditorsAutoController:
         self.callBackActive = True
     # callbacks
     def auto(self): 
-        if pref.verbose: print(" [CONTROL] >> ColorEditorsAutoController.auto(",") ")
+        trace.debug('CONTROL', "ColorEditorsAutoController.auto(",") ")
         for ce in self.controlled: ce.resetSelection(); ce.resetEdit()
         values = self.model.compute()
 
@@ -0,0 +1,152 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrGUI ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+package hdrGUI consists of the classes for GUI.
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import numpy as np
+from PyQt5.QtGui import QImage
+
+# -----------------------------------------------------------------------------
+# --- Class DisplayConverter --------------------------------------------------
+# -----------------------------------------------------------------------------
+class DisplayConverter(object):
+    """
+    conversion of float images ([0,1], display-encoded) to 8 bits QImage, one converter per widget:
+        - the image is sampled (nearest) to the widget size, not converted at working image size,
+        - quantization is done through a LUT (optionally including sRGB cctf encoding of linear images),
+        - all buffers (sampling, LUT indices, uint8 output) are kept between conversions: converting images of the same
+          size (preview updates while dragging a slider) does not allocate memory,
+        - the QImage wraps the uint8 buffer (no copy), it is valid until the next conversion,
+        - optional ordered dithering (hides banding of smooth gradients).
+
+    Class Attributes:
+        lutSize (int): number of LUT entries
+        dither (bool): default dithering
+
+    Attributes:
+        dither (bool): ordered dithering
+        encode (bool): input is linear, LUT applies sRGB cctf encoding
+        lut (numpy.ndarray): uint8 LUT
+        buffer (numpy.ndarray): uint8 output (height, width, 3)
+        qImage (PyQt5.QtGui.QImage): QImage wrapping buffer
+
+    Methods:
+        targetShape
+        convert
+    """
+
+    lutSize =   4096
+    dither =    False
+
+    __luts = {}
+
+    def __init__(self, dither=None, encode=False):
+        self.dither = DisplayConverter.dither if dither == None else dither
+        self.encode = encode
+        self.lut = DisplayConverter.buildLut(encode)
+
+        self.shape = None           # (source shape, target shape, source type) of buffers
+        self.rows, self.cols = None, None
+        self.sampledRows, self.sampled, self.index, self.buffer = None, None, None, None
+        self.noise = None
+        self.qImage = None
+
+    @staticmethod
+    def buildLut(encode=False):
+        """returns uint8 LUT (shared by converters): entry i is the 8 bits value of i/(lutSize-1).
+
+            Args:
+                encode (bool, Optionnal): LUT applies sRGB cctf encoding (linear input)
+
+            Returns:
+                (numpy.ndarray)
+        """
+        if encode not in DisplayConverter.__luts:
+            x = np.linspace(0.0, 1.0, DisplayConverter.lutSize)
+            if encode: x = np.where(x <= 0.0031308, 12.92*x, 1.055*np.power(x, 1/2.4) - 0.055)
+            DisplayConverter.__luts[encode] = np.uint8(np.round(np.clip(x, 0.0, 1.0)*255))
+        return DisplayConverter.__luts[encode]
+
+    @staticmethod
+    def targetShape(shape, size=None):
+        """returns (height, width) of image fitted into size (aspect ratio kept, never enlarged).
+
+            Args:
+                shape (tuple, Required): image shape
+                size (tuple, Optionnal): (width, height) of widget, None: image size
+
+            Returns:
+                (tuple): (height, width)
+        """
+        height, width = shape[0], shape[1]
+        if not size or size[0] <= 1 or size[1] <= 1: return (height, width)
+        factor = min(1.0, size[0]/width, size[1]/height)
+        return (max(1, int(height*factor)), max(1, int(width*factor)))
+
+    def allocate(self, srcShape, dstShape, dtype):
+        """(re)allocate buffers when source shape, target shape or source type change."""
+        height, width = dstShape
+        self.rows = np.intp(np.minimum((np.arange(height)+0.5)*srcShape[0]/height, srcShape[0]-1))
+        self.cols = np.intp(np.minimum((np.arange(width)+0.5)*srcShape[1]/width, srcShape[1]-1))
+        self.sampledRows = np.empty((height, srcShape[1], 3), dtype=dtype)
+        self.sampled = np.empty((height, width, 3), dtype=dtype)
+        self.index = np.empty((height, width, 3), dtype=np.int32)
+        self.buffer = np.empty((height, width, 3), dtype=np.uint8)
+        # ordered dithering: 4x4 Bayer matrix, amplitude one 8 bits step (in LUT index unit)
+        bayer = (np.array([[0,8,2,10],[12,4,14,6],[3,11,1,9],[15,7,13,5]], dtype=np.float32)+0.5)/16.0 - 0.5
+        step = (DisplayConverter.lutSize-1)/255.0
+        self.noise = np.tile(bayer*step, ((height+3)//4, (width+3)//4))[:height, :width, np.newaxis].astype(dtype)
+        self.shape = (srcShape, dstShape, dtype)
+
+    def convert(self, colorData, size=None):
+        """convert float image to QImage.
+
+            Args:
+                colorData (numpy.ndarray, Required): float image (height, width, 3) in [0,1], not modified
+                size (tuple, Optionnal): (width, height) of widget, None: image size
+
+            Returns:
+                (PyQt5.QtGui.QImage): wraps converter buffer, valid until next conversion
+        """
+        if colorData.dtype not in (np.float32, np.float64): colorData = np.float32(colorData)
+        dstShape = self.targetShape(colorData.shape, size)
+        if self.shape != (colorData.shape[:2], dstShape, colorData.dtype): self.allocate(colorData.shape[:2], dstShape, colorData.dtype)
+
+        # sampling to target size
+        np.take(colorData[:,:,:3], self.rows, axis=0, out=self.sampledRows)
+        np.take(self.sampledRows, self.cols, axis=1, out=self.sampled)
+
+        # quantization through LUT
+        top = DisplayConverter.lutSize-1
+        np.multiply(self.sampled, top, out=self.sampled)
+        if self.dither: np.add(self.sampled, self.noise, out=self.sampled)
+        np.add(self.sampled, 0.5, out=self.sampled)
+        np.clip(self.sampled, 0, top, out=self.sampled)
+        np.copyto(self.index, self.sampled, casting='unsafe')
+        np.take(self.lut, self.index, out=self.buffer)
+
+        height, width, _ = self.buffer.shape
+        self.qImage = QImage(self.buffer.data, width, height, 3*width, QImage.Format_RGB888)
+        return self.qImage
+# -----------------------------------------------------------------------------
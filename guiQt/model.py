@@ -26,8 +26,8 @@ package hdrGUI consists of the classes for GUI.
 # --- Import ------------------------------------------------------------------
 # -----------------------------------------------------------------------------
 
-import os, colour, copy, json, time, sklearn.cluster, math
-import pathos.multiprocessing, multiprocessing, functools
+import os, colour, copy, json, time, math, collections, threading
+import multiprocessing, functools
 import numpy as np
 from geomdl import BSpline
 from geomdl import utilities
@@ -36,7 +36,8 @@ from datetime import datetime
 
 import hdrCore.image, hdrCore.utils, hdrCore.aesthetics, hdrCore.image
 from . import controller, thread
-import hdrCore.processing, hdrCore.quality
+import hdrCore.processing, hdrCore.quality, hdrCore.coreC
+from hdrCore import trace
 import preferences.preferences as pref
 
 from PyQt5.QtCore import QRunnable
@@ -59,6 +60,105 @@ class ImageWidgetModel(object):
         elif isinstance(self.image, hdrCore.image.Image):
             return self.image.colorData
 # ------------------------------------------------------------------------------------------
+# --- class ThumbnailProcessPipe -----------------------------------------------------------
+# ------------------------------------------------------------------------------------------
+class ThumbnailProcessPipe(object):
+    """ ThumbnailProcessPipe: gallery image without resident process-pipe
+            only parameters and a small tone-mapped thumbnail are kept, the full editing process-pipe is built on demand
+            in a pool thread (see ImageGalleryModel.requestProcessPipe), i.e. when image is selected for editing. 
+            Created either by the gallery render path (render) or when a process-pipe is evicted (fromProcessPipe, see ImageGalleryModel.evict).
+
+        Class Attributes:
+            thumbnailSize (int): width of thumbnail of evicted process-pipe
+
+        Attributes:
+            filename (str): image filename
+            processPipeDict (list[dict]): process-pipe parameters (see hdrCore.processing.ProcessPipe.toDict)
+            thumbnail (hdrCore.image.Image): small tone-mapped image used by gallery
+
+        Methods:
+            getImage
+            toDict
+            residentBytes
+            width
+
+        Static methods:
+            render
+            fromProcessPipe
+    """
+    thumbnailSize = 256
+
+    def __init__(self, filename, processPipeDict, thumbnail):
+        self.filename = filename
+        self.processPipeDict = processPipeDict
+        self.thumbnail = thumbnail
+
+    def getImage(self, toneMap=True): return self.thumbnail
+
+    def toDict(self): return copy.deepcopy(self.processPipeDict)
+
+    def residentBytes(self): return self.thumbnail.colorData.nbytes
+
+    def width(self): return self.thumbnail.shape[1]
+
+    @staticmethod
+    def fromProcessPipe(filename, processPipe):
+        """keep parameters and a thumbnail of the output of processPipe.
+
+            Args:
+                filename (str, Required): image filename
+                processPipe (hdrCore.processing.ProcessPipe, Required): computed process-pipe
+
+            Returns:
+                (guiQt.model.ThumbnailProcessPipe)
+        """
+        img = processPipe.getImage()
+        height, width, _ = img.shape
+        if width > ThumbnailProcessPipe.thumbnailSize:
+            img = img.process(hdrCore.processing.resize(),size=(None, ThumbnailProcessPipe.thumbnailSize))
+        else:
+            img = copy.deepcopy(img)
+        img.colorData = np.float32(img.colorData)
+        return ThumbnailProcessPipe(filename, copy.deepcopy(processPipe.toDict()), img)
+
+    @staticmethod
+    def render(filename, width):
+        """gallery render path: applies the saved process-pipe parameters to the smallest thumbnail that fits width.
+            Uses the fused C++ engine (hdrCore.coreC) in a single pass when HDRip.dll is available, python process-nodes
+            otherwise: no process-node output is kept.
+
+            Args:
+                filename (str, Required): image filename
+                width (int, Required): width of gallery cell
+
+            Returns:
+                (guiQt.model.ThumbnailProcessPipe)
+        """
+        img = hdrCore.image.Image.read(filename, thumb=True, thumbSize=width)
+
+        # resize to cell
+        height_, width_, _ = img.shape
+        if width_ > width: img = img.process(hdrCore.processing.resize(),size=(None, width))
+
+        # parameters: default ones updated with metadata
+        processPipeDict = img.metadata.metadata['processpipe'] if isinstance(img.metadata.metadata.get('processpipe', None), list) else None
+        processPipe = EditImageModel.buildProcessPipe(processPipeDict)
+
+        if not img.linear:
+            img.colorData = np.float32(colour.cctf_decoding(img.colorData, function='sRGB'))
+            img.linear = True
+
+        # fused engine (python process-nodes without HDRip.dll) then geometry
+        plan = hdrCore.processing.CompiledPlan(processPipe.toDict())
+        img = plan.apply(img, backend='cpp' if hdrCore.coreC.available() else 'python')
+
+        # tone map for display
+        img.colorData = np.float32(colour.cctf_encoding(img.colorData, function='sRGB'))
+        img.linear = False
+
+        return ThumbnailProcessPipe(filename, processPipe.toDict(), img)
+# ------------------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------------------
 # --- class ImageGalleryModel --------------------------------------------------------------
 # ------------------------------------------------------------------------------------------
 class ImageGalleryModel:
@@ -69,9 +169,17 @@ class ImageGalleryModel:
             imagesFilenames (list[str]): list of image filenames
             processPipes (list[hdrCore.porocessing.ProcessPipe]): list of process-pipes associated to images
             _selectedImage (int): index of current (selected) process-pipe
+            pendingSelection (int): index of the last image requested for editing (see requestProcessPipe), -1 if none
+            loadThreads (guiQt.thread.RequestLoadImage): loads gallery images (current page and prefetched pages)
+            lru (collections.OrderedDict): indexes of resident process-pipes, least recently used first
+            lock (threading.RLock): protects processPipes and lru
 
             aestheticsModels (list[hdrCore.aesthetics.MultidimensionalImageAestheticsModel])
 
+        Class Attributes:
+            memoryBudget (int): memory (bytes) allowed for resident process-pipes, least recently used ones are evicted beyond
+            pinnedNeighbours (int): number of neighbours of the selected image that are never evicted
+
         Methods:
             setSelectedImage
             selectedImage
@@ -81,15 +189,28 @@ class ImageGalleryModel:
             save
             getFilenamesOfCurrentPage
             getProcessPipeById
+            requestProcessPipe
+            setProcessPipe
+            needsLoad
+            restoreProcessPipe
+            evict
+            residentBytes
     """
+    memoryBudget =      1024*1024*1024
+    pinnedNeighbours =  1
 
     def __init__(self, _controller):
-        if pref.verbose:  print(" [MODEL] >> ImageGalleryModel.__init__()")
+        trace.debug('MODEL', "ImageGalleryModel.__init__()")
 
         self.controller = _controller
         self.imageFilenames = []
         self.processPipes = []
         self._selectedImage= -1
+        self.pendingSelection = -1
+
+        self.loadThreads = thread.RequestLoadImage(self)
+        self.lru = collections.OrderedDict()
+        self.lock = threading.RLock()
 
         self.aesthetics = []
 
@@ -98,17 +219,21 @@ class ImageGalleryModel:
     def selectedImage(self): return self._selectedImage
 
     def getSelectedProcessPipe(self):
-        if pref.verbose: print(" [MODEL] >> ImageGalleryModel.getSelectedProcessPipe(",  ")")
+        trace.debug('MODEL', "ImageGalleryModel.getSelectedProcessPipe(",  ")")
 
         res = None
-        if self._selectedImage != -1: res= self.processPipes[self._selectedImage]
+        if self._selectedImage != -1: res= self.getProcessPipeById(self._selectedImage)
         return res
 
     def setImages(self, filenames):
-        if pref.verbose: print(" [MODEL] >> ImageGalleryModel.setImages(",len(list(copy.deepcopy(filenames))), "images)")
+        trace.debug('MODEL', "ImageGalleryModel.setImages(",lambda: len(list(copy.deepcopy(filenames))), "images)")
 
         self.imageFilenames = list(filenames)
         self.imagesMetadata, self.processPipes =  [], [] # reset metadata and processPipes
+        self.loadThreads.reset()                          # cancel loading of previous images
+        self.lru = collections.OrderedDict()
+        self._selectedImage = -1
+        self.pendingSelection = -1
 
         self.aestheticsModels = [] # reset aesthetics models
 
@@ -124,25 +249,27 @@ class ImageGalleryModel:
                 nb(int): page number
             Returns:
         """
-        if pref.verbose:  print(" [MODEL] >> ImageGalleryModel.loadPage(",nb,")")
+        trace.debug('MODEL', "ImageGalleryModel.loadPage(",nb,")")
         nbImagePage = controller.GalleryMode.nbRow(self.controller.view.shapeMode)*controller.GalleryMode.nbCol(self.controller.view.shapeMode)
         min_,max_ = (nb*nbImagePage), ((nb+1)*nbImagePage)
 
-        loadThreads = thread.RequestLoadImage(self)
-
-        for i,f in enumerate(self.imageFilenames[min_:max_]): # load only the current page nb
-            if not isinstance(self.processPipes[min_+i],hdrCore.processing.ProcessPipe):
-                self.controller.parent.statusBar().showMessage("read image: "+f)
-                self.controller.parent.statusBar().repaint()
-                loadThreads.requestLoad(min_,i, f)
-            else:
+        for i,f in enumerate(self.imageFilenames[min_:max_]): # display already loaded images of page nb
+            if self.processPipes[min_+i] != None: # resident or evicted (thumbnail)
                 self.controller.view.updateImage(i, self.processPipes[min_+i], f)
+            else:
+                self.controller.parent.statusBar().showMessage("read image: "+f)
+
+        # load missing images of page nb, prefetch next and previous pages
+        self.loadThreads.requestPage(nb, nbImagePage, self.controller.view.cellWidth())
+
+        # precompute aesthetics models of loaded images of page (background, idle time)
+        thread.aestheticsCompute().requestPage(self.processPipes[min_:max_])
 
     def save(self):
-        if pref.verbose:  print(" [MODEL] >> ImageGalleryModel.save()")
+        trace.debug('MODEL', "ImageGalleryModel.save()")
 
         for i,p in enumerate(self.processPipes):
-            if isinstance(p, hdrCore.processing.ProcessPipe): 
+            if isinstance(p, (hdrCore.processing.ProcessPipe, ThumbnailProcessPipe)): 
                 p.getImage().metadata.metadata['processpipe'] = p.toDict()            
                 p.getImage().metadata.save()
 
@@ -151,7 +278,127 @@ class ImageGalleryModel:
         return copy.deepcopy(self.imageFilenames[minIdx:maxIdx])
 
     def getProcessPipeById(self,i):
-        return self.processPipes[i]
+        """return resident process-pipe i (no computation, see requestProcessPipe for gallery images).
+
+            Args:
+                i (int, Required): index of image/processpipe
+
+            Returns:
+                (hdrCore.processing.ProcessPipe): None if image is not loaded or has no resident process-pipe
+        """
+        with self.lock:
+            pp = self.processPipes[i]
+            if not isinstance(pp, hdrCore.processing.ProcessPipe): return None
+            self.lru.move_to_end(i)
+        return pp
+
+    def requestProcessPipe(self, i, callBack):
+        """request editing process-pipe i: callBack is called at once if it is resident, otherwise the process-pipe is 
+            built from the thumbnail parameters in the INTERACTIVE pool (see restoreProcessPipe) then callBack is called
+            in GUI thread.
+
+            Args:
+                i (int, Required): index of image/processpipe
+                callBack (function, Required): called with (i, hdrCore.processing.ProcessPipe)
+
+            Returns:
+                (hdrCore.processing.ProcessPipe or guiQt.model.ThumbnailProcessPipe): resident process-pipe or thumbnail
+                    shown while the process-pipe is built, None if image is not loaded
+        """
+        self.pendingSelection = i
+        pp = self.getProcessPipeById(i)
+        if pp:
+            callBack(i, pp)
+            return pp
+        with self.lock: thumbnail = self.processPipes[i]
+        if isinstance(thumbnail, ThumbnailProcessPipe): thread.RequestRestoreProcessPipe(self, i, thumbnail, callBack)
+        return thumbnail
+
+    def setProcessPipe(self, i, processPipe):
+        """store a process-pipe (editing) or a thumbnail (gallery render path), 
+            then evict least recently used process-pipes if memory budget is exceeded.
+            A resident process-pipe is never replaced by a thumbnail (it may hold edits).
+
+            Args:
+                i (int, Required): index of image/processpipe
+                processPipe (hdrCore.processing.ProcessPipe or guiQt.model.ThumbnailProcessPipe, Required): process-pipe
+        """
+        with self.lock:
+            if isinstance(processPipe, ThumbnailProcessPipe):
+                if not isinstance(self.processPipes[i], hdrCore.processing.ProcessPipe): self.processPipes[i] = processPipe
+            else:
+                self.processPipes[i] = processPipe
+                self.lru[i] = True
+                self.lru.move_to_end(i)
+                self.evict()
+
+    def needsLoad(self, i, width):
+        """returns True if image i has to be (re)loaded for a gallery cell of width: not loaded or thumbnail too small.
+
+            Args:
+                i (int, Required): index of image/processpipe
+                width (int, Required): width of gallery cell
+        """
+        pp = self.processPipes[i]
+        return (pp == None) or (isinstance(pp, ThumbnailProcessPipe) and (pp.width() < width) and (pp.width() < hdrCore.processing.ProcessPipe.maxSize))
+
+    def restoreProcessPipe(self, i, thumbnail):
+        """build the editing process-pipe of a gallery image (rendered or evicted): read image (thumbnail size), set kept parameters and compute.
+            Called in a pool thread (see guiQt.thread.RequestRestoreProcessPipe): the lock is taken only to store the result.
+
+            Args:
+                i (int, Required): index of image/processpipe
+                thumbnail (guiQt.model.ThumbnailProcessPipe, Required): gallery image i
+
+            Returns:
+                (hdrCore.processing.ProcessPipe): None if the image list changed meanwhile
+        """
+        trace.debug('MODEL', "ImageGalleryModel.restoreProcessPipe(",i,")")
+
+        img = hdrCore.image.Image.read(thumbnail.filename, thumb=True)
+        processPipe = EditImageModel.buildProcessPipe()
+        processPipe.setImage(img)
+        for pMeta in thumbnail.processPipeDict:
+            name = list(pMeta.keys())[0]
+            idProcess = processPipe.getProcessNodeByName(name)
+            if idProcess != -1: processPipe.setParameters(idProcess, copy.deepcopy(pMeta[name]))
+        processPipe.compute()
+
+        with self.lock:
+            if (i >= len(self.processPipes)) or (self.imageFilenames[i] != thumbnail.filename): return None
+            current = self.processPipes[i]
+            if isinstance(current, hdrCore.processing.ProcessPipe): return current      # restored meanwhile
+            self.setProcessPipe(i, processPipe)
+        return processPipe
+
+    def evict(self):
+        """evict least recently used process-pipes until resident bytes fit in memoryBudget.
+            Selected image and its neighbours are pinned.
+        """
+        with self.lock:
+            pinned = set()
+            if self._selectedImage != -1:
+                pinned = set(range(self._selectedImage-ImageGalleryModel.pinnedNeighbours, self._selectedImage+ImageGalleryModel.pinnedNeighbours+1))
+
+            resident = self.residentBytes()
+            total = sum(resident.values())
+            for i in list(self.lru.keys()):
+                if total <= ImageGalleryModel.memoryBudget: break
+                if i in pinned: continue
+                evicted = ThumbnailProcessPipe.fromProcessPipe(self.imageFilenames[i], self.processPipes[i])
+                total -= resident[i] - evicted.residentBytes()
+                self.processPipes[i] = evicted
+                del self.lru[i]
+                trace.debug('MODEL', "ImageGalleryModel.evict(",i,"): resident:",total//(1024*1024),"MB")
+
+    def residentBytes(self):
+        """return memory (bytes) used by each resident or evicted process-pipe.
+
+            Returns:
+                (dict): key is image index, value is bytes
+        """
+        with self.lock:
+            return dict([(i, p.residentBytes()) for i,p in enumerate(self.processPipes) if p != None])
 
 # ------------------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------------------
@@ -233,95 +480,21 @@ class EditImageModel(object):
             return False
 
     @staticmethod
-    def buildProcessPipe():
+    def buildProcessPipe(processPipeDict=None):
         """
         WARNING: 
             here the process-pipe is built
             initial pipe does not have input image
             initial pipe has processes node according to EditImageView 
-        """
-        processPipe = hdrCore.processing.ProcessPipe()
-
-        # exposure ---------------------------------------------------------------------------------------------------------
-        defaultParameterEV = {'EV': 0}                                              
-        idExposureProcessNode = processPipe.append(hdrCore.processing.exposure(), paramDict=None,name="exposure")   
-        processPipe.setParameters(idExposureProcessNode, defaultParameterEV)                                        
-
-        # contrast ---------------------------------------------------------------------------------------------------------
-        defaultParameterContrast = {'contrast': 0}                                  
-        idContrastProcessNode = processPipe.append(hdrCore.processing.contrast(), paramDict=None,  name="contrast") 
-        processPipe.setParameters(idContrastProcessNode, defaultParameterContrast)                                  
-
-        #tonecurve ---------------------------------------------------------------------------------------------------------
-        defaultParameterYcurve = {'start':[0,0], 
-                                  'shadows': [10,10],
-                                  'blacks': [30,30], 
-                                  'mediums': [50,50], 
-                                  'whites': [70,70], 
-                                  'highlights': [90,90], 
-                                  'end': [100,100]}                         
-        idYcurveProcessNode = processPipe.append(hdrCore.processing.Ycurve(), paramDict=None,name="tonecurve")      
-        processPipe.setParameters(idYcurveProcessNode, defaultParameterYcurve)   
-        
-        # masklightness ---------------------------------------------------------------------------------------------------------
-        defaultMask = { 'shadows': False, 
-                       'blacks': False, 
-                       'mediums': False, 
-                       'whites': False, 
-                       'highlights': False}
-        idLightnessMaskProcessNode = processPipe.append(hdrCore.processing.lightnessMask(), paramDict=None, name="lightnessmask")  
-        processPipe.setParameters(idLightnessMaskProcessNode, defaultMask)  
-
-        # saturation ---------------------------------------------------------------------------------------------------------
-        defaultValue = {'saturation': 0.0,  'method': 'gamma'}
-        idSaturationProcessNode = processPipe.append(hdrCore.processing.saturation(), paramDict=None, name="saturation")    
-        processPipe.setParameters(idSaturationProcessNode, defaultValue)                     
-
-        # colorEditor0 ---------------------------------------------------------------------------------------------------------
-        defaultParameterColorEditor0= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
-                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
-                                       'mask': False}        
-        idColorEditor0ProcessNode = processPipe.append(hdrCore.processing.colorEditor(), paramDict=None, name="colorEditor0")  
-        processPipe.setParameters(idColorEditor0ProcessNode, defaultParameterColorEditor0)
-
-        # colorEditor1 ---------------------------------------------------------------------------------------------------------
-        defaultParameterColorEditor1= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
-                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
-                                       'mask': False}        
-        idColorEditor1ProcessNode = processPipe.append(hdrCore.processing.colorEditor(), paramDict=None, name="colorEditor1")  
-        processPipe.setParameters(idColorEditor1ProcessNode, defaultParameterColorEditor1)
-        
-        # colorEditor2 ---------------------------------------------------------------------------------------------------------
-        defaultParameterColorEditor2= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
-                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
-                                       'mask': False}        
-        idColorEditor2ProcessNode = processPipe.append(hdrCore.processing.colorEditor(), paramDict=None, name="colorEditor2")  
-        processPipe.setParameters(idColorEditor2ProcessNode, defaultParameterColorEditor2)
-        
-        # colorEditor3 ---------------------------------------------------------------------------------------------------------
-        defaultParameterColorEditor3= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
-                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
-                                       'mask': False}        
-        idColorEditor3ProcessNode = processPipe.append(hdrCore.processing.colorEditor(), paramDict=None, name="colorEditor3")  
-        processPipe.setParameters(idColorEditor3ProcessNode, defaultParameterColorEditor3)
-        
-        # colorEditor4 ---------------------------------------------------------------------------------------------------------
-        defaultParameterColorEditor4= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
-                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
-                                       'mask': False}        
-        idColorEditor4ProcessNode = processPipe.append(hdrCore.processing.colorEditor(), paramDict=None, name="colorEditor4")  
-        processPipe.setParameters(idColorEditor4ProcessNode, defaultParameterColorEditor4)
-
-        # geometry ---------------------------------------------------------------------------------------------------------
-        defaultValue = { 'ratio': (16,9), 'up': 0,'rotation': 0.0}
-        idGeometryNode = processPipe.append(hdrCore.processing.geometry(), paramDict=None, name="geometry")    
-        processPipe.setParameters(idGeometryNode, defaultValue)
-        # ------------ --------------------------------------------------------------------------------------------------------- 
+            process-nodes and default parameters are defined in hdrCore.processing.ProcessPipe.build (shared with headless rendering)
 
-        return processPipe
+        Args:
+            processPipeDict (list[dict], Optionnal): parameters of process-nodes (see hdrCore.processing.ProcessPipe.toDict), default parameters otherwise
+        """
+        return hdrCore.processing.ProcessPipe.build(processPipeDict)
 
     def autoExposure(self):
-        if pref.verbose:  print(" [MODEL] >> EditImageModel.autoExposure(",")")
+        trace.debug('MODEL', "EditImageModel.autoExposure(",")")
 
         id = self.processpipe.getProcessNodeByName("exposure")
         exposureProcess = self.processpipe.processNodes[id].process
@@ -347,48 +520,48 @@ class EditImageModel(object):
             XXX
         """
 
-        if pref.verbose:  print(" [MODEL] >> EditImageModel.changeExposure(",value,")")
+        trace.debug('MODEL', "EditImageModel.changeExposure(",value,")")
 
         id = self.processpipe.getProcessNodeByName("exposure")
         self.requestCompute.requestCompute(id,{'EV': value})
 
     def getEV(self):
-        if pref.verbose:  print(" [MODEL] >> EditImageModel.getEV(",")")
+        trace.debug('MODEL', "EditImageModel.getEV(",")")
         id = self.processpipe.getProcessNodeByName("exposure")
         return self.processpipe.getParameters(id)
 
     def changeContrast(self,value):
-        if pref.verbose:  print(" [MODEL] >> EditImageModel.changeContrast(",value,")")
+        trace.debug('MODEL', "EditImageModel.changeContrast(",value,")")
 
         id = self.processpipe.getProcessNodeByName("contrast")
         self.requestCompute.requestCompute(id,{'contrast': value})
 
     def changeToneCurve(self,controlPoints):
-        if pref.verbose: print(" [MODEL] >> EditImageModel.changeToneCurve(",")")
+        trace.debug('MODEL', "EditImageModel.changeToneCurve(",")")
 
         id = self.processpipe.getProcessNodeByName("tonecurve")
         self.requestCompute.requestCompute(id,controlPoints)
 
     def changeLightnessMask(self, maskValues):
-        if pref.verbose: print(" [MODEL] >> EditImageModel.changeLightnessMask(",maskValues,")")
+        trace.debug('MODEL', "EditImageModel.changeLightnessMask(",maskValues,")")
 
         id = self.processpipe.getProcessNodeByName("lightnessmask")
         self.requestCompute.requestCompute(id,maskValues)
 
     def changeSaturation(self,value):
-        if pref.verbose:  print(" [MODEL] >> EditImageModel.changeSaturation(",value,")")
+        trace.debug('MODEL', "EditImageModel.changeSaturation(",value,")")
 
         id = self.processpipe.getProcessNodeByName("saturation")
         self.requestCompute.requestCompute(id,{'saturation': value, 'method': 'gamma'})
 
     def changeColorEditor(self, values, idName):
-        if pref.verbose:  print(" [MODEL] >> EditImageModel.changeColorEditor(",values,")")
+        trace.debug('MODEL', "EditImageModel.changeColorEditor(",values,")")
 
         id = self.processpipe.getProcessNodeByName(idName)
         self.requestCompute.requestCompute(id,values)
 
     def changeGeometry(self, values):
-        if pref.verbose:  print(" [MODEL] >> EditImageModel.changeGeometry(",values,")")
+        trace.debug('MODEL', "EditImageModel.changeGeometry(",values,")")
 
         id = self.processpipe.getProcessNodeByName("geometry")
         self.requestCompute.requestCompute(id,values)
@@ -437,7 +610,7 @@ class ToneCurveModel():
 
     """
     def __init__(self):
-        if pref.verbose: print(" [MODEL] >> ToneCourveModel.__init__()")
+        trace.debug('MODEL', "ToneCourveModel.__init__()")
 
         #  start
         self.control = {'start':[0.0,0.0], 'shadows': [10.0,10.0], 'blacks': [30.0,30.0], 'mediums': [50.0,50.0], 'whites': [70.0,70.0], 'highlights': [90.0,90.0], 'end': [100.0,100.0]}
@@ -448,7 +621,7 @@ class ToneCurveModel():
         self.points =None
 
     def evaluate(self):
-        if pref.verbose: print(" [MODEL] >> ToneCurveModel.evaluate(",")")
+        trace.debug('MODEL', "ToneCurveModel.evaluate(",")")
 
         #self.curve.ctrlpts = copy.deepcopy([self.control['start'],self.control['shadows'],self.control['blacks'],self.control['mediums'], self.control['whites'], self.control['highlights'], self.control['end']])
         self.curve.ctrlpts = copy.deepcopy([self.control['start'],self.control['shadows'],self.control['blacks'],self.control['mediums'], self.control['whites'], self.control['highlights'], [200, self.control['end'][1]]])
@@ -460,7 +633,7 @@ class ToneCurveModel():
         return self.points
 
     def setValue(self, key, value, autoScale=False):
-        if pref.verbose: print(" [MODEL] >> ToneCourveModel.setValue(",key,", ",value,", autoScale=",autoScale,")")
+        trace.debug('MODEL', "ToneCourveModel.setValue(",key,", ",value,", autoScale=",autoScale,")")
         value = float(value)
         # check key
         if key in self.control.keys():
@@ -537,7 +710,7 @@ class ImageInfoModel(object):
     def setProcessPipe(self, processPipe):  self.processPipe = processPipe
 
     def changeMeta(self,tagGroup,tag, on_off): 
-        if pref.verbose:  print(" [MODEL] >> ImageInfoModel.changeMeta(",tagGroup,",",tag,",", on_off,")")
+        trace.debug('MODEL', "ImageInfoModel.changeMeta(",tagGroup,",",tag,",", on_off,")")
 
         if isinstance(self.processPipe, hdrCore.processing.ProcessPipe):
             tagRootName = self.processPipe.getImage().metadata.otherTags.getTagsRootName()
@@ -550,9 +723,7 @@ class ImageInfoModel(object):
                         tt[tagGroup][tag] = on_off 
                 updatedMeta.append(copy.deepcopy(tt))
             self.processPipe.updateUserMeta(tagRootName,updatedMeta)
-            if pref.verbose: 
-                print(" [MODEL] >> ImageInfoModel.changeUseCase(",")")
-                for tt in updatedMeta: print(tt)     
+            trace.debug('MODEL', "ImageInfoModel.changeUseCase(",")", lambda: '\n'.join(map(str, updatedMeta)))
 # ------------------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------------------
@@ -562,7 +733,7 @@ class CurveControlModel(object): pass
 # ------------------------------------------------------------------------------------------
 class HDRviewerModel(object):
     def __init__(self,_controller):
-        if pref.verbose: print(" [MODEL] >> HDRviewerModel.__init__(",")")
+        trace.debug('MODEL', "HDRviewerModel.__init__(",")")
 
         self.controller = _controller
 
@@ -572,11 +743,11 @@ class HDRviewerModel(object):
         self.displayModel = pref.getHDRdisplays()
 
     def scaling(self): 
-        if pref.verbose: print(f" [MODEL] >> HDRviewerModel.scaling():{self.displayModel['scaling']}")
+        trace.debug('MODEL', "HDRviewerModel.scaling():", self.displayModel['scaling'])
         return self.displayModel['scaling']
 
     def shape(self): 
-        if pref.verbose: print(f" [MODEL] >> HDRviewerModel.shape():{self.displayModel['shape']}")        
+        trace.debug('MODEL', "HDRviewerModel.shape():", self.displayModel['shape'])
         return self.displayModel['shape']
 # ------------------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------------------
@@ -685,17 +856,23 @@ class GeometryModel(object):
 # ------------------------------------------------------------------------------------------
 class ImageAestheticsModel:
     """class ImageAesthetics: encapsulates color palette (and related parameters), convexHull composition (and related parameters), etc.
+        Aesthetics models are computed in background (see guiQt.thread.RequestAestheticsCompute): selecting an image does not
+        wait for them, the view is updated when they are available.
 
         Attributes:
             parent (guiQt.controller.ImageAestheticsController): controller
             processPipe (hdrCore.processing.ProcessPipe): current selected process-pipe
+            key (tuple): key of aesthetics models of current process-pipe (see guiQt.thread.RequestAestheticsCompute.key)
+            colorPalette (hdrCore.aesthetics.Palette): color palette of current process-pipe (default palette while computing)
 
         Methods:
-
-
+            getProcessPipe
+            setProcessPipe
+            endComputing
+            getPaletteImage
     """
     def __init__(self, parent):
-        if pref.verbose: print(" [MODEL] >> ImageAestheticsModel.__init__(",")")
+        trace.debug('MODEL', "ImageAestheticsModel.__init__(",")")
         
         self.parent = parent
 
@@ -705,36 +882,44 @@ class ImageAestheticsModel:
 
         # ref to ImageGalleryModel.processPipes[ImageGalleryModel._selectedImage]
         self.processPipe = None 
+        self.key = None
 
         # color palette
-        self.colorPalette = hdrCore.aesthetics.Palette('defaultLab5',
+        self.defaultPalette = hdrCore.aesthetics.Palette('defaultLab5',
                                                        np.linspace([0,0,0],[100,0,0],5),
                                                        hdrCore.image.ColorSpace.build('Lab'), 
                                                        hdrCore.image.imageType.SDR)
+        self.colorPalette = self.defaultPalette
     # ------------------------------------------------------------------------------------------
     def getProcessPipe(self): return self.processPipe
     # ------------------------------------------------------------------------------------------
     def setProcessPipe(self, processPipe):  
-        if pref.verbose: print(" [MODEL] >> ImageAestheticsModel.setProcessPipe(",")")
+        trace.debug('MODEL', "ImageAestheticsModel.setProcessPipe(",")")
 
         if processPipe != self.processPipe:
         
             self.processPipe = processPipe
             self.requireUpdate = True
 
-        if self.requireUpdate:
+        if self.requireUpdate and self.processPipe:
 
-            self.colorPalette = hdrCore.aesthetics.Palette.build(self.processPipe)
-            # COMPUTE IMAGE OF PALETTE
-            paletteIMG = self.colorPalette.createImageOfPalette()
-
-            self.endComputing()
+            # cached result or background computation (endComputing is called when it is over)
+            self.key = thread.RequestAestheticsCompute.key(self.processPipe)
+            models = thread.aestheticsCompute().request(self.processPipe, callback=self.endComputing)
+            if models: self.endComputing(self.key, models, notify=False)
+            else: self.colorPalette = self.defaultPalette
 
         else: pass
     # ------------------------------------------------------------------------------------------
-    def endComputing(self):
+    def endComputing(self, key, models, notify=True):
+        # called in the GUI thread (see guiQt.thread.RequestAestheticsCompute.endCompute)
+        # result of a previous selection (or failed computation): ignored
+        if key != self.key or models == None: return
+
+        self.colorPalette = models.get('palette')
         self.requireUpdate = False
-    # ------------------------------------------------------------------------------------------
+        if notify: self.parent.updatePalette()
+# ------------------------------------------------------------------------------------------
     def getPaletteImage(self):
         return self.colorPalette.createImageOfPalette()
 # ------------------------------------------------------------------------------------------
@@ -742,6 +927,14 @@ class ImageAestheticsModel:
 # ------------------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------------------
 class ColorEditorsAutoModel:
+    """class ColorEditorsAutoModel: selection of color editors computed from image colors
+
+        Class Attributes:
+            method (str): 'hue-histogram' (segmentation of chroma-weighted hue histogram, linear in number of pixels)
+                            or 'kmeans-Lab' (k-means clustering of Lab colors)
+    """
+    method = 'hue-histogram'
+
     def __init__(self,_controller, processStepName,nbColors, removeBlack= True):
         self.controller = _controller
         self.processStepId = processStepName
@@ -754,25 +947,18 @@ class ColorEditorsAutoModel:
         if processPipe != None:
             image_ = processPipe.processNodes[processPipe.getProcessNodeByName(self.processStepId)].outputImage
 
-            if image_.colorSpace.name == 'Lch':
-                LchPixels = image_.colorData
-            elif image_.colorSpace.name == 'sRGB':
-                if image_.linear: 
-                    colorLab = hdrCore.processing.sRGB_to_Lab(image_.colorData, apply_cctf_decoding=False)
-                    LchPixels = colour.Lab_to_LCHab(colorLab)
-                else:
-                    colorLab = hdrCore.processing.sRGB_to_Lab(image_.colorData, apply_cctf_decoding=True)
-                    LchPixels = colour.Lab_to_LCHab(colorLab)
-
-            # to Lab then to Vector
-            LabPixels = colour.LCHab_to_Lab(LchPixels)
-            LabPixelsVector = hdrCore.utils.ndarray2vector(LabPixels)
-
-            # k-means: nb cluster = nbColors + 1
-            kmeans_cluster_Lab = sklearn.cluster.KMeans(n_clusters=self.nbColors+1)
-            kmeans_cluster_Lab.fit(LabPixelsVector)
-            cluster_centers_Lab = kmeans_cluster_Lab.cluster_centers_
-            cluster_labels_Lab = kmeans_cluster_Lab.labels_
+            if ColorEditorsAutoModel.method == 'hue-histogram':
+                # one segment per color editor, full resolution (histograms only), low chroma pixels (black, greys) ignored
+                segments = image_.statistics().hueSegments(self.nbColors, subsample=False)
+                return [{"selection": {
+                            "lightness":    segment['lightness'],
+                            "chroma":       segment['chroma'],
+                            "hue":          segment['hue']},
+                        "edit": {"hue": 0,"exposure": 0,"contrast": 0,"saturation": 0},
+                        "mask": False} for segment in segments]
+
+            # k-means: nb cluster = nbColors + 1, in Lab on subsample, shared and cached with node version (see hdrCore.statistics)
+            cluster_centers_Lab = image_.statistics().clusters(self.nbColors+1)
                 
             # remove darkness one
             idxLmin = np.argmin(cluster_centers_Lab[:,0])                           # idx of darkness
@@ -23,13 +23,217 @@ package hdrGUI consists of the classes for GUI.
 # -----------------------------------------------------------------------------
 # --- Import ------------------------------------------------------------------
 # -----------------------------------------------------------------------------
-import copy, time, random
-import hdrCore
+import copy, time, random, threading, collections, functools, enum, json
+import hdrCore, hdrCore.aesthetics, hdrCore.executor, hdrCore.batch, hdrCore.daemon, hdrCore.cache, hdrCore.profiling
+from hdrCore import trace
 from . import model
-from PyQt5.QtCore import QRunnable, Qt, QThreadPool
+from PyQt5.QtCore import QRunnable, Qt, QThreadPool, QThread, QObject, QTimer, pyqtSignal
 from timeit import default_timer as timer
-import preferences.preferences as pref
 
+# -----------------------------------------------------------------------------
+# --- Class Priority ----------------------------------------------------------
+# -----------------------------------------------------------------------------
+class Priority(enum.IntEnum):
+    """priority classes of computation, each class has its own thread pool (see ThreadPools).
+
+        INTERACTIVE:    editing computation (RunCompute)
+        DISPLAY:        full size computation for display HDR, compare or export of selected image (pRun, cRun)
+        GALLERY:        gallery loading (RunLoadImage)
+        BATCH:          background computation (RunAestheticsCompute, RunBatchExport, RunBatchAutoToneCurve)
+    """
+    INTERACTIVE = 0
+    DISPLAY     = 1
+    GALLERY     = 2
+    BATCH       = 3
+# -----------------------------------------------------------------------------
+# --- Class ThreadPools -------------------------------------------------------
+# -----------------------------------------------------------------------------
+class ThreadPools(object):
+    """
+    one bounded QThreadPool per priority class (instead of QThreadPool.globalInstance() shared by all computations):
+        - a page of thumbnails cannot starve editing computation: each class has its own worker budget,
+        - background classes (GALLERY, BATCH) yield to INTERACTIVE: while the user is editing, 
+          background runnables wait before starting (see yieldToInteractive),
+        - pool occupancy and queue depth are observable (see stats).
+
+    Class Attributes:
+        budgets (dict): key: Priority, value: max number of threads (None: number of cores)
+        interactiveGrace (float): time (second) during which background work is held after the last interactive request
+        maxYield (float): maximum time (second) a background runnable waits for the end of interaction
+
+    Attributes:
+        pools (dict): key: Priority, value: QThreadPool
+        submitted (dict): key: Priority, value: number of runnables submitted
+        started (dict): key: Priority, value: number of runnables started
+        finished (dict): key: Priority, value: number of runnables finished
+        interactiveUntil (float): time until which the user is considered as interacting
+
+    Methods:
+        start
+        tryTake
+        notifyInteraction
+        isInteracting
+        yieldToInteractive
+        stats
+    """
+
+    budgets = {
+        Priority.INTERACTIVE:   1,      # single thread: computations are serialized by RequestCompute
+        Priority.DISPLAY:       None,   # all cores
+        Priority.GALLERY:       2,
+        Priority.BATCH:         1
+        }
+    interactiveGrace =  0.5
+    maxYield =          5.0
+
+    def __init__(self):
+        nbCores = QThread.idealThreadCount()
+
+        self.pools, self.submitted, self.started, self.finished = {}, {}, {}, {}
+        for p in Priority:
+            pool = QThreadPool()
+            budget = ThreadPools.budgets[p]
+            pool.setMaxThreadCount(max(1, budget if budget else nbCores))
+            self.pools[p] = pool
+            self.submitted[p], self.started[p], self.finished[p] = 0, 0, 0
+
+        self.lock = threading.Lock()
+        self.interactiveUntil = 0.0
+
+    def start(self, runnable, priority, order=0):
+        """start a runnable in the pool of its priority class.
+
+            Args:
+                runnable (QRunnable, Required): runnable to start
+                priority (guiQt.thread.Priority, Required): priority class
+                order (int, Optionnal): priority inside the pool (higher first)
+
+            Returns:
+                (QRunnable): runnable submitted to pool (required by tryTake)
+        """
+        if priority == Priority.INTERACTIVE: self.notifyInteraction()
+        tracked = TrackedRunnable(self, runnable, priority)
+        with self.lock: self.submitted[priority] += 1
+        self.pools[priority].start(tracked, order)
+        return tracked
+
+    def tryTake(self, tracked):
+        """remove a runnable (returned by start) that has not yet started.
+
+            Args:
+                tracked (QRunnable, Required): runnable returned by start
+
+            Returns:
+                (bool): True if the runnable has been removed from queue
+        """
+        taken = self.pools[tracked.priority].tryTake(tracked)
+        if taken:
+            with self.lock: self.submitted[tracked.priority] -= 1
+        return taken
+
+    def notifyInteraction(self):
+        """called when user edits image: hold background work during interactiveGrace."""
+        self.interactiveUntil = timer() + ThreadPools.interactiveGrace
+
+    def isInteracting(self):
+        """returns True if user has been editing during the last interactiveGrace seconds."""
+        return (timer() < self.interactiveUntil) or (self.pools[Priority.INTERACTIVE].activeThreadCount() > 0)
+
+    def yieldToInteractive(self, priority):
+        """background runnables (GALLERY, BATCH) call it at their checkpoints: wait while user is interacting (at most maxYield).
+
+            Args:
+                priority (guiQt.thread.Priority, Required): priority class of caller
+        """
+        if priority < Priority.GALLERY: return
+        start = timer()
+        while self.isInteracting() and (timer() - start) < ThreadPools.maxYield: time.sleep(0.02)
+
+    def stats(self):
+        """returns pool occupancy and queue depth per priority class.
+
+            Returns:
+                (dict): key: priority name, value: dict with keys 'active', 'max', 'queued', 'done'
+        """
+        res = {}
+        with self.lock:
+            for p in Priority:
+                res[p.name] = {'active':    self.pools[p].activeThreadCount(),
+                               'max':       self.pools[p].maxThreadCount(),
+                               'queued':    self.submitted[p] - self.started[p],
+                               'done':      self.finished[p]}
+        return res
+
+    def __repr__(self):
+        return " ".join(map(lambda kv: kv[0]+":"+str(kv[1]['active'])+"/"+str(kv[1]['max'])+"(+"+str(kv[1]['queued'])+")", self.stats().items()))
+# -----------------------------------------------------------------------------
+# --- Class TrackedRunnable ---------------------------------------------------
+# -----------------------------------------------------------------------------
+class TrackedRunnable(QRunnable):
+    """wraps a runnable started by ThreadPools: counts started/finished runnables, background runnables yield to interactive ones.
+    """
+    def __init__(self, pools, runnable, priority):
+        super().__init__()
+        self.pools = pools
+        self.runnable = runnable
+        self.priority = priority
+
+    def run(self):
+        with self.pools.lock: self.pools.started[self.priority] += 1
+        try:
+            self.pools.yieldToInteractive(self.priority)
+            self.runnable.run()
+        finally:
+            with self.pools.lock: self.pools.finished[self.priority] += 1
+# -----------------------------------------------------------------------------
+__threadPools = None
+def threadPools():
+    """returns the application ThreadPools (created at first call).
+
+        Returns:
+            (guiQt.thread.ThreadPools)
+    """
+    global __threadPools
+    if not __threadPools: __threadPools = ThreadPools()
+    return __threadPools
+# -----------------------------------------------------------------------------
+# --- Class GuiInvoker --------------------------------------------------------
+# -----------------------------------------------------------------------------
+class GuiInvoker(QObject):
+    """calls functions in the GUI thread: widgets must not be updated from computing threads (thread pools, warm-up).
+    The invoker lives in the GUI thread, functions invoked from other threads are queued in the GUI event loop, 
+    functions invoked from the GUI thread are called at once.
+
+    Methods:
+        invoke
+    """
+    called = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+        # automatic connection: queued when the signal is emitted from another thread
+        self.called.connect(self.call)
+
+    def call(self, function): function()
+
+    def invoke(self, function):
+        """call function (without argument) in the GUI thread."""
+        self.called.emit(function)
+# -----------------------------------------------------------------------------
+__guiInvoker = None
+def guiInvoker():
+    """returns the application GuiInvoker (created at first call, that must be done in the GUI thread: see AppController).
+
+        Returns:
+            (guiQt.thread.GuiInvoker)
+    """
+    global __guiInvoker
+    if not __guiInvoker: __guiInvoker = GuiInvoker()
+    return __guiInvoker
+
+def invokeInGui(function, *args):
+    """call function(*args) in the GUI thread (see GuiInvoker), returns at once."""
+    guiInvoker().invoke(functools.partial(function, *args))
 # -----------------------------------------------------------------------------
 # --- Class RequestCompute ----------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -37,20 +241,26 @@ class RequestCompute(object):
     """
     manage parallel (multithreading) computation of processpipe.compute() when editing image (not used for display HDR or export HDR):
         - uses a single/specific thread to compute process-pipe,
-        - store compute request when user changes editing values, restart process-pipe computing when the previous one is finished.
+        - latest-wins scheduling: each requestCompute increments a monotonic generation number,
+          a computation whose generation is no longer the last one is stale and is abandoned at the next cancellation checkpoint,
+        - requests received while a computation is running are coalesced into a single new computation.
 
     Attributes:
         parent (guiQt.model.EditImageModel): reference to parent, used to callback parent when processing is over.
-        requestDict (dict): dict that stores editing values.
-        pool (QThreadPool): Qt thread pool.
+        requestDict (dict): pending editing values (not yet applied to processpipe), key: processNodeId, value: processNode params.
+        pool (guiQt.thread.ThreadPools): application thread pools.
         processpipe (hdrCore.processing.Processpipe): active processpipe.
-        readyToRun (bool): True when no processing is ongoing, else False.
-        waitingUpdate (bool): True if requestCompute has been called during a processing.
+        generation (int): monotonic number of the last request.
+        running (bool): True when a computation is ongoing.
+        latency (collections.deque): last latency measures (dict with keys: 'generation', 'coalesced', 'queue', 'compute', 'pixels', 'cancelled').
 
     Methods:
         setProcessPipe
         requestCompute
+        isStale
+        beginCompute
         endCompute
+        lastLatency
     """
 
     def __init__(self, parent):
@@ -59,14 +269,26 @@ class RequestCompute(object):
 
         self.requestDict= {} # store resqustCompute key:processNodeId, value: processNode params
 
-        self.pool = QThreadPool.globalInstance()        # get global pool
+        self.pool = threadPools()                       # get application pools
         self.processpipe = None                         # processpipe ref
 
-        self.readyToRun = True
-        self.waitingUpdate = False
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.running = False
+
+        # latency measures
+        self.pendingSince = None                        # time of first request not yet taken by a computation
+        self.nbCoalesced = 0                            # number of requests coalesced in the pending computation
+        self.cancelled = 0                              # number of computations cancelled since last completed one
+        self.latency = collections.deque(maxlen=100)
+
+    @property
+    def readyToRun(self):
+        """True when no processing is ongoing, else False."""
+        return not self.running
 
     def setProcessPipe(self,pp):
-        """set the current active processpipe.
+        """set the current active processpipe, pending requests of the previous processpipe are dropped.
 
             Args:
                 pp (hrdCore.processing.ProcessPipe, Required)
@@ -74,7 +296,12 @@ class RequestCompute(object):
             Returns:
                 
         """
-        self.processpipe = pp
+        with self.lock:
+            self.requestDict = {}
+            self.pendingSince = None
+            self.nbCoalesced = 0
+            self.generation += 1
+            self.processpipe = pp
     
     def requestCompute(self, id, params):
         """send new parameters for a process-node and request a new processpipe computation.
@@ -86,31 +313,88 @@ class RequestCompute(object):
             Returns:
                 
         """
-        self.requestDict[id] = copy.deepcopy(params)
+        # user is editing: background pools hold their work
+        self.pool.notifyInteraction()
+
+        with self.lock:
+            self.requestDict[id] = copy.deepcopy(params)
+            self.generation += 1
+            self.nbCoalesced += 1
+            if self.pendingSince == None: self.pendingSince = timer()
+
+            # a computation is already running: it is now stale and will restart with the new values
+            if self.running: return
+            self.running = True
+
+        # start processing processpipe
+        self.pool.start(RunCompute(self), Priority.INTERACTIVE)
 
+    def isStale(self, generation):
+        """returns True if newer requests have been received since the computation of generation started.
 
-        if self.readyToRun:
-            # start processing processpipe
-            self.pool.start(RunCompute(self))
-        else:
-            # if a computation is already running
-            self.waitingUpdate = True
+            Args:
+                generation (int, Required): generation of the computation
+
+            Returns:
+                (bool)
+        """
+        return generation != self.generation
 
-    def endCompute(self):
-        """called when process-node computation is finished.
-            Get processed image and send it to parent (guiQt.model.EditImageModel).
+    def beginCompute(self):
+        """called by RunCompute when computation starts: takes the pending requests and the processpipe they apply to.
+
+            Returns:
+                (dict, int, dict, hdrCore.processing.ProcessPipe): pending requests, generation of the computation, latency measure, processpipe
+        """
+        with self.lock:
+            requests, self.requestDict = self.requestDict, {}
+            measure = {'generation': self.generation, 
+                       'coalesced': self.nbCoalesced, 
+                       'queue': timer() - self.pendingSince if self.pendingSince else 0.0,
+                       'start': self.pendingSince}
+            self.pendingSince, self.nbCoalesced = None, 0
+            return requests, self.generation, measure, self.processpipe
+
+    def endCompute(self, generation, done, measure):
+        """called when process-node computation is finished or cancelled.
+            If done, get processed image and send it to parent (guiQt.model.EditImageModel).
             If there are new requestCompute, restart computation of processpipe
 
         Args:
+            generation (int, Required): generation of the computation
+            done (bool, Required): False if computation has been cancelled
+            measure (dict, Required): latency measure of the computation
 
         Retruns:
 
         """
-        imgTM = self.processpipe.getImage(toneMap=True)
-        self.parent.updateImage(imgTM)
-        if self.waitingUpdate:
-            self.pool.start(RunCompute(self))
-            self.waitingUpdate = False
+        if done and not self.isStale(generation):
+            imgTM = self.processpipe.getImage(toneMap=True)
+            self.parent.updateImage(imgTM)
+            # time to pixels: from first coalesced request to image displayed
+            measure['pixels'] = timer() - measure['start'] if measure['start'] else 0.0
+            measure['cancelled'] = self.cancelled
+            self.cancelled = 0
+            del measure['start']
+            self.latency.append(measure)
+            trace.debug('THREAD', "RequestCompute.endCompute(): latency",measure)
+        else: 
+            self.cancelled += 1
+
+        with self.lock:
+            if len(self.requestDict) == 0:
+                self.running = False
+                return
+        # new requests received during computation
+        self.pool.start(RunCompute(self), Priority.INTERACTIVE)
+
+    def lastLatency(self):
+        """returns the latency measure of the last completed computation (None if no computation has been completed).
+
+            Returns:
+                (dict): keys 'generation', 'coalesced', 'queue', 'compute', 'pixels', 'cancelled' (times in second)
+        """
+        return self.latency[-1] if len(self.latency) > 0 else None
 # -----------------------------------------------------------------------------
 # --- Class RunCompute --------------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -129,102 +413,222 @@ class RunCompute(QRunnable):
 
     def run(self):
         """method called by the Qt Thread pool.
-            Calls parent.endCompute() when process is over.
+            Only the pending requests are applied to the processpipe, computation is abandoned as soon as it is stale.
+            The processpipe is the one taken with the requests: if another processpipe has been set meanwhile (image
+            selection), the result is dropped. Calls parent.endCompute() when process is over.
 
             Args:
 
             Returns:
 
         """
-        self.parent.readyToRun = False
-        for k in self.parent.requestDict.keys(): self.parent.processpipe.setParameters(k,self.parent.requestDict[k])
+        requests, generation, measure, pp = self.parent.beginCompute()
+        for k in requests.keys(): pp.setParameters(k,requests[k])
+        isCancelled = lambda: self.parent.isStale(generation) or (self.parent.processpipe is not pp)
+
+        start = timer()
         cpp = True
-        if cpp:
-            img  = copy.deepcopy(self.parent.processpipe.getInputImage())
-            imgRes = hdrCore.coreC.coreCcompute(img, self.parent.processpipe)
-            self.parent.processpipe.setOutput(imgRes)
-            self.parent.readyToRun = True
-            self.parent.endCompute()
-        else:
-            start = timer()
-            self.parent.processpipe.compute()
-            dt = timer() - start
-            self.parent.readyToRun = True
-            self.parent.endCompute()
+        # frame: events of the preview computation (status bar breakdown, see hdrCore.profiling)
+        with hdrCore.profiling.profiler().frame('preview', coalesced=measure.get('coalesced', None)) as args:
+            if cpp:
+                done = False
+                if not isCancelled():
+                    img  = copy.deepcopy(pp.getInputImage())
+                    imgRes = hdrCore.coreC.coreCcompute(img, pp)
+                    # result of a stale computation (or of another processpipe) is dropped
+                    if not isCancelled():
+                        pp.setOutput(imgRes)
+                        done = True
+            else:
+                done = pp.compute(isCancelled=isCancelled)
+            args['cancelled'] = not done
+        measure['compute'] = timer() - start
+
+        self.parent.endCompute(generation, done, measure)
 # -----------------------------------------------------------------------------
 # --- Class RequestLoadImage --------------------------------------------------
 # -----------------------------------------------------------------------------
 class RequestLoadImage(object):
     """
-    manage parallel (multithreading) computation of loading images:
-        - uses a new thread to load each image.
-        - calls parent with process-pipe associated to loaded image
+    manage parallel (multithreading) loading of gallery images:
+        - uses a runnable (RunLoadImage) to load each image in the GALLERY pool,
+        - images of the current page are loaded first, images of the next and previous pages are prefetched at lower priority,
+        - when page changes, loads that are not yet started and no longer wanted are removed from queue,
+        - loaded process-pipes are stored in parent even if their page is no longer displayed (page shown instantly later),
+        - failed loads are retried with exponential backoff, up to maxRetries (QTimer of GUI thread),
+        - loads end in pool threads: view and status bar are updated in the GUI thread (see GuiInvoker).
+
+    Class Attributes:
+        prefetchPages (int): number of pages prefetched after and before the current page
+        maxRetries (int): number of retries before a failed image is given up
+        backoff (float): delay (second) before first retry, doubled at each failure
+        maxBackoff (float): maximum delay (second) between retries
+
     Attributes:
         parent (guiQt.model.ImageGalleryModel): reference to parent, used to callback parent when processing is over.
-        pool (QThreadPool): Qt thread pool.
-        requestsDone (Dict): key is index of image in page 
-            requestsDone[requestsDone]= True when image is loaded
+        pool (guiQt.thread.ThreadPools): application thread pools.
+        lock (threading.Lock): protects wanted, inFlight and failures
+        wanted (set): indexes of images of current and prefetched pages
+        inFlight (dict): key is image index, value is runnable submitted to pool
+        failures (dict): key is image index, value is (number of failures, time of next retry)
+        width (int): width of gallery cell
 
     Methods:
+        requestPage
         requestLoad
+        isWanted
         endLoadImage
-
+        showImage
+        retry
+        reset
     """
 
+    prefetchPages = 1
+    maxRetries =    5
+    backoff =       0.5
+    maxBackoff =    30.0
+
     def __init__(self, parent):
 
         self.parent = parent
-        self.pool = QThreadPool.globalInstance()        # get a global pool
-        self.requestsDone = {}
+        self.pool = threadPools()                       # get application pools
+        self.lock = threading.Lock()
+        self.wanted = set()
+        self.inFlight = {}
+        self.failures = {}
+        self.width = hdrCore.processing.ProcessPipe.maxSize
+
+    def reset(self):
+        """cancel all loads not yet started and clear failure cache (called when image list changes)."""
+        with self.lock:
+            for tracked in self.inFlight.values(): self.pool.tryTake(tracked)
+            self.wanted, self.inFlight, self.failures = set(), {}, {}
+
+    def requestPage(self, nb, nbImagePage, width):
+        """request loading of page nb, prefetch next and previous pages at lower priority.
 
-    def requestLoad(self, minIdxInPage, imgIdxInPage, filename):
+            Args:
+                nb (int, Required): page number
+                nbImagePage (int, Required): number of images per page
+                width (int, Required): width of gallery cell (images are rendered at this size)
         """
-        Args:
-            minIdxInPage (int, Required): image/processpipe index of first image in page.
-            imgIdxInPage (int, Required): index of image/processpipe in the current page. 
-            filename     (str, Required): image filename.
+        nbImages = len(self.parent.imageFilenames)
+        nbPages = ((nbImages-1)//nbImagePage) + 1 if nbImages > 0 else 0
 
-        Returns:
-            
-        """
-        self.requestsDone[minIdxInPage+ imgIdxInPage] = False
-        self.pool.start(RunLoadImage(self,minIdxInPage, imgIdxInPage,filename))
+        # current page first, then prefetched pages from the nearest
+        pages = [(nb, 1)]
+        for d in range(1, RequestLoadImage.prefetchPages+1):
+            for p in (nb+d, nb-d):
+                if nbPages > 0: pages.append((p % nbPages, 0))
+
+        requests, wanted = [], set()
+        for p, order in pages:
+            for idx in range(p*nbImagePage, min((p+1)*nbImagePage, nbImages)):
+                if idx not in wanted:
+                    wanted.add(idx)
+                    requests.append((idx, order))
+
+        with self.lock:
+            self.wanted = wanted
+
+            # remove from queue images that are no longer wanted (already running ones end and are stored)
+            for idx in list(self.inFlight.keys()):
+                if (idx not in self.wanted) and self.pool.tryTake(self.inFlight[idx]): del self.inFlight[idx]
+
+        self.width = width
+        for idx, order in requests:
+            if self.parent.needsLoad(idx, width): self.requestLoad(idx, order)
 
-    def endLoadImage(self,error,idx0, idx,processPipe, filename):
-        """called when loading is over or failed (IOError, ValueError).
-            Set process-pipe into parent (guiQt.model.ImageGalleryModel) then update view.
-            If loading failed (IOError, ValueError) recall self.requestLoad()
+    def requestLoad(self, idx, order=1):
+        """request loading of image idx if not already loaded, loading or waiting for retry.
+
+            Args:
+                idx (int, Required): index of image/processpipe
+                order (int, Optionnal): priority in the pool (1: current page, 0: prefetch)
+
+            Returns:
+                (bool): True if a load has been submitted
+        """
+        with self.lock:
+            if idx in self.inFlight: return False
+            if idx in self.failures:
+                nbFailures, nextRetry = self.failures[idx]
+                if (nbFailures > RequestLoadImage.maxRetries) or (timer() < nextRetry): return False
+            filename = self.parent.imageFilenames[idx]
+            self.inFlight[idx] = self.pool.start(RunLoadImage(self, idx, filename, self.width), Priority.GALLERY, order)
+        return True
+
+    def isWanted(self, idx):
+        """returns True if image idx belongs to current or prefetched pages."""
+        return idx in self.wanted
+
+    def endLoadImage(self, error, idx, processPipe, filename):
+        """called (pool thread) when loading is over, failed (IOError, ValueError) or skipped.
+            Set process-pipe into parent (guiQt.model.ImageGalleryModel) then view is updated in GUI thread (showImage).
+            If loading failed, a retry is scheduled with exponential backoff.
 
         Args:
             error           (bool, Required): True if loading failed (take into account ValueError).
-            idx0            (int, Required): image/processpipe index of first image in page.
-            idx             (int, Required): index of image/processpipe in the current page.
-            processPipe     (hrdCore.processing.ProcessPipe, Required):  process-pipe associated to loaded image.
+            idx             (int, Required): index of image/processpipe.
+            processPipe     (guiQt.model.ThumbnailProcessPipe, Required):  rendered gallery image, None if failed or skipped.
             filename        (str, Required): filename of image
 
         Returns:
         """
-        if not error:
-            self.requestsDone[idx0 + idx] = True
-            self.parent.processPipes[idx0 + idx]= processPipe
-            self.parent.controller.view.updateImage(idx,processPipe, filename)
-        else:
-            self.requestLoad(idx0, idx, filename)
+        with self.lock:
+            self.inFlight.pop(idx, None)
+            if error:
+                nbFailures = self.failures.get(idx, (0, 0.0))[0] + 1
+                delay = min(RequestLoadImage.backoff*(2**(nbFailures-1)), RequestLoadImage.maxBackoff)
+                self.failures[idx] = (nbFailures, timer() + delay)
+            else:
+                self.failures.pop(idx, None)
+
+        if error:
+            if nbFailures > RequestLoadImage.maxRetries:
+                message = "loading of image "+filename+" failed!"
+                invokeInGui(lambda: self.parent.controller.parent.statusBar().showMessage(message))
+            else:
+                # timer of GUI thread (event loop)
+                invokeInGui(QTimer.singleShot, int(delay*1000), functools.partial(self.retry, idx))
+        elif processPipe:
+            if idx < len(self.parent.processPipes) and self.parent.imageFilenames[idx] == filename:
+                self.parent.setProcessPipe(idx, processPipe)
+                invokeInGui(self.showImage, idx, processPipe, filename)
+
+    def showImage(self, idx, processPipe, filename):
+        """update view (GUI thread) with a loaded image if it is still in current page."""
+        if not (idx < len(self.parent.processPipes) and self.parent.imageFilenames[idx] == filename): return  # image list changed
+        processPipe = self.parent.processPipes[idx]     # stored one: a resident process-pipe is never replaced by a thumbnail
+        if processPipe == None: return
+        minIdx, maxIdx = self.parent.controller.pageIdx()
+        if minIdx <= idx < maxIdx:
+            self.parent.controller.view.updateImage(idx - minIdx, processPipe, filename)
+            aestheticsCompute().request(processPipe, order=0)   # precompute aesthetics of displayed page
+
+    def retry(self, idx):
+        """retry loading of image idx if it is still wanted (called by backoff timer, GUI thread)."""
+        if self.isWanted(idx) and (idx < len(self.parent.processPipes)) and self.parent.needsLoad(idx, self.width):
+            self.requestLoad(idx)
 # -----------------------------------------------------------------------------
 # --- Class RunLoadImage ------------------------------------------------------
 # -----------------------------------------------------------------------------
 class RunLoadImage(QRunnable):
-    def __init__(self,parent, minIdxInPage, imgIdxInPage, filename):
+    def __init__(self,parent, idx, filename, width):
         """
         Args:
+            parent (guiQt.thread.RequestLoadImage, Required): called when loading is over
+            idx (int, Required): index of image/processpipe
+            filename (str, Required): image filename
+            width (int, Required): width of gallery cell
 
         Returns:
         """
         super().__init__()
         self.parent = parent
-        self.minIdxInPage = minIdxInPage
-        self.imgIdxInPage = imgIdxInPage
+        self.idx = idx
         self.filename = filename
+        self.width = width
 
     def run(self):
         """
@@ -232,85 +636,113 @@ class RunLoadImage(QRunnable):
 
         Returns:
         """
+        # page changed while waiting in queue: skip
+        if not self.parent.isWanted(self.idx):
+            self.parent.endLoadImage(False, self.idx, None, self.filename)
+            return
         try:
-            image_ = hdrCore.image.Image.read(self.filename, thumb=True)
-            processPipe = model.EditImageModel.buildProcessPipe()
-            processPipe.setImage(image_)                      
-            processPipe.compute()
-            self.parent.endLoadImage(False, self.minIdxInPage, self.imgIdxInPage, processPipe, self.filename)
+            # gallery render path: the editing process-pipe is built when image is selected
+            thumbnail = model.ThumbnailProcessPipe.render(self.filename, self.width)
+            self.parent.endLoadImage(False, self.idx, thumbnail, self.filename)
         except(IOError, ValueError) as e:
-            self.parent.endLoadImage(True, self.minIdxInPage, self.imgIdxInPage, None, self.filename)
+            self.parent.endLoadImage(True, self.idx, None, self.filename)
+# -----------------------------------------------------------------------------
+# --- Class RequestRestoreProcessPipe -----------------------------------------
+# -----------------------------------------------------------------------------
+class RequestRestoreProcessPipe(object):
+    """
+    build the editing process-pipe of a selected gallery image (guiQt.model.ImageGalleryModel.restoreProcessPipe) in the
+    INTERACTIVE pool: the GUI is not blocked, the callback is called in the GUI thread.
+
+    Attributes:
+        parent (guiQt.model.ImageGalleryModel): gallery model
+        idx (int): index of image/processpipe
+        thumbnail (guiQt.model.ThumbnailProcessPipe): gallery image
+        callBack (function): called (GUI thread) with (idx, hdrCore.processing.ProcessPipe)
+
+    Methods:
+        endRestore
+    """
+
+    def __init__(self, parent, idx, thumbnail, callBack):
+        self.parent = parent
+        self.idx = idx
+        self.thumbnail = thumbnail
+        self.callBack = callBack
+        threadPools().start(RunRestoreProcessPipe(self), Priority.INTERACTIVE, 1)
+
+    def endRestore(self, processPipe):
+        if processPipe: invokeInGui(self.callBack, self.idx, processPipe)
+# -----------------------------------------------------------------------------
+# --- Class RunRestoreProcessPipe ---------------------------------------------
+# -----------------------------------------------------------------------------
+class RunRestoreProcessPipe(QRunnable):
+    def __init__(self, parent):
+        super().__init__()
+        self.parent = parent
+
+    def run(self):
+        # a newer selection has been requested meanwhile: skip
+        if self.parent.parent.pendingSelection != self.parent.idx: return
+        try:
+            processPipe = self.parent.parent.restoreProcessPipe(self.parent.idx, self.parent.thumbnail)
+        except (IOError, ValueError) as e:
+            trace.warning('THREAD', "RunRestoreProcessPipe(",self.parent.thumbnail.filename,"): failed",repr(e))
+            processPipe = None
+        self.parent.endRestore(processPipe)
 # -----------------------------------------------------------------------------
 # --- Class pCompute ----------------------------------------------------------
 # -----------------------------------------------------------------------------
 class pCompute(object):
     """
-    manage parallel (multithreading) computation of processpipe.compute when display HDR image or export HDR image:
-        - the image is split into multiple parts (called splits), then multithreading processing is started for each split,
-        - when all  computations of the splits are over, the processed splits are merge (note that geometry processing computation is processed after merging)
+    manage parallel (multiprocessing) computation of processpipe when display HDR image or export HDR image:
+        - the input image is computed by hdrCore.executor.TileExecutor: image in shared memory, tiles computed by worker processes
+          that receive only process-pipe parameters and tile coordinates,
+        - geometry process-node is computed after merging,
         - the parent callback function is called with the processed image (tone-mapped or not according to constructor parameters)
 
     Attributes:
         callBack (function): function called when processing is over.
         progress (function): function called to display processing progress.
-        nbSplits (int): number of image splits
-        nbDone (int): for which the computation is over. 
-        geometryNode (hdrCore.process.ProcessNode): geometry process node which compuation is done at the end.
         meta (hdrCore.metadata.metadata): metadata of processpipe input image.
+        isCancelled (function): checked between tiles, callBack is not called if it returns True.
+        backend (str): 'python' process-nodes (hdrCore.processing), 'cpp' fused C++ engine (hdrCore.coreC)
 
     Methods:
+        cancelled
         endCompute
     """
 
-    def __init__(self, callBack, processpipe,nbWidth,nbHeight, toneMap=True, progress=None, meta=None):
+    def __init__(self, callBack, processpipe,nbWidth=None,nbHeight=None, toneMap=True, progress=None, meta=None, isCancelled=None, backend='python'):
+        """
+        Args:
+            nbWidth, nbHeight (int, Optionnal): not used any more, tiling is done by hdrCore.executor.TileExecutor
+        """
         self.callBack = callBack
         self.progress =progress
-        self.nbSplits = nbWidth*nbHeight
-        self.nbDone = 0
-        self.geometryNode = None
         self.meta = meta
-        # recover and split image
-        input =  processpipe.getInputImage()
+        self.isCancelled = isCancelled
+        self.backend = backend
 
-        # store last processNode (geometry) and remove it from processpipe
-        if isinstance(processpipe.processNodes[-1].process,hdrCore.processing.geometry):
-            self.geometryNode = copy.deepcopy(processpipe.processNodes[-1]) 
+        self.pool = threadPools()
+        self.pool.start(pRun(self,processpipe,toneMap), Priority.DISPLAY)
 
-            # remove geometry node (the last one) 
-            processpipe.processNodes = processpipe.processNodes[:-1]
-       
-        # split image and store splited images
-        self.splits = input.split(nbWidth,nbHeight)
-
-        self.pool = QThreadPool.globalInstance() 
-
-        # duplicate processpipe, set image split and start
-        for idxY,line in enumerate(self.splits):
-            for idxX,split in enumerate(line):
-                pp = copy.deepcopy(processpipe)
-                pp.setImage(split)
-                # start compute
-                self.pool.start(pRun(self,pp,toneMap,idxX,idxY))
+    def cancelled(self):
+        """returns True if the computation has been cancelled.
+        """
+        return bool(self.isCancelled and self.isCancelled())
 
-    def endCompute(self,idx,idy, split):
+    def endCompute(self, img):
         """
         Args:
+            img (hdrCore.image.Image): processed image, None if computation has been cancelled
 
         Returns:
         
         """
-        self.splits[idy][idx]= copy.deepcopy(split)
-        self.nbDone += 1
-        if self.progress:
-            percent = str(int(self.nbDone*100/self.nbSplits))+'%'
-            self.progress('HDR image process-pipe computation:'+percent)
-        if self.nbDone == self.nbSplits:
-            res = hdrCore.image.Image.merge(self.splits)
-            # process geometry
-            if self.geometryNode:
-                res = self.geometryNode.process.compute(res,**self.geometryNode.params)
-            # callBack caller
-            self.callBack(res, self.meta)
+        if self.cancelled() or (img == None): return
+        # callBack caller
+        self.callBack(img, self.meta)
 # -----------------------------------------------------------------------------
 # --- Class pRun --------------------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -321,13 +753,12 @@ class pRun(QRunnable):
         Returns:
         
     """
-    def __init__(self,parent,processpipe,toneMap, idxX,idxY):
+    def __init__(self,parent,processpipe,toneMap):
         """
         """
         super().__init__()
         self.parent = parent
         self.processpipe = processpipe
-        self.idx = (idxX,idxY)
         self.toneMap = toneMap
 
     def run(self):
@@ -337,9 +768,40 @@ class pRun(QRunnable):
         Returns:
         
         """
-        self.processpipe.compute()
-        pRes = self.processpipe.getImage(toneMap=self.toneMap)
-        self.parent.endCompute(self.idx[0],self.idx[1], pRes)
+        pRes = executeProcessPipe(self.processpipe, self.toneMap, backend=self.parent.backend, 
+                                  progress=self.parent.progress, isCancelled=self.parent.cancelled, geometry=True)
+        self.parent.endCompute(pRes)
+# -----------------------------------------------------------------------------
+# --- executeProcessPipe ------------------------------------------------------
+# -----------------------------------------------------------------------------
+def executeProcessPipe(processpipe, toneMap, backend='cpp', progress=None, isCancelled=None, geometry=False):
+    """compute the input image of processpipe with hdrCore.executor.TileExecutor (worker processes, shared memory),
+    processpipe is not modified.
+
+        Args:
+            processpipe (hdrCore.processing.ProcessPipe, Required): process-pipe with (full size) input image
+            toneMap (bool, Required): output image is tone mapped
+            backend (str, Optionnal): 'cpp' or 'python'
+            progress (function, Optionnal): called with progress message
+            isCancelled (function, Optionnal): computation is abandoned if it returns True
+            geometry (bool, Optionnal): compute geometry process-node after merging
+
+        Returns:
+            (hdrCore.image.Image): None if cancelled
+    """
+    showProgress = (lambda percent: progress('HDR image process-pipe computation:'+str(percent)+'%')) if progress else None
+
+    plan = processpipe.compile()
+    res = hdrCore.executor.tileExecutor().compute(processpipe.getInputImage(), plan.toDict(), 
+                                                  backend=backend, progress=showProgress, isCancelled=isCancelled)
+    if res == None: return None
+
+    if geometry and plan.geometryNode: res = plan.geometryNode[0].compute(res,**plan.geometryNode[1])
+
+    # output set to a clone: processpipe is not modified
+    output = processpipe.clone()
+    output.setOutput(res)
+    return output.getImage(toneMap=toneMap)
 # -----------------------------------------------------------------------------
 # -----------------------------------------------------------------------------
 
@@ -347,18 +809,30 @@ class pRun(QRunnable):
 # --- Class cCompute ----------------------------------------------------------
 # -----------------------------------------------------------------------------
 class cCompute(object):
-    """xxx
     """
+    computation of processpipe with the C++ core (fixed process-pipe, geometry excepted) when display HDR image or export HDR image:
+    the input image is split into tiles computed by worker processes (see hdrCore.executor.TileExecutor).
+    When filename is given, the render is read from the render cache (see hdrCore.cache) or submitted to the local 
+    render daemon if it is running (see hdrCore.daemon), otherwise the image is read (and resized) in the thread then computed.
+    When target (HDR display) is given, the output is clipped and scaled to the display (cached render).
+    The render context (hdrCore.processing.RenderContext) gives input size and backend of the computation.
 
-    def __init__(self, callBack, processpipe, toneMap=True, progress=None):
+    Attributes:
+        callBack (function): function called with processed image when processing is over.
+        progress (function): function called to display processing progress.
+        context (hdrCore.processing.RenderContext): render context (default: full size, C++ core)
+
+    Methods:
+        endCompute
+    """
+
+    def __init__(self, callBack, processpipe, toneMap=True, progress=None, filename=None, size=None, target=None, context=None):
         self.callBack = callBack
         self.progress =progress
+        self.context = context if context else hdrCore.processing.RenderContext.full()
 
-        # recover image
-        input =  processpipe.getInputImage()
-
-        self.pool = QThreadPool.globalInstance() 
-        self.pool.start(cRun(self,processpipe,toneMap))
+        self.pool = threadPools()
+        self.pool.start(cRun(self,processpipe,toneMap,filename,size,target), Priority.DISPLAY)
 
     def endCompute(self, img):
         """
@@ -378,13 +852,34 @@ class cRun(QRunnable):
         Returns:
         
     """
-    def __init__(self,parent,processpipe,toneMap):
+    def __init__(self,parent,processpipe,toneMap,filename=None,size=None,target=None):
         """
         """
         super().__init__()
         self.parent = parent
         self.processpipe = processpipe
         self.toneMap = toneMap
+        self.filename = filename
+        self.size = size
+        self.target = target
+
+    def renderDaemon(self):
+        """submit render to local render daemon.
+
+        Returns:
+            (hdrCore.image.Image): None if daemon is not running or fails
+        """
+        client = hdrCore.daemon.RenderClient.connect()
+        if not client: return None
+        try:
+            if self.parent.progress: self.parent.progress('HDR image process-pipe computation: render daemon')
+            res = client.render(self.filename, self.processpipe.toDict(), size=self.size, backend=self.parent.context.backend)
+            self.processpipe.setOutput(res)
+            return self.processpipe.getImage(toneMap=self.toneMap)
+        except (RuntimeError, EOFError, OSError) as e:
+            trace.warning('THREAD', "cRun.renderDaemon(",self.filename,"): failed",e)
+            return None
+        finally: client.close()
 
     def run(self):
         """
@@ -393,126 +888,310 @@ class cRun(QRunnable):
         Returns:
         
         """
-        img  = copy.deepcopy(self.processpipe.getInputImage())
-        imgRes = hdrCore.coreC.coreCcompute(img, self.processpipe)
-        self.processpipe.setOutput(imgRes)
-
-        pRes = self.processpipe.getImage(toneMap=self.toneMap)
+        pRes, cache, key = None, None, None
+        if self.filename:
+            cache = hdrCore.cache.renderCache()
+            key = cache.key(self.filename, self.processpipe.toDict(), self.size, self.target['tag'] if self.target else None, 
+                            geometry=False, backend=self.parent.context.backend, toneMap=self.toneMap)
+            pRes = cache.get(key, self.filename)
+            if pRes != None:
+                self.parent.endCompute(pRes)
+                return
+
+            pRes = self.renderDaemon()
+            if pRes == None:
+                img = hdrCore.image.Image.read(self.filename)
+                if self.size: img = img.process(hdrCore.processing.resize(),size=(None, self.size))
+                self.processpipe.setImage(img, self.parent.context)
+        if pRes == None: pRes = executeProcessPipe(self.processpipe, self.toneMap, backend=self.parent.context.backend, progress=self.parent.progress)
+
+        if self.target:
+            # clip, scale
+            pRes = pRes.process(hdrCore.processing.clip())
+            pRes.colorData = pRes.colorData*self.target['scaling']
+        if cache: cache.put(key, pRes)
         self.parent.endCompute(pRes)
 # -----------------------------------------------------------------------------
 # -----------------------------------------------------------------------------
 
 # -----------------------------------------------------------------------------
-# --- Class RequestAestheticsCompute ----------------------------------------------------
+# --- Class RequestBatchExport ------------------------------------------------
 # -----------------------------------------------------------------------------
-class RequestAestheticsCompute(object):
+class RequestBatchExport(object):
     """
-    manage parallel (multithreading) computation of processpipe.compute() when editing image (not used for display HDR or export HDR):
-        - uses a single/specific thread to compute process-pipe,
-        - store compute request when user changes editing values, restart process-pipe computing when the previous one is finished.
+    run a batch export (hdrCore.batch.BatchExporter) in the BATCH pool: the GUI is not blocked, 
+    exports are computed by worker processes. callBack and progress update widgets: they are called in the GUI thread
+    (see GuiInvoker).
 
     Attributes:
-        parent (guiQt.model.EditImageModel): reference to parent, used to callback parent when processing is over.
-        requestDict (dict): dict that stores editing values.
-        pool (QThreadPool): Qt thread pool.
-        processpipe (hdrCore.processing.Processpipe): active processpipe.
-        readyToRun (bool): True when no processing is ongoing, else False.
-        waitingUpdate (bool): True if requestCompute has been called during a processing.
+        callBack (function): function called (GUI thread) with the batch report (dict) when all jobs are over.
+        progress (function): function called (GUI thread) with progress message for each job.
+        exporter (hdrCore.batch.BatchExporter): job queue
+        cancelled (bool): remaining jobs are cancelled when True
 
     Methods:
-        setProcessPipe
-        requestCompute
-        endCompute
+        cancel
+        jobProgress
+        endExport
     """
 
+    def __init__(self, callBack, jobs, progress=None):
+        self.callBack = callBack
+        self.progress = progress
+        self.cancelled = False
+        self.exporter = hdrCore.batch.BatchExporter(jobs, progress=self.jobProgress, isCancelled=lambda: self.cancelled)
+
+        self.pool = threadPools()
+        self.pool.start(RunBatchExport(self), Priority.BATCH)
+
+    def cancel(self): self.cancelled = True
+
+    def jobProgress(self, job, nbDone, nbJobs):
+        """called when a job is over."""
+        if self.progress:
+            status = 'done' if job.status == 'done' else 'FAILED ('+str(job.error)+')'
+            invokeInGui(self.progress, 'exporting HDR images ('+str(nbDone)+'/'+str(nbJobs)+', '+str(self.exporter.nbWorkers)+' workers): '+job.filename+' '+status)
+
+    def endExport(self):
+        invokeInGui(self.callBack, self.exporter.report())
+# -----------------------------------------------------------------------------
+# --- Class RunBatchExport ----------------------------------------------------
+# -----------------------------------------------------------------------------
+class RunBatchExport(QRunnable):
     def __init__(self, parent):
+        super().__init__()
+        self.parent = parent
+
+    def run(self):
+        self.parent.exporter.run()
+        self.parent.endExport()
+# -----------------------------------------------------------------------------
+# --- Class RequestBatchAutoToneCurve -----------------------------------------
+# -----------------------------------------------------------------------------
+class RequestBatchAutoToneCurve(object):
+    """
+    run an auto tone curve of a set of images (hdrCore.batch.BatchAutoToneCurve) in the BATCH pool: the GUI is not blocked,
+    histograms are computed from thumbnails then tone curves are predicted in a single inference.
+    callBack and progress update widgets: they are called in the GUI thread (see GuiInvoker).
+
+    Attributes:
+        callBack (function): function called (GUI thread) with the hdrCore.batch.BatchAutoToneCurve when it is over.
+        progress (function): function called (GUI thread) with progress message.
+        autoTone (hdrCore.batch.BatchAutoToneCurve): images, histograms and predicted tone curves
+        cancelled (bool): remaining histograms are abandoned when True
+
+    Methods:
+        cancel
+        histogramProgress
+        endAutoToneCurve
+    """
+
+    def __init__(self, callBack, autoTone, progress=None):
+        self.callBack = callBack
+        self.progress = progress
+        self.cancelled = False
+        self.autoTone = autoTone
+        self.autoTone.progress = self.histogramProgress
+        self.autoTone.isCancelled = lambda: self.cancelled
+
+        self.pool = threadPools()
+        self.pool.start(RunBatchAutoToneCurve(self), Priority.BATCH)
+
+    def cancel(self): self.cancelled = True
 
+    def histogramProgress(self, nbDone, nbImages):
+        """called when a histogram is computed."""
+        if self.progress: invokeInGui(self.progress, 'auto tone curve: histograms ('+str(nbDone)+'/'+str(nbImages)+')')
+
+    def endAutoToneCurve(self):
+        invokeInGui(self.callBack, self.autoTone)
+# -----------------------------------------------------------------------------
+# --- Class RunBatchAutoToneCurve ---------------------------------------------
+# -----------------------------------------------------------------------------
+class RunBatchAutoToneCurve(QRunnable):
+    def __init__(self, parent):
+        super().__init__()
         self.parent = parent
 
-        self.requestDict= {} # store resqustCompute key:processNodeId, value: processNode params
+    def run(self):
+        self.parent.autoTone.run()
+        self.parent.endAutoToneCurve()
+# -----------------------------------------------------------------------------
+# --- Class RequestAestheticsCompute ------------------------------------------
+# -----------------------------------------------------------------------------
+class RequestAestheticsCompute(object):
+    """
+    background computation of image aesthetics models (hdrCore.aesthetics.MultidimensionalImageAestheticsModel: color palette),
+    never on GUI thread (image selection is not blocked):
+        - results are cached per image and process-pipe parameters, most recently used entries are kept (maxEntries),
+        - requests of selected image are computed first, images of gallery page are precomputed at lower priority,
+          in the BATCH pool that yields to interactive computation (idle time),
+        - a result is computed once even if requested several times during its computation,
+        - callbacks are called in the GUI thread (see invokeInGui), they can update widgets.
 
-        self.pool = QThreadPool.globalInstance()        # get global pool
-        self.processpipe = None                         # processpipe ref
+    Class Attributes:
+        maxEntries (int): number of cached results
 
-        self.readyToRun = True
-        self.waitingUpdate = False
+    Attributes:
+        pool (guiQt.thread.ThreadPools): application thread pools.
+        lock (threading.Lock): protects cache and inFlight
+        cache (collections.OrderedDict): key (see key), value: aesthetics models, least recently used first
+        inFlight (dict): key: key of result being computed, value: list of callbacks
 
-    def setProcessPipe(self,pp):
-        """set the current active processpipe.
+    Methods:
+        key
+        source
+        get
+        request
+        requestPage
+        endCompute
+
+    Static methods:
+        key
+        source
+    """
+
+    maxEntries = 256
+
+    def __init__(self):
+
+        self.pool = threadPools()                       # get application pools
+        self.lock = threading.Lock()
+        self.cache = collections.OrderedDict()
+        self.inFlight = {}
+
+    @staticmethod
+    def key(processPipe):
+        """returns cache key of aesthetics models of a process-pipe: image name and process-pipe parameters.
 
             Args:
-                pp (hrdCore.processing.ProcessPipe, Required)
+                processPipe (hdrCore.processing.ProcessPipe or guiQt.model.ThumbnailProcessPipe, Required)
 
             Returns:
-                
+                (tuple)
         """
-        self.processpipe = pp
-    
-    def requestCompute(self, id, params):
-        """send new parameters for a process-node and request a new processpipe computation.
+        if isinstance(processPipe, hdrCore.processing.ProcessPipe): name = processPipe.getName()
+        else: name = processPipe.getImage().name
+        return (name, json.dumps(processPipe.toDict(), sort_keys=True, default=repr))
+
+    @staticmethod
+    def source(processPipe):
+        """returns image aesthetics are computed from: output of last process-node (editing process-pipe) or thumbnail (gallery).
 
             Args:
-                id (int, Required): index of process-node in processpipe
-                params (dict, Required): parameters of process-node 
+                processPipe (hdrCore.processing.ProcessPipe or guiQt.model.ThumbnailProcessPipe, Required)
 
             Returns:
-                
+                (hdrCore.image.Image): None if process-pipe is not computed
         """
-        self.requestDict[id] = copy.deepcopy(params)
+        if isinstance(processPipe, hdrCore.processing.ProcessPipe): return processPipe.processNodes[-1].outputImage
+        return processPipe.getImage()
 
-        if self.readyToRun:
-            # start processing processpipe
-            self.pool.start(RunAestheticsCompute(self))
-        else:
-            # if a computation is already running
-            self.waitingUpdate = True
+    def get(self, processPipe):
+        """returns cached aesthetics models of process-pipe, None if not computed.
 
-    def endCompute(self):
-        """called when process-node computation is finished.
-            Get processed image and send it to parent (guiQt.model.EditImageModel).
-            If there are new requestCompute, restart computation of processpipe
+            Args:
+                processPipe (hdrCore.processing.ProcessPipe or guiQt.model.ThumbnailProcessPipe, Required)
 
-        Args:
+            Returns:
+                (hdrCore.aesthetics.MultidimensionalImageAestheticsModel)
+        """
+        key = RequestAestheticsCompute.key(processPipe)
+        with self.lock:
+            if key in self.cache: self.cache.move_to_end(key)
+            return self.cache.get(key, None)
 
-        Retruns:
+    def request(self, processPipe, callback=None, order=1):
+        """returns cached aesthetics models, or requests their background computation and returns None.
+
+            Args:
+                processPipe (hdrCore.processing.ProcessPipe or guiQt.model.ThumbnailProcessPipe, Required)
+                callback (function, Optionnal): called in the GUI thread with (key, aesthetics models) when computation is over (None if failed)
+                order (int, Optionnal): priority in pool (1: selected image, 0: gallery precomputation)
 
+            Returns:
+                (hdrCore.aesthetics.MultidimensionalImageAestheticsModel)
+        """
+        img = RequestAestheticsCompute.source(processPipe)
+        if img == None: return None
+        key = RequestAestheticsCompute.key(processPipe)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            if key in self.inFlight:
+                if callback: self.inFlight[key].append(callback)
+                return None
+            self.inFlight[key] = [callback] if callback else []
+        self.pool.start(RunAestheticsCompute(self, key, img), Priority.BATCH, order)
+        return None
+
+    def requestPage(self, processPipes):
+        """precompute aesthetics models of gallery page (lower priority than requests of selected image).
+
+            Args:
+                processPipes (list, Required): process-pipes (or thumbnails, None if not loaded) of page
+        """
+        for pp in processPipes:
+            if pp != None: self.request(pp, order=0)
+
+    def endCompute(self, key, models):
+        """called (from pool thread) when computation is over: store result then call callbacks in the GUI thread.
+
+            Args:
+                key (tuple, Required): cache key
+                models (hdrCore.aesthetics.MultidimensionalImageAestheticsModel, Required): result, None if computation failed
         """
-        imgTM = self.processpipe.getImage(toneMap=True)
-        self.parent.updateImage(imgTM)
-        if self.waitingUpdate:
-            self.pool.start(RunAestheticsCompute(self))
-            self.waitingUpdate = False
+        with self.lock:
+            callbacks = self.inFlight.pop(key, [])
+            if models != None:
+                self.cache[key] = models
+                while len(self.cache) > RequestAestheticsCompute.maxEntries: self.cache.popitem(last=False)
+        for callback in callbacks: invokeInGui(callback, key, models)
 # -----------------------------------------------------------------------------
-# --- Class RunCompute --------------------------------------------------------
+# --- Class RunAestheticsCompute ----------------------------------------------
 # -----------------------------------------------------------------------------
 class RunAestheticsCompute(QRunnable):
-    """defines the run method that executes on a dedicated thread: processpipe computation.
+    """defines the run method that executes on a pool thread: aesthetics models computation.
     
         Attributes:
-            parent (guiQt.thread.RequestCompute): parent called.endCompute() when processing is over.
+            parent (guiQt.thread.RequestAestheticsCompute): parent called.endCompute() when computation is over.
+            key (tuple): cache key
+            img (hdrCore.image.Image): image aesthetics are computed from
 
         Methods:
             run
     """
-    def __init__(self,parent):
+    def __init__(self, parent, key, img):
         super().__init__()
         self.parent = parent
+        self.key = key
+        self.img = img
 
     def run(self):
         """method called by the Qt Thread pool.
-            Calls parent.endCompute() when process is over.
-
-            Args:
-
-            Returns:
-
+            Calls parent.endCompute() when computation is over.
         """
-        self.parent.readyToRun = False
-        for k in self.parent.requestDict.keys(): self.parent.processpipe.setParameters(k,self.parent.requestDict[k])
-        start = timer()
-        self.parent.processpipe.compute()
-        dt = timer() - start
-        self.parent.readyToRun = True
-        self.parent.endCompute()
+        models = None
+        try:
+            with hdrCore.profiling.profiler().span('palette', 'aesthetics', inShape=self.img.shape):
+                models = hdrCore.aesthetics.MultidimensionalImageAestheticsModel(None)
+                models.add('palette', hdrCore.aesthetics.Palette.fromImage(self.img))
+        except (ValueError, MemoryError) as e:
+            trace.warning('PROCESS', "RunAestheticsCompute(",self.img.name,"): failed", e)
+            models = None
+        finally:
+            self.parent.endCompute(self.key, models)
+# -----------------------------------------------------------------------------
+__aestheticsCompute = None
+def aestheticsCompute():
+    """returns the application RequestAestheticsCompute (created at first call).
+
+        Returns:
+            (guiQt.thread.RequestAestheticsCompute)
+    """
+    global __aestheticsCompute
+    if not __aestheticsCompute: __aestheticsCompute = RequestAestheticsCompute()
+    return __aestheticsCompute
 # -----------------------------------------------------------------------------
 # -----------------------------------------------------------------------------
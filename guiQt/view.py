@@ -31,7 +31,7 @@ from PyQt5.QtWidgets import QSplitter, QFrame, QSlider, QCheckBox, QGroupBox
 from PyQt5.QtWidgets import QHBoxLayout, QVBoxLayout, QGridLayout, QLayout, QScrollArea, QFormLayout
 from PyQt5.QtWidgets import QPushButton, QTextEdit,QLineEdit, QComboBox, QSpinBox
 from PyQt5.QtWidgets import QAction, QProgressBar, QDialog
-from PyQt5.QtGui import QPixmap, QImage, QDoubleValidator
+from PyQt5.QtGui import QPixmap, QDoubleValidator
 from PyQt5.QtCore import Qt
 from PyQt5 import QtCore, QtWidgets 
 
@@ -46,8 +46,9 @@ import hdrCore.image, hdrCore.processing
 import math, enum
 import functools
 
-from . import controller, model
+from . import controller, model, display
 import hdrCore.metadata
+from hdrCore import trace
 import preferences.preferences as pref
 
 # ------------------------------------------------------------------------------------------
@@ -60,8 +61,9 @@ class ImageWidgetView(QWidget):
         super().__init__()
         self.controller = controller
         self.label = QLabel(self)   # create a QtLabel for pixmap
+        self.converter = display.DisplayConverter() # float to 8 bits conversion, buffers kept between updates
+        self.colorData = None       # displayed image (reference, converted again when widget is enlarged)
         if not isinstance(colorData, np.ndarray): colorData = ImageWidgetView.emptyImageColorData()
-        # self.colorData = colorData  # image content attributes           
         self.setPixmap(colorData)  
 
     def resize(self):
@@ -69,26 +71,27 @@ class ImageWidgetView(QWidget):
         self.label.setPixmap(self.imagePixmap.scaled(self.size(),Qt.KeepAspectRatio))
 
     def resizeEvent(self,event):
+        # conversion sized to widget: convert again if widget size requires an other image size
+        if isinstance(self.colorData, np.ndarray):
+            target = display.DisplayConverter.targetShape(self.colorData.shape, (self.width(), self.height()))
+            if target != (self.imagePixmap.height(), self.imagePixmap.width()): self.setPixmap(self.colorData)
         self.resize()
         super().resizeEvent(event)
 
     def setPixmap(self,colorData):
         if not isinstance(colorData, np.ndarray): 
             colorData = ImageWidgetView.emptyImageColorData()
-        # self.colorData = colorData
-        height, width, channel = colorData.shape   # compute pixmap
-        bytesPerLine = channel * width
-        # clip
-        colorData[colorData>1.0] = 1.0
-        colorData[colorData<0.0] = 0.0
-
-        qImg = QImage((colorData*255).astype(np.uint8), width, height, bytesPerLine, QImage.Format_RGB888) # QImage
-        self.imagePixmap = QPixmap.fromImage(qImg)
+        self.colorData = colorData
+
+        # image sampled to widget size (once visible), colorData is not modified
+        size = (self.width(), self.height()) if self.isVisible() else None
+        self.imagePixmap = QPixmap.fromImage(self.converter.convert(colorData, size))
         self.resize()
 
         return self.imagePixmap
 
     def setQPixmap(self, qPixmap):
+        self.colorData = None
         self.imagePixmap = qPixmap
         self.resize()
 
@@ -143,7 +146,7 @@ class ImageGalleryView(QSplitter):
 
     """
     def __init__(self,controller_=None,shapeMode=None):
-        if pref.verbose: print(" [VIEW] >> ImageGalleryView.__init__(",")")
+        trace.debug('VIEW', "ImageGalleryView.__init__(",")")
 
         super().__init__(Qt.Vertical)
 
@@ -196,8 +199,13 @@ class ImageGalleryView(QSplitter):
 
     def currentPage(self): return self.pageNumber
 
+    def cellWidth(self):
+        """returns width (pixel) of an image cell of the gallery."""
+        width = self.images.width() if self.images.isVisible() else hdrCore.processing.ProcessPipe.maxSize
+        return max(1, width//controller.GalleryMode.nbCol(self.shapeMode))
+
     def changePageNumber(self,step):
-        if pref.verbose: print(" [VIEW] >> ImageGalleryView.changePageNumber(",step,")")
+        trace.debug('VIEW', "ImageGalleryView.changePageNumber(",step,")")
 
         nbImagePerPage = controller.GalleryMode.nbRow(self.shapeMode)*controller.GalleryMode.nbCol(self.shapeMode)
         maxPage = ((len(self.controller.model.processPipes)-1)//nbImagePerPage) + 1
@@ -213,10 +221,10 @@ class ImageGalleryView(QSplitter):
                 self.pageNumber  = self.pageNumber+step
             self.updateImages()
             self.controller.model.loadPage(self.pageNumber)
-            if pref.verbose: print(" [VIEW] >> ImageGalleryView.changePageNumber(currentPage:",self.pageNumber," | max page:",maxPage,")")
+            trace.debug('VIEW', "ImageGalleryView.changePageNumber(currentPage:",self.pageNumber," | max page:",maxPage,")")
 
     def updateImages(self):
-        if pref.verbose: print(" [VIEW] >> ImageGalleryView.updateImages(",")")
+        trace.debug('VIEW', "ImageGalleryView.updateImages(",")")
 
         """ update images content """
         nbImagePerPage = controller.GalleryMode.nbRow(self.shapeMode)*controller.GalleryMode.nbCol(self.shapeMode)
@@ -232,14 +240,14 @@ class ImageGalleryView(QSplitter):
         self.pageNumberLabel.setText(str(self.pageNumber)+"/"+str(maxPage-1))
 
     def updateImage(self, idx, processPipe, filename):
-        if pref.verbose: print(" [VIEW] >> ImageGalleryView.updateImage(",")")
-        if (len(self.imagesControllers) <= idx):
+        trace.debug('VIEW', "ImageGalleryView.updateImage(",")")
+        if idx < len(self.imagesControllers):
             imageWidgetController = self.imagesControllers[idx]                                 
             imageWidgetController.setImage(processPipe.getImage())
             self.controller.parent.statusBar().showMessage("loading of image "+filename+" done!")
 
     def resetGridLayoutWidgets(self):
-        if pref.verbose: print(" [VIEW] >> ImageGalleryView.resetGridLayoutWidgets(",")")
+        trace.debug('VIEW', "ImageGalleryView.resetGridLayoutWidgets(",")")
 
         for w in self.imagesControllers:
             self.imagesLayout.removeWidget(w.view)
@@ -247,7 +255,7 @@ class ImageGalleryView(QSplitter):
         self.imagesControllers = []
 
     def buildGridLayoutWidgets(self):
-        if pref.verbose: print(" [VIEW] >> ImageGalleryView.buildGridLayoutWidgets(",")")
+        trace.debug('VIEW', "ImageGalleryView.buildGridLayoutWidgets(",")")
 
         imageIndex = 0
         for i in range(controller.GalleryMode.nbRow(self.shapeMode)): 
@@ -258,7 +266,7 @@ class ImageGalleryView(QSplitter):
                 imageIndex +=1
 
     def wheelEvent(self, event):
-        if pref.verbose: print(" [EVENT] >> ImageGalleryView.wheelEvent(",")")
+        trace.debug('EVENT', "ImageGalleryView.wheelEvent(",")")
 
         if event.angleDelta().y() < 0 :     
             self.changePageNumber(+1)
@@ -272,7 +280,7 @@ class ImageGalleryView(QSplitter):
         event.accept()
 
     def mousePressEvent(self,event):
-        if pref.verbose: print(" [EVENT] >> ImageGalleryView.mousePressEvent(",")")
+        trace.debug('EVENT', "ImageGalleryView.mousePressEvent(",")")
 
         # self.childAt(event.pos()) return QLabel .parent() should be ImageWidget object
         if isinstance(self.childAt(event.pos()).parent(),ImageWidgetView):
@@ -322,6 +330,7 @@ class AppView(QMainWindow):
         self.buildDisplayHDR()
         self.buildExport()
         self.buildPreferences()
+        self.buildProfiling()
     # ------------------------------------------------------------------------------------------
     def getImageGalleryController(self): return self.imageGalleryController
     # ------------------------------------------------------------------------------------------
@@ -353,6 +362,12 @@ class AppView(QMainWindow):
         selectSave.triggered.connect(self.controller.callBackSave)
         fileMenu.addAction(selectSave)
 
+        autoToneCurve = QAction('&Auto tone curve of all images', self)        
+        autoToneCurve.setShortcut('Ctrl+T')
+        autoToneCurve.setStatusTip('[File] predict tone curve of all images of directory')
+        autoToneCurve.triggered.connect(self.controller.callBackAutoToneCurveAll)
+        fileMenu.addAction(autoToneCurve)
+
         quit = QAction('&Quit', self)        
         quit.setShortcut('Ctrl+Q')
         quit.setStatusTip('[File] saving updates and quit')
@@ -449,8 +464,27 @@ class AppView(QMainWindow):
         iqa.triggered.connect(self.dock.activateMIAM)
         dockMenu.addAction(iqa)
     # ------------------------------------------------------------------------------------------
+    def buildProfiling(self):
+        menubar = self.menuBar()# get menubar
+        profilingMenu = menubar.addMenu('&Profiling')# profiling menu
+
+        showFrame = QAction('&Show computation time in status bar', self, checkable=True)
+        showFrame.setStatusTip('[Profiling] status bar shows time of last computation per process-node')
+        showFrame.toggled.connect(self.controller.callBackShowFrameProfile)
+        profilingMenu.addAction(showFrame)
+
+        export = QAction('&Export profile (Chrome trace)', self)        
+        export.setStatusTip('[Profiling] save Chrome trace JSON file and summary table of computation times')
+        export.triggered.connect(self.controller.callBackExportProfile)
+        profilingMenu.addAction(export)
+
+        reset = QAction('&Reset profile', self)        
+        reset.setStatusTip('[Profiling] drop recorded computation times')
+        reset.triggered.connect(self.controller.callBackResetProfile)
+        profilingMenu.addAction(reset)
+    # ------------------------------------------------------------------------------------------
     def closeEvent(self, event):
-        if pref.verbose: print(" [CB] >> AppView.closeEvent()>> ... closing")
+        trace.debug('CB', "AppView.closeEvent()>> ... closing")
         self.imageGalleryController.save()
         self.controller.hdrDisplay.close()
 # ------------------------------------------------------------------------------------------
@@ -458,7 +492,7 @@ class AppView(QMainWindow):
 # ------------------------------------------------------------------------------------------
 class ImageInfoView(QSplitter):
     def __init__(self, _controller):
-        if pref.verbose: print(" [VIEW] >> ImageInfoView.__init__(",")")
+        trace.debug('VIEW', "ImageInfoView.__init__(",")")
 
         super().__init__(Qt.Vertical)
 
@@ -522,7 +556,7 @@ class ImageInfoView(QSplitter):
     def setProcessPipe(self,processPipe): 
         image_ = processPipe.getImage()
         # ---------------------------------------------------
-        if pref.verbose: print(" [VIEW] >> ImageInfoView.setImage(",image_.name,")")
+        trace.debug('VIEW', "ImageInfoView.setImage(",image_.name,")")
         if image_.metadata.metadata['filename'] != None: self.imageName.setText(image_.metadata.metadata['filename'])
         else: self.imageName.setText(" ........ ")
         if image_.metadata.metadata['path'] != None: self.imagePath.setText(image_.metadata.metadata['path'])
@@ -610,7 +644,7 @@ class AdvanceCheckBox(object):
 class EditImageView(QSplitter):
 
     def __init__(self, _controller, build=False):
-        if pref.verbose: print(" [VIEW] >> EditImageView.__init__(",")")
+        trace.debug('VIEW', "EditImageView.__init__(",")")
         super().__init__(Qt.Vertical)
 
         self.controller = _controller
@@ -705,37 +739,37 @@ class EditImageView(QSplitter):
         self.setSizes([60,40])
 
     def setImage(self,image):
-        if pref.verbose: print(" [VIEW] >> EditImageView.setImage(",image.name,")")
+        trace.debug('VIEW', "EditImageView.setImage(",image.name,")")
         return self.imageWidgetController.setImage(image)
 
     def autoExposure(self):
-        if pref.verbose: print(" [CB] >> EditImageView.autoExposure(",")")
+        trace.debug('CB', "EditImageView.autoExposure(",")")
 
         self.controller.autoExposure()
         pass
 
     def changeExposure(self, value):
-        if pref.verbose: print(" [CB] >> EditImageView.changeExposure(",")")
+        trace.debug('CB', "EditImageView.changeExposure(",")")
 
         self.controller.changeExposure(value)
         pass
 
     def autoContrast(self):
-        if pref.verbose: print(" [CB] >> EditImageView.autoContrast(",")")
+        trace.debug('CB', "EditImageView.autoContrast(",")")
         pass
 
     def changeContrast(self, value):
-        if pref.verbose: print(" [CB] >> EditImageView.changeContrast(",")")
+        trace.debug('CB', "EditImageView.changeContrast(",")")
 
         self.controller.changeContrast(value)
         pass
 
     def autoSaturation(self):
-        print(" [CB] >> EditImageView.autoSaturation(",")")
+        trace.debug('CB', "EditImageView.autoSaturation(",")")
         pass
 
     def changeSaturation(self,value):   ### TO DO
-        if pref.verbose:  print(" [CB] >> EditImageView.changeSaturation(",")")
+        trace.debug('CB', "EditImageView.changeSaturation(",")")
         self.controller.changeSaturation(value)
 
     def plotToneCurve(self): self.tonecurve.plotCurve()
@@ -746,7 +780,7 @@ class EditImageView(QSplitter):
             recover parameters of processPipe
             and initialize view components
         """
-        if pref.verbose:  print(" [VIEW] >> EditImageView.setProcessPipe(",")")
+        trace.debug('VIEW', "EditImageView.setProcessPipe(",")")
 
         # exposure
         # recover value in pipe and restore it
@@ -818,7 +852,7 @@ class EditImageView(QSplitter):
 # ------------------------------------------------------------------------------------------
 class MultiDockView(QDockWidget):
     def __init__(self, _controller, HDRcontroller=None):
-        if pref.verbose:  print(" [VIEW] >> MultiDockView.__init__(",")")
+        trace.debug('VIEW', "MultiDockView.__init__(",")")
 
         super().__init__("Image Edit/Info")
         self.controller = _controller
@@ -842,7 +876,7 @@ class MultiDockView(QDockWidget):
             nb = 1 > image info and metadata dock
             nb = 2 > image aesthetics model 
         """
-        if pref.verbose:  print(" [VIEW] >> MultiDockView.switch(",nb,")")
+        trace.debug('VIEW', "MultiDockView.switch(",nb,")")
 
         if nb != self.active:
      
@@ -856,7 +890,7 @@ class MultiDockView(QDockWidget):
             self.repaint()
     # ------------------------------------------------------------------------------------------
     def setProcessPipe(self, processPipe):
-        if pref.verbose:  print(" [VIEW] >> MultiDockView.setProcessPipe(",processPipe.getImage().name,")")
+        trace.debug('VIEW', "MultiDockView.setProcessPipe(",lambda: processPipe.getImage().name,")")
         return self.childController.setProcessPipe(processPipe)
 # ------------------------------------------------------------------------------------------
 
@@ -1490,7 +1524,7 @@ class ImageAestheticsView(QSplitter):
     """class AestheticsImageView(QSplitter): view of AestheticsImageController
     """
     def __init__(self, _controller, build=False):
-        if pref.verbose: print(" [VIEW] >> AestheticsImageView.__init__(",")")
+        trace.debug('VIEW', "AestheticsImageView.__init__(",")")
         super().__init__(Qt.Vertical)
 
         self.controller = _controller
@@ -25,10 +25,10 @@ package hdrCore consists of the core classes for HDR imaging.
 # --- Import ------------------------------------------------------------------
 # -----------------------------------------------------------------------------
 import copy, colour, skimage.transform, math, os
-import sklearn.cluster, skimage.transform
+import skimage.transform
 import numpy as np
 import functools
-from . import processing, utils, image
+from . import processing, image
 import preferences.preferences as pref
 from timeit import default_timer as timer
 
@@ -67,6 +67,7 @@ class Palette(ImageAestheticsModel):
 
         Static methods:
             build
+            fromImage
     """    
     # constructor
     def __init__(self, name, colors, colorSpace, type):
@@ -98,6 +99,21 @@ class Palette(ImageAestheticsModel):
         # get image according to processId
         image_ = processpipe.processNodes[processId].outputImage
 
+        return Palette.fromImage(image_, nbColors=nbColors, method=method, **kwargs)
+
+    @staticmethod    
+    def fromImage(image_, nbColors=5, method='kmean-Lab', **kwargs):
+        """fromImage: create the Palette from an image (process-node output or gallery thumbnail)
+        
+            Args:
+                image_ (hdrCore.image.Image, Required): image
+                nbColors (int, Optionnal): number of colors in the palette (5 default values)
+                method (str, Optionnal): 'kmean-Lab' (default value)
+                kwargs (dict, Otionnal): supplemental parameters according to method
+
+            Returns:
+                (hdrCore.aesthetics.Palette)
+        """
         # according to method
         if method == 'kmean-Lab':
             # taking into acount supplemental parameters of 'kmean-Lab'
@@ -106,20 +122,10 @@ class Palette(ImageAestheticsModel):
             if 'removeBlack' in kwargs: removeBlack = kwargs['removeBlack']
             else: removeBlack = defaultParams['removeBlack']
 
-            # get image according to processId
-            image_ = processpipe.processNodes[processId].outputImage
-
-
-            # to Lab then to Vector
-            imageLab = processing.ColorSpaceTransform().compute(image_,dest='Lab')
-            imgLabDataVector = utils.ndarray2vector(imageLab.colorData)
-
+            # k-means in Lab on subsample, shared and cached with node version (see hdrCore.statistics.ImageStatistics.clusters)
             if removeBlack:
                 # k-means: nb cluster = nbColors + 1
-                kmeans_cluster_Lab = sklearn.cluster.KMeans(n_clusters=nbColors+1)
-                kmeans_cluster_Lab.fit(imgLabDataVector)
-
-                cluster_centers_Lab = kmeans_cluster_Lab.cluster_centers_
+                cluster_centers_Lab = image_.statistics().clusters(nbColors+1)
                 
                 # remove darkness one
                 idxLmin = np.argmin(cluster_centers_Lab[:,0])                           # idx of darkness
@@ -127,9 +133,7 @@ class Palette(ImageAestheticsModel):
 
             else:
                 # k-means: nb cluster = nbColors
-                kmeans_cluster_Lab = sklearn.cluster.KMeans(n_clusters=nbColors)
-                kmeans_cluster_Lab.fit(imgLabDataVector)
-                cluster_centers_Lab = kmeans_cluster_Lab.cluster_centers_
+                cluster_centers_Lab = image_.statistics().clusters(nbColors)
 
             colors = cluster_centers_Lab
         else: colors = None
@@ -0,0 +1,521 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+package hdrCore consists of the core classes for HDR imaging.
+
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import copy, os, ctypes, json, multiprocessing, collections, colour
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from . import image, processing, executor, lazy, trace
+from .cache import renderCache
+import preferences.preferences as pref
+from timeit import default_timer as timer
+
+# torch is imported on first auto tone curve (see hdrCore.lazy)
+net = lazy.module('hdrCore.net')
+
+# -----------------------------------------------------------------------------
+# --- availableMemory ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+def availableMemory():
+    """returns available physical memory (bytes), None if unknown.
+
+        Returns:
+            (int)
+    """
+    try:
+        if hasattr(os, 'sysconf'):
+            return os.sysconf('SC_AVPHYS_PAGES')*os.sysconf('SC_PAGE_SIZE')
+        else: # windows
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                            ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                            ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                            ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                            ('sullAvailExtendedVirtual', ctypes.c_ulonglong)]
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+            return status.ullAvailPhys
+    except (ValueError, OSError, AttributeError): return None
+# -----------------------------------------------------------------------------
+def readSidecar(filename):
+    """returns metadata 'processpipe' of image sidecar (json file), None if image has not been edited.
+
+        Args:
+            filename (str, Required): image filename
+
+        Returns:
+            (list[dict])
+    """
+    sidecar = os.path.splitext(filename)[0]+'.json'
+    if not os.path.isfile(sidecar): return None
+    with open(sidecar, 'r') as f: return json.load(f).get('processpipe', None)
+
+def mergeSidecar(processPipeDict, sidecar):
+    """returns process-pipe parameters where parameters found in image sidecar (metadata 'processpipe') replace given ones.
+
+        Args:
+            processPipeDict (list[dict], Required): process-pipe parameters (see hdrCore.processing.ProcessPipe.toDict)
+            sidecar (list[dict], Required): metadata 'processpipe' of image, None if image has not been edited
+
+        Returns:
+            (list[dict])
+    """
+    if not isinstance(sidecar, list): return processPipeDict
+    sidecar = dict(map(lambda p: list(p.items())[0], sidecar))
+    return list(map(lambda p: {list(p.keys())[0]: sidecar.get(list(p.keys())[0], list(p.values())[0])}, processPipeDict))
+
+def writeSidecar(filename, processPipeDict):
+    """write process-pipe parameters in metadata 'processpipe' of image sidecar (json file), other metadata are kept.
+
+        Args:
+            filename (str, Required): image filename
+            processPipeDict (list[dict], Required): process-pipe parameters (see hdrCore.processing.ProcessPipe.toDict)
+    """
+    sidecar = os.path.splitext(filename)[0]+'.json'
+    metadata = {}
+    if os.path.isfile(sidecar):
+        with open(sidecar, 'r') as f: metadata = json.load(f)
+    metadata['processpipe'] = processPipeDict
+    with open(sidecar, 'w') as f: json.dump(metadata, f)
+# -----------------------------------------------------------------------------
+# --- Class ExportJob ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+class ExportJob(object):
+    """
+    export of an image: read full size image, compute process-pipe parameters, clip, scale to display and write HDR file.
+    The render is read from the render cache when the same image has already been rendered with the same parameters.
+
+    Attributes:
+        filename (str): image filename
+        processPipeDict (list[dict]): process-pipe parameters (see hdrCore.processing.ProcessPipe.toDict)
+        useSidecar (bool): parameters found in image metadata (sidecar json file) replace processPipeDict ones
+        dirName (str): export directory
+        display (dict): HDR display (see preferences.preferences.HDRdisplays): 'scaling', 'post', 'tag'
+        size (int): width of exported image, None for full size
+        backend (str): 'cpp' (hdrCore.coreC) or 'python' (hdrCore.processing)
+        geometry (bool): compute geometry process-node
+        pixels (int): number of pixels if known (memory estimation), None otherwise
+        useCache (bool): render read from (or stored in) render cache (see hdrCore.cache)
+        status (str): 'queued', 'running', 'done', 'failed' or 'cancelled'
+        error (str): error message when failed
+        output (str): exported filename when done
+        time (float): computation time (second)
+        attempts (int): number of runs in a worker pool of its own (after a crash of its worker)
+
+    Methods:
+        run
+        render
+    """
+
+    def __init__(self, filename, processPipeDict, dirName, display, useSidecar=False, size=None, backend='cpp', geometry=False, pixels=None, useCache=True):
+        self.filename = filename
+        self.processPipeDict = processPipeDict
+        self.useSidecar = useSidecar
+        self.dirName = dirName
+        self.display = display
+        self.size = size
+        self.backend = backend
+        self.geometry = geometry
+        self.pixels = pixels
+        self.useCache = useCache
+
+        self.status = 'queued'
+        self.error = None
+        self.output = None
+        self.time = 0.0
+        self.attempts = 0
+
+    def run(self):
+        """export image (called in a worker process), errors are caught and stored in job.
+
+            Returns:
+                (hdrCore.batch.ExportJob): self, updated
+        """
+        start = timer()
+        self.status = 'running'
+        try:
+            # parameters: sidecar parameters replace given ones
+            processPipeDict = self.processPipeDict
+            if self.useSidecar: processPipeDict = mergeSidecar(processPipeDict, readSidecar(self.filename))
+
+            # render cache
+            cache, key, img = None, None, None
+            if self.useCache:
+                options = {'geometry': self.geometry, 'backend': self.backend, 'toneMap': False}
+                if self.size: options['upscale'] = False
+                cache = renderCache()
+                key = cache.key(self.filename, processPipeDict, self.size, self.display['tag'], **options)
+                img = cache.get(key, self.filename)
+
+            if img == None:
+                img = self.render(processPipeDict)
+                if cache: cache.put(key, img)
+            self.pixels = img.shape[0]*img.shape[1]
+
+            # write
+            pathExport = os.path.join(self.dirName, img.name[:-4]+self.display['post']+'.hdr')
+            img.type = image.imageType.HDR
+            img.metadata.metadata['processpipe'] = None
+            img.metadata.metadata['display'] = self.display['tag']
+            img.write(pathExport)
+
+            self.output = pathExport
+            self.status = 'done'
+        except Exception as e:
+            self.status = 'failed'
+            self.error = repr(e)
+        self.time = timer() - start
+        return self
+
+    def render(self, processPipeDict):
+        """read image, compute process-pipe parameters, clip and scale to display.
+
+            Args:
+                processPipeDict (list[dict], Required): process-pipe parameters
+
+            Returns:
+                (hdrCore.image.Image)
+        """
+        img = image.Image.read(self.filename)
+
+        # resize
+        height, width, _ = img.shape
+        if self.size and (width > self.size): img = img.process(processing.resize(),size=(None, self.size))
+
+        # linear input
+        if not img.linear:
+            img.colorData = np.float32(colour.cctf_decoding(img.colorData, function='sRGB'))
+            img.linear = True
+
+        # compute: warm engine of worker process
+        engine = executor.engine()
+        engine.setParameters(processPipeDict)
+        img = engine.plan.apply(img, backend=self.backend, geometry=self.geometry)
+
+        # clip, scale
+        img = img.process(processing.clip())
+        img.colorData = img.colorData*self.display['scaling']
+        return img
+# -----------------------------------------------------------------------------
+def runJob(job):
+    """worker function: run job (hdrCore.batch.ExportJob) in a worker process."""
+    return job.run()
+# -----------------------------------------------------------------------------
+# --- Class BatchExporter -----------------------------------------------------
+# -----------------------------------------------------------------------------
+class BatchExporter(object):
+    """
+    job queue of exports computed by N worker processes:
+        - N is sized by cores and available memory (estimated memory per job),
+        - each worker reads, computes and writes its image: reading an image overlaps computation of others,
+        - a failed job does not stop the others (error stored in job),
+        - at most one job per worker is submitted at once: when a worker crashes, only the jobs running in the pool are
+          suspected, they are run again one by one in a pool of their own (the crashing job is isolated, maxAttempts),
+          the other jobs are not charged with an attempt and go on in a new pool,
+        - progress function is called for each job (running, done, failed).
+
+    Class Attributes:
+        maxWorkers (int): maximum number of workers (None: number of cores)
+        bytesPerPixel (int): estimated memory per pixel of a job (input, output and intermediates)
+        defaultPixels (int): number of pixels of a job when unknown
+        maxAttempts (int): attempts of a job in a pool of its own (worker crashed)
+
+    Attributes:
+        jobs (list[hdrCore.batch.ExportJob]): jobs
+        nbWorkers (int): number of worker processes
+        progress (function): called with (job, number of jobs over, number of jobs)
+        isCancelled (function): checked when a job is over, remaining jobs are cancelled if it returns True
+        start, end (float): time of run
+
+    Methods:
+        workers
+        run
+        runPool
+        over
+        report
+    """
+
+    maxWorkers =    None
+    bytesPerPixel = 3*4*8
+    defaultPixels = 24*1000*1000
+    maxAttempts =   2
+
+    def __init__(self, jobs, nbWorkers=None, progress=None, isCancelled=None):
+        self.jobs = list(jobs)
+        self.progress = progress
+        self.isCancelled = isCancelled
+        self.nbWorkers = nbWorkers if nbWorkers else self.workers()
+        self.start, self.end = None, None
+
+    def workers(self):
+        """returns number of workers according to cores and available memory.
+
+            Returns:
+                (int)
+        """
+        nb = os.cpu_count() or 1
+        if BatchExporter.maxWorkers: nb = min(nb, BatchExporter.maxWorkers)
+
+        memory = availableMemory()
+        if memory:
+            pixels = max([BatchExporter.defaultPixels if not j.pixels else j.pixels for j in self.jobs]+[1])
+            nb = min(nb, max(1, int(memory//(pixels*BatchExporter.bytesPerPixel))))
+        return max(1, min(nb, len(self.jobs)))
+
+    def run(self):
+        """run all jobs (blocking), returns when all jobs are over or cancelled.
+
+            Returns:
+                (list[hdrCore.batch.ExportJob]): jobs updated (status, error, output, time)
+        """
+        trace.debug('BATCH', "BatchExporter.run(",len(self.jobs),"jobs,",self.nbWorkers,"workers)")
+        self.start = timer()
+
+        pending = collections.deque(range(len(self.jobs)))    # jobs not run yet
+        suspects = collections.deque()                          # jobs running in a pool whose worker crashed
+        self.__nbOver, self.__cancelled = 0, False
+        while (pending or suspects) and not self.__cancelled:
+            if suspects:
+                # isolated run: a crash is due to this job
+                i = suspects.popleft()
+                self.jobs[i].attempts += 1
+                if self.runPool(collections.deque([i]), 1):
+                    if self.jobs[i].attempts < BatchExporter.maxAttempts:   suspects.append(i)
+                    else:                                                   self.over(i, 'failed', 'worker crashed (BrokenProcessPool)')
+            else:
+                suspects.extend(self.runPool(pending, self.nbWorkers))
+
+        for i in list(pending)+list(suspects): self.jobs[i].status = 'cancelled'
+        self.end = timer()
+        return self.jobs
+
+    def runPool(self, queue, nbWorkers):
+        """run jobs of queue in a new pool of worker processes, at most one job per worker submitted at once.
+
+            Args:
+                queue (collections.deque, Required): indexes of jobs, submitted jobs are removed
+                nbWorkers (int, Required): number of worker processes
+
+            Returns:
+                (list[int]): indexes of jobs that were running when a worker crashed (pool broken), [] otherwise
+        """
+        context = multiprocessing.get_context('spawn')
+        with concurrent.futures.ProcessPoolExecutor(nbWorkers, mp_context=context, initializer=executor.initWorker, initargs=(pref.verbose,)) as pool:
+            running = {}
+            while (queue or running):
+                while queue and (len(running) < nbWorkers) and not self.__cancelled:
+                    i = queue.popleft()
+                    running[pool.submit(runJob, self.jobs[i])] = i
+                if not running: break
+
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                broken = []
+                for future in done:
+                    i = running.pop(future)
+                    try:
+                        self.jobs[i] = future.result()
+                    except BrokenProcessPool:
+                        broken.append(i)
+                        continue
+                    self.over(i)
+                    if self.isCancelled and self.isCancelled(): self.__cancelled = True
+                # running jobs are suspected, the others have not been submitted
+                if broken: return broken+list(running.values())
+        return []
+
+    def over(self, i, status=None, error=None):
+        """job i is over: update status (if given), progress."""
+        if status: self.jobs[i].status, self.jobs[i].error = status, error
+        self.__nbOver += 1
+        if self.progress: self.progress(self.jobs[i], self.__nbOver, len(self.jobs))
+
+    def report(self):
+        """returns throughput report of run.
+
+            Returns:
+                (dict): keys 'jobs', 'done', 'failed', 'workers', 'time', 'images/s', 'Mpixels/s', 'failures'
+        """
+        done = [j for j in self.jobs if j.status == 'done']
+        failed = [j for j in self.jobs if j.status == 'failed']
+        time = (self.end - self.start) if (self.start and self.end) else 0.0
+        pixels = sum([j.pixels for j in done if j.pixels])
+        return {'jobs':         len(self.jobs),
+                'done':         len(done),
+                'failed':       len(failed),
+                'workers':      self.nbWorkers,
+                'time':         time,
+                'images/s':     len(done)/time if time > 0 else 0.0,
+                'Mpixels/s':    pixels/1e6/time if time > 0 else 0.0,
+                'failures':     dict([(j.filename, j.error) for j in failed])}
+# -----------------------------------------------------------------------------
+# --- Class BatchAutoToneCurve -----------------------------------------------
+# -----------------------------------------------------------------------------
+class BatchAutoToneCurve(object):
+    """
+    auto tone curve of a set of images (gallery): the network predicts tone curves of all images in a single batched
+    inference (see hdrCore.net.predictToneCurves) instead of one inference per edited image:
+        - the tone curve input histogram (output of the process-node before tonecurve) of each image is either given
+          (statistics of a computed process-pipe, see hdrCore.processing.ProcessPipe.ProcessNode.statistics) or computed
+          from the image thumbnail (threads, only process-nodes before tonecurve are computed),
+        - predicted tone curves are set in the 'tonecurve' parameters of process-pipe parameters of each image.
+    Histograms are cheap (small thumbnails, 50 bins) and the inference of hundreds of images is a single matrix product.
+
+    Class Attributes:
+        thumbSize (int): width of thumbnail used for histograms
+        nbBins (int): number of bins of histograms (network input)
+        maxWorkers (int): maximum number of threads computing histograms (None: number of cores)
+
+    Attributes:
+        filenames (list[str]): image filenames
+        processPipeDicts (list[list[dict]]): process-pipe parameters of images, None: parameters of image sidecar
+        histograms (list[numpy.ndarray]): tone curve input histograms, None when not (yet) computed
+        toneCurves (list[dict]): predicted tone curve parameters, None for failed or cancelled images
+        errors (dict): key: image index, value: error message
+        weightFile (str): network weights
+        progress (function): called with (number of histograms computed, number of images)
+        isCancelled (function): checked between histograms, remaining ones are abandoned if it returns True
+        times (dict): key: 'histograms', 'inference', value: time (second)
+
+    Methods:
+        histogram
+        run
+        results
+        report
+    """
+
+    thumbSize =     256
+    nbBins =        50
+    maxWorkers =    None
+
+    def __init__(self, filenames, processPipeDicts=None, histograms=None, weightFile='MSESig505_0419.pth', progress=None, isCancelled=None):
+        self.filenames = list(filenames)
+        self.processPipeDicts = list(processPipeDicts) if processPipeDicts else [None]*len(self.filenames)
+        self.histograms = list(histograms) if histograms else [None]*len(self.filenames)
+        self.toneCurves = [None]*len(self.filenames)
+        self.errors = {}
+        self.weightFile = weightFile
+        self.progress = progress
+        self.isCancelled = isCancelled
+        self.times = {'histograms': 0.0, 'inference': 0.0}
+
+    @staticmethod
+    def histogram(filename, processPipeDict=None):
+        """returns tone curve input histogram of an image computed on its thumbnail, and the process-pipe parameters used.
+
+            Args:
+                filename (str, Required): image filename
+                processPipeDict (list[dict], Optionnal): process-pipe parameters, None: parameters of image sidecar
+
+            Returns:
+                (tuple): (numpy.ndarray, list[dict])
+        """
+        img = image.Image.read(filename, thumb=True, thumbSize=BatchAutoToneCurve.thumbSize)
+        if img.shape[1] > BatchAutoToneCurve.thumbSize: img = img.process(processing.resize(), size=(None, BatchAutoToneCurve.thumbSize))
+
+        processPipe = processing.ProcessPipe.build()
+        processPipe.setImage(img)                               # parameters of image sidecar
+        if processPipeDict:
+            for pMeta in processPipeDict:
+                name = list(pMeta.keys())[0]
+                idProcess = processPipe.getProcessNodeByName(name)
+                if idProcess != -1: processPipe.setParameters(idProcess, copy.deepcopy(pMeta[name]))
+
+        # compute process-nodes before tonecurve only
+        idBefore = processPipe.getProcessNodeByName("tonecurve")-1
+        processPipe.compute(stopAfter=idBefore)
+        before = processPipe.processNodes[idBefore]
+
+        histogram = before.statistics().histogram(BatchAutoToneCurve.nbBins, space='stored', subsample=False)[0]
+        return histogram, processPipe.toDict()
+
+    def run(self):
+        """compute missing histograms (threads), then predict tone curves of all images (single inference).
+
+            Returns:
+                (list[dict]): predicted tone curve parameters, None for failed or cancelled images
+        """
+        trace.debug('BATCH', "BatchAutoToneCurve.run(",len(self.filenames),"images)")
+
+        # histograms
+        start = timer()
+        missing = [i for i,h in enumerate(self.histograms) if h is None]
+        nbWorkers = os.cpu_count() or 1
+        if BatchAutoToneCurve.maxWorkers: nbWorkers = min(nbWorkers, BatchAutoToneCurve.maxWorkers)
+        nbOver = len(self.filenames) - len(missing)
+        if missing:
+            with concurrent.futures.ThreadPoolExecutor(max(1, min(nbWorkers, len(missing)))) as pool:
+                futures = dict([(pool.submit(BatchAutoToneCurve.histogram, self.filenames[i], self.processPipeDicts[i]), i) for i in missing])
+                for future in concurrent.futures.as_completed(futures):
+                    i = futures[future]
+                    try:
+                        self.histograms[i], self.processPipeDicts[i] = future.result()
+                    except concurrent.futures.CancelledError:
+                        continue
+                    except Exception as e:
+                        self.errors[i] = repr(e)
+                    nbOver += 1
+                    if self.progress: self.progress(nbOver, len(self.filenames))
+                    if self.isCancelled and self.isCancelled():
+                        for f in futures: f.cancel()
+        self.times['histograms'] = timer() - start
+
+        # single batched inference
+        start = timer()
+        ids = [i for i,h in enumerate(self.histograms) if h is not None]
+        for i, toneCurve in zip(ids, net.predictToneCurves([self.histograms[i] for i in ids], self.weightFile)):
+            self.toneCurves[i] = toneCurve
+        self.times['inference'] = timer() - start
+
+        trace.info('BATCH', "BatchAutoToneCurve.run(): histograms:",f"{self.times['histograms']:.3f}s","inference:",f"{self.times['inference']:.3f}s")
+        return self.toneCurves
+
+    def results(self):
+        """returns process-pipe parameters of images where 'tonecurve' parameters are replaced by predicted tone curves.
+
+            Returns:
+                (list[list[dict]]): None for failed or cancelled images, and images whose parameters are unknown
+        """
+        res = []
+        for processPipeDict, toneCurve in zip(self.processPipeDicts, self.toneCurves):
+            if (toneCurve is None) or (processPipeDict is None): res.append(None)
+            else: res.append(list(map(lambda p: {'tonecurve': copy.deepcopy(toneCurve)} if 'tonecurve' in p else copy.deepcopy(p), processPipeDict)))
+        return res
+
+    def report(self):
+        """returns report of run.
+
+            Returns:
+                (dict): keys 'images', 'done', 'failed', 'histograms', 'inference', 'failures'
+        """
+        return {'images':       len(self.filenames),
+                'done':         len([t for t in self.toneCurves if t is not None]),
+                'failed':       len(self.errors),
+                'histograms':   self.times['histograms'],
+                'inference':    self.times['inference'],
+                'failures':     dict([(self.filenames[i], e) for i,e in self.errors.items()])}
+# -----------------------------------------------------------------------------
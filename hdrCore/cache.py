@@ -0,0 +1,223 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+content-addressed disk cache of renders (display, compare and export outputs):
+    key is the hash of (source image content, canonical process-pipe parameters, size, display target, options),
+    entries (colorData .npy + metadata .json) are stored in the user cache directory: they are shared by GUI sessions,
+    the batch renderer (hdrCore.batch, hdrCore.render) and the render daemon (hdrCore.daemon).
+    Least recently used entries are removed when the cache exceeds its size budget.
+
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import hashlib, json, os, threading, uuid
+import numpy as np
+from . import image, trace, profiling
+from timeit import default_timer as timer
+
+# -----------------------------------------------------------------------------
+# --- Class RenderCache -------------------------------------------------------
+# -----------------------------------------------------------------------------
+class RenderCache(object):
+    """
+    disk render cache.
+
+    Class Attributes:
+        directory (str): cache directory (None: user cache directory, uHDR/render)
+        budget (int): cache size budget (bytes)
+        version (str): render version, part of keys (change it when renders change)
+
+    Attributes:
+        path (str): cache directory
+        hashes (dict): key (filename, modification time, file size), value content hash (source images are hashed once)
+        lock (threading.Lock): protects hashes and eviction
+        hits, misses (int): statistics
+
+    Methods:
+        sourceHash
+        key
+        get
+        put
+        evict
+        size
+        clear
+    """
+
+    directory = None
+    budget =    4*1024*1024*1024
+    version =   '1'
+
+    def __init__(self, directory=None):
+        if not directory: directory = RenderCache.directory
+        if not directory:
+            base = os.environ.get('LOCALAPPDATA', None) or os.environ.get('XDG_CACHE_HOME', None) or os.path.join(os.path.expanduser('~'), '.cache')
+            directory = os.path.join(base, 'uHDR', 'render')
+        self.path = directory
+        os.makedirs(self.path, exist_ok=True)
+
+        self.hashes = {}
+        self.lock = threading.Lock()
+        self.hits, self.misses = 0, 0
+
+    def sourceHash(self, filename):
+        """returns content hash of source image (computed once per file version).
+
+            Args:
+                filename (str, Required): image filename
+
+            Returns:
+                (str)
+        """
+        stat = os.stat(filename)
+        fileKey = (os.path.abspath(filename), stat.st_mtime, stat.st_size)
+        with self.lock:
+            if fileKey in self.hashes: return self.hashes[fileKey]
+
+        h = hashlib.blake2b(digest_size=20)
+        with open(filename, 'rb') as f:
+            for block in iter(lambda: f.read(1<<20), b''): h.update(block)
+        digest = h.hexdigest()
+
+        with self.lock: self.hashes[fileKey] = digest
+        return digest
+
+    def key(self, filename, processPipeDict, size=None, target=None, **options):
+        """returns cache key of a render.
+
+            Args:
+                filename (str, Required): source image filename
+                processPipeDict (list[dict], Required): process-pipe parameters (see hdrCore.processing.ProcessPipe.toDict)
+                size (int or tuple, Optionnal): output size, None for full size
+                target (str, Optionnal): display tag, None for linear (not scaled) output
+                options: other render options (geometry, backend, ...)
+
+            Returns:
+                (str)
+        """
+        canonical = json.dumps({'source':       self.sourceHash(filename),
+                                'processpipe':  processPipeDict,
+                                'size':         size,
+                                'target':       target,
+                                'options':      options,
+                                'version':      RenderCache.version}, sort_keys=True, default=repr)
+        return hashlib.blake2b(canonical.encode('utf-8'), digest_size=20).hexdigest()
+
+    def __files(self, key):
+        return os.path.join(self.path, key+'.npy'), os.path.join(self.path, key+'.json')
+
+    def get(self, key, filename):
+        """returns cached render, None if not in cache.
+
+            Args:
+                key (str, Required): cache key (see RenderCache.key)
+                filename (str, Required): source image filename (name and path of returned image)
+
+            Returns:
+                (hdrCore.image.Image)
+        """
+        npyFile, jsonFile = self.__files(key)
+        start = timer()
+        try:
+            with open(jsonFile, 'r') as f: entry = json.load(f)
+            colorData = np.load(npyFile)
+            os.utime(npyFile) # least recently used
+        except (OSError, ValueError):
+            with self.lock: self.misses += 1
+            profiling.profiler().record('RenderCache.get', 'cache', start, timer() - start, cache='miss')
+            return None
+        with self.lock: self.hits += 1
+        profiling.profiler().record('RenderCache.get', 'cache', start, timer() - start, cache='hit', outShape=colorData.shape, bytes=colorData.nbytes)
+        trace.debug('CACHE', "RenderCache.get(",filename,"): hit")
+
+        path, name = os.path.split(filename)
+        img = image.Image(path, name, colorData, image.imageType.HDR, entry['linear'], image.ColorSpace.build(entry['colorSpace']))
+        img.metadata = image.metadata.metadata(img)
+        if entry['metadata']: img.metadata.metadata = entry['metadata']
+        return img
+
+    def put(self, key, img):
+        """store render in cache (atomic: concurrent processes can share the cache), then evict if over budget.
+
+            Args:
+                key (str, Required): cache key (see RenderCache.key)
+                img (hdrCore.image.Image, Required): render
+        """
+        npyFile, jsonFile = self.__files(key)
+        tmp = os.path.join(self.path, 'tmp-'+uuid.uuid4().hex)
+        start = timer()
+        try:
+            with open(tmp+'.npy', 'wb') as f: np.save(f, np.float32(img.colorData))
+            with open(tmp+'.json', 'w') as f:
+                json.dump({'linear':        bool(img.linear),
+                           'colorSpace':    img.colorSpace.name if img.colorSpace else 'sRGB',
+                           'metadata':      img.metadata.metadata if img.metadata else None}, f, default=repr)
+            # data before entry: an entry found by get is complete
+            os.replace(tmp+'.npy', npyFile)
+            os.replace(tmp+'.json', jsonFile)
+        except (OSError, TypeError, ValueError) as e:
+            trace.warning('CACHE', "RenderCache.put(",img.name,"): failed",e)
+            for f in (tmp+'.npy', tmp+'.json'):
+                if os.path.exists(f): os.remove(f)
+            return
+        profiling.profiler().record('RenderCache.put', 'cache', start, timer() - start, inShape=img.colorData.shape)
+        self.evict()
+
+    def evict(self):
+        """remove least recently used entries until cache size is under budget."""
+        with self.lock:
+            entries = []
+            for f in os.scandir(self.path):
+                if f.name.endswith('.npy') and not f.name.startswith('tmp-'):
+                    try:
+                        stat = f.stat()
+                        entries.append((stat.st_mtime, stat.st_size, f.name[:-4]))
+                    except OSError: pass
+            total = sum([e[1] for e in entries])
+            for _, nbytes, key in sorted(entries):
+                if total <= RenderCache.budget: break
+                for f in self.__files(key):
+                    try: os.remove(f)
+                    except OSError: pass
+                total -= nbytes
+                trace.debug('CACHE', "RenderCache.evict(",key,")")
+
+    def size(self):
+        """returns size of cache (bytes)."""
+        return sum([f.stat().st_size for f in os.scandir(self.path) if f.is_file()])
+
+    def clear(self):
+        """remove all entries."""
+        with self.lock:
+            for f in os.scandir(self.path):
+                try: os.remove(f.path)
+                except OSError: pass
+# -----------------------------------------------------------------------------
+__renderCache = None
+def renderCache():
+    """returns the RenderCache of the process (created at first call).
+
+        Returns:
+            (hdrCore.cache.RenderCache)
+    """
+    global __renderCache
+    if not __renderCache: __renderCache = RenderCache()
+    return __renderCache
@@ -25,11 +25,57 @@ package hdrCore consists of the core classes for HDR imaging.
 # -----------------------------------------------------------------------------
 # --- Import ------------------------------------------------------------------
 # -----------------------------------------------------------------------------
-import ctypes, copy
+import ctypes
 import numpy as np
-import hdrCore.image, hdrCore.processing, hdrCore.utils
-import preferences.preferences as pref
+import hdrCore.image, hdrCore.processing, hdrCore.utils, hdrCore.profiling
+from hdrCore import trace
+from timeit import default_timer as timer
 
+# -----------------------------------------------------------------------------
+# --- library -----------------------------------------------------------------
+# -----------------------------------------------------------------------------
+__library = None
+def library():
+    """returns the C++ library (HDRip.dll), loaded and configured once per process (warm engine for worker processes).
+
+        Returns:
+            (ctypes.CDLL)
+    """
+    global __library
+    if not __library:
+        mylib = ctypes.cdll.LoadLibrary('./HDRip.dll')
+        mylib.full_process_5CO.argtypes = [np.ctypeslib.ndpointer(dtype=ctypes.c_float), ctypes.c_uint, ctypes.c_uint,
+                                        ctypes.c_float,
+                                        ctypes.c_float,
+                                        ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float,
+                                        ctypes.c_bool, ctypes.c_bool, ctypes.c_bool, ctypes.c_bool, ctypes.c_bool,
+                                        ctypes.c_float,
+                                        ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_bool,
+                                        ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_bool,
+                                        ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_bool,
+                                        ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_bool,
+                                        ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_bool
+        ]
+        # result shape depends on image: pointer wrapped per call (see coreCcompute), library can be shared by threads
+        mylib.full_process_5CO.restype = ctypes.POINTER(ctypes.c_float)
+        __library = mylib
+    return __library
+
+__available = None
+def available():
+    """returns True if the C++ library (HDRip.dll) can be loaded (checked once per process).
+
+        Returns:
+            (bool)
+    """
+    global __available
+    if __available == None:
+        try:
+            library()
+            __available = True
+        except OSError:
+            __available = False
+    return __available
 # -----------------------------------------------------------------------------
 # --- coreCcompute ------------------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -44,7 +90,7 @@ def coreCcompute(img, processPipe):
         Returns:
             (hdrCore.image.Image, Required): image
     """
-    if pref.verbose:  print(f"[hdrCore] >> coreCcompute({img})") 
+    trace.debug('CORE', "coreCcompute(", img, ")")
 
     ppDict = processPipe.toDict()
 
@@ -118,24 +164,13 @@ def coreCcompute(img, processPipe):
 
 
 
-    mylib = ctypes.cdll.LoadLibrary('./HDRip.dll')
-    mylib.full_process_5CO.argtypes = [np.ctypeslib.ndpointer(dtype=ctypes.c_float), ctypes.c_uint, ctypes.c_uint,
-                                    ctypes.c_float,
-                                    ctypes.c_float,
-                                    ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float,
-                                    ctypes.c_bool, ctypes.c_bool, ctypes.c_bool, ctypes.c_bool, ctypes.c_bool,
-                                    ctypes.c_float,
-                                    ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_bool,
-                                    ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_bool,
-                                    ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_bool,
-                                    ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_bool,
-                                    ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_bool
-    ]
-    mylib.full_process_5CO.restype = np.ctypeslib.ndpointer(dtype=ctypes.c_float, shape=(img.colorData.shape[0],img.colorData.shape[1],3))
-
-    resDLL = mylib.full_process_5CO(img.colorData,
-                                img.colorData.shape[1],
-                                img.colorData.shape[0],
+    mylib = library()
+    start = timer()
+    colorData = np.ascontiguousarray(img.colorData, dtype=np.float32)
+
+    resDLL = mylib.full_process_5CO(colorData,
+                                colorData.shape[1],
+                                colorData.shape[0],
                                 exposure,
                                 contrast,
                                 tonecurveS, tonecurveB, tonecurveM, tonecurveW, tonecurveH,
@@ -148,6 +183,8 @@ def coreCcompute(img, processPipe):
                                 ce5_sel_lightness[0], ce5_sel_lightness[1], ce5_sel_chroma[0], ce5_sel_chroma[1], ce5_sel_hue[0], ce5_sel_hue[1], ce5_tolerance, ce5_edit_hue, ce5_edit_exposure, ce5_edit_contrast, ce5_edit_saturation, ce5_mask
                                 )
 
-    img.colorData = copy.deepcopy(resDLL)
+    img.colorData = np.ctypeslib.as_array(resDLL, shape=(colorData.shape[0],colorData.shape[1],3)).copy()
+    hdrCore.profiling.profiler().record('coreCcompute', 'core', start, timer() - start, backend='cpp', 
+                                        inShape=colorData.shape, outShape=img.colorData.shape, bytes=img.colorData.nbytes)
 
     return img
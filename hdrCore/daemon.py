@@ -0,0 +1,410 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+optional local render daemon (no GUI, PyQt5 is not imported):
+    a long-lived process keeps decoded images (and their resized versions) in memory and the worker processes of
+    hdrCore.executor.TileExecutor warm (process-pipe built, C++ library loaded).
+    Render jobs (image filename, process-pipe parameters, size, display target) are submitted by the GUI or scripts
+    through a Unix socket (POSIX) or a localhost TCP port (Windows), results are returned as shared memory handles or files.
+    Connections are authenticated with a random key created at startup in a file readable by the user only (keyFile):
+    only processes of the user can submit jobs. Results are written only in directories granted on command line.
+
+usage (from uHDR directory):
+    python -m hdrCore.daemon                            start daemon (results returned as shared memory only)
+    python -m hdrCore.daemon --allow-output export/     start daemon, results can be written in export/
+    python -m hdrCore.daemon --stop                     stop daemon
+
+client:
+    client = hdrCore.daemon.RenderClient.connect()      # None if daemon is not running
+    img = client.render(filename, processPipeDict, size=1920, target='vesaDisplayHDR1000')
+
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import argparse, collections, os, secrets, sys, tempfile, threading
+from multiprocessing import connection, shared_memory
+import numpy as np
+from . import image, processing, executor, batch
+import preferences.preferences as pref
+from timeit import default_timer as timer
+
+# -----------------------------------------------------------------------------
+# --- address -----------------------------------------------------------------
+# -----------------------------------------------------------------------------
+port =      50623
+
+def keyFile():
+    """returns filename of authentication key of daemon: in user directory (LOCALAPPDATA, XDG_RUNTIME_DIR or ~/.cache).
+
+        Returns:
+            (str)
+    """
+    base = os.environ.get('LOCALAPPDATA', None) or os.environ.get('XDG_RUNTIME_DIR', None) or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'uHDR', 'render-daemon.key')
+
+def createAuthkey():
+    """create a random authentication key and write it in keyFile, readable by the user only (called by daemon at startup).
+
+        Returns:
+            (bytes)
+    """
+    key = secrets.token_bytes(32)
+    filename = keyFile()
+    os.makedirs(os.path.dirname(filename), mode=0o700, exist_ok=True)
+    if os.path.lexists(filename): os.remove(filename)
+    # O_EXCL: a file (or link) created meanwhile by another user is not reused
+    with os.fdopen(os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as f: f.write(key)
+    return key
+
+def readAuthkey():
+    """returns authentication key of running daemon, None if there is no key file (daemon is not running).
+
+        Returns:
+            (bytes)
+    """
+    try:
+        with open(keyFile(), 'rb') as f: return f.read()
+    except OSError: return None
+
+def address():
+    """returns daemon address: Unix socket in temporary directory (POSIX), localhost TCP port otherwise.
+
+        Returns:
+            (str or (str,int))
+    """
+    if hasattr(os, 'getuid'): return os.path.join(tempfile.gettempdir(), 'uHDR-render-'+str(os.getuid())+'.sock')
+    return ('localhost', port)
+# -----------------------------------------------------------------------------
+# --- Class RenderServer ------------------------------------------------------
+# -----------------------------------------------------------------------------
+class RenderServer(object):
+    """
+    render daemon: one thread per client connection, renders are computed by the shared TileExecutor.
+
+    requests (dict sent by client, key 'request'):
+        'ping':     returns {'status': 'ok'}
+        'render':   keys 'filename', 'processPipeDict', 'size' (width or None), 'target' (display tag or None: no scaling),
+                    'geometry' (bool), 'backend' ('cpp' or 'python'),
+                    'output' (.hdr filename in a granted directory (allowedOutputs), None for shared memory),
+                    'useSidecar' (bool, parameters found in image sidecar replace 'processPipeDict' ones)
+                    returns {'status': 'done', 'file': filename} or {'status': 'done', 'shm': name, 'shape': shape, 'linear': bool}
+        'release':  key 'shm', release shared memory of a render
+        'stats':    returns cache statistics
+        'shutdown': stop daemon
+
+    Class Attributes:
+        maxImages (int): number of decoded images kept in memory (LRU)
+        maxHandles (int): number of shared memory results kept until released (oldest are released)
+
+    Attributes:
+        address: listening address
+        authkey (bytes): authentication key of connections (see createAuthkey)
+        allowedOutputs (list[str]): directories (real paths) where results can be written
+        images (collections.OrderedDict): key (filename, modification times of image and sidecar, width), value hdrCore.image.Image (linear)
+        handles (collections.OrderedDict): key shared memory name, value SharedMemory
+        lock (threading.Lock): protects images, handles and statistics
+        hits, misses, nbRenders (int): statistics
+
+    Methods:
+        serve
+        getImage
+        outputAllowed
+        render
+        handle
+    """
+
+    maxImages =     8
+    maxHandles =    16
+
+    def __init__(self, address_=None, allowedOutputs=None):
+        self.address = address_ if address_ else address()
+        self.authkey = None
+        self.allowedOutputs = [os.path.realpath(d) for d in (allowedOutputs if allowedOutputs else [])]
+        self.images = collections.OrderedDict()
+        self.handles = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits, self.misses, self.nbRenders = 0, 0, 0
+        self.running = False
+
+    def getImage(self, filename, size=None):
+        """returns decoded (linear) image, resized to size width: read from disk only if not in cache or modified.
+
+            Args:
+                filename (str, Required): image filename
+                size (int, Optionnal): width, None for full size
+
+            Returns:
+                (hdrCore.image.Image)
+        """
+        # modification time of image and of its sidecar (metadata)
+        sidecar = os.path.splitext(filename)[0]+'.json'
+        mtime = (os.path.getmtime(filename), os.path.getmtime(sidecar) if os.path.isfile(sidecar) else None)
+        key = (os.path.abspath(filename), mtime, size)
+        with self.lock:
+            if key in self.images:
+                self.hits += 1
+                self.images.move_to_end(key)
+                return self.images[key]
+            self.misses += 1
+
+        if size:
+            img = self.getImage(filename, None)
+            if img.shape[1] != size: img = img.process(processing.resize(),size=(None, size))
+        else:
+            img = image.Image.read(filename)
+            if not img.linear:
+                img.colorData = np.float32(processing.colour.cctf_decoding(img.colorData, function='sRGB'))
+                img.linear = True
+
+        with self.lock:
+            self.images[key] = img
+            while len(self.images) > RenderServer.maxImages: self.images.popitem(last=False)
+        return img
+
+    def outputAllowed(self, filename):
+        """returns True if filename is a .hdr file in a granted directory (links resolved).
+
+            Args:
+                filename (str, Required): output filename
+
+            Returns:
+                (bool)
+        """
+        if not filename.lower().endswith('.hdr'): return False
+        path = os.path.realpath(filename)
+        for d in self.allowedOutputs:
+            try:
+                if os.path.commonpath([d, path]) == d: return True
+            except ValueError: pass         # different drives (Windows)
+        return False
+
+    def render(self, job):
+        """compute a render job.
+
+            Args:
+                job (dict, Required): see class documentation
+
+            Returns:
+                (dict): response
+        """
+        start = timer()
+        if job.get('output', None) and not self.outputAllowed(job['output']):
+            raise PermissionError("output not granted (python -m hdrCore.daemon --allow-output): "+str(job['output']))
+        processPipeDict = job['processPipeDict']
+        if job.get('useSidecar', False):
+            processPipeDict = batch.mergeSidecar(processPipeDict, self.getImage(job['filename']).metadata.metadata.get('processpipe', None))
+
+        img = self.getImage(job['filename'], job.get('size', None))
+        res = executor.tileExecutor().compute(img, processPipeDict, backend=job.get('backend', 'cpp'))
+
+        if job.get('geometry', False):
+            geometryNode = processing.CompiledPlan(processPipeDict).geometryNode
+            if geometryNode: res = geometryNode[0].compute(res, **geometryNode[1])
+
+        if job.get('target', None):
+            res = res.process(processing.clip())
+            res.colorData = res.colorData*pref.getHDRdisplays()[job['target']]['scaling']
+        with self.lock: self.nbRenders += 1
+
+        if job.get('output', None):
+            res.type = image.imageType.HDR
+            res.metadata.metadata['processpipe'] = None
+            res.metadata.metadata['display'] = job.get('target', None)
+            res.write(job['output'])
+            return {'status': 'done', 'file': job['output'], 'time': timer()-start}
+
+        colorData = np.float32(res.colorData)
+        shm = shared_memory.SharedMemory(create=True, size=colorData.nbytes)
+        np.ndarray(colorData.shape, dtype=np.float32, buffer=shm.buf)[:] = colorData
+        with self.lock:
+            self.handles[shm.name] = shm
+            while len(self.handles) > RenderServer.maxHandles: self.release(next(iter(self.handles)))
+        return {'status': 'done', 'shm': shm.name, 'shape': colorData.shape, 'linear': res.linear, 'time': timer()-start}
+
+    def release(self, name):
+        """release shared memory of a render (lock must be held)."""
+        shm = self.handles.pop(name, None)
+        if shm:
+            shm.close()
+            shm.unlink()
+
+    def handle(self, conn):
+        """serve a client connection (thread)."""
+        try:
+            while self.running:
+                request = conn.recv()
+                try:
+                    kind = request.get('request', None)
+                    if kind == 'ping':      response = {'status': 'ok'}
+                    elif kind == 'render':  response = self.render(request)
+                    elif kind == 'release':
+                        with self.lock: self.release(request['shm'])
+                        response = {'status': 'ok'}
+                    elif kind == 'stats':
+                        with self.lock: response = {'status': 'ok', 'images': len(self.images), 'handles': len(self.handles),
+                                                    'hits': self.hits, 'misses': self.misses, 'renders': self.nbRenders}
+                    elif kind == 'shutdown':
+                        self.running = False
+                        response = {'status': 'ok'}
+                        connection.Client(self.address, authkey=self.authkey).close() # unblock accept
+                    else:                   response = {'status': 'error', 'error': 'unknown request: '+str(kind)}
+                except Exception as e:      response = {'status': 'error', 'error': repr(e)}
+                conn.send(response)
+        except (EOFError, OSError): pass
+        finally: conn.close()
+
+    def serve(self):
+        """listen and serve clients until shutdown request."""
+        if isinstance(self.address, str) and os.path.exists(self.address): os.remove(self.address)
+        self.authkey = createAuthkey()
+        listener = connection.Listener(self.address, authkey=self.authkey)
+        self.running = True
+        print(" [DAEMON] >> RenderServer.serve(",self.address,", outputs:",self.allowedOutputs,")", flush=True)
+        try:
+            while self.running:
+                try: conn = listener.accept()
+                except (OSError, EOFError, connection.AuthenticationError): continue
+                if not self.running:
+                    conn.close()
+                    break
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+            if os.path.isfile(keyFile()): os.remove(keyFile())
+            with self.lock:
+                for name in list(self.handles.keys()): self.release(name)
+            executor.tileExecutor().close()
+# -----------------------------------------------------------------------------
+# --- Class RenderClient ------------------------------------------------------
+# -----------------------------------------------------------------------------
+class RenderClient(object):
+    """
+    client of render daemon, one request at a time (use one client per thread).
+
+    Attributes:
+        conn (multiprocessing.connection.Connection): connection to daemon
+
+    Methods:
+        connect (static)
+        request
+        render
+        stats
+        shutdown
+        close
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def connect(address_=None):
+        """connect to daemon (authentication key read in keyFile).
+
+            Returns:
+                (hdrCore.daemon.RenderClient): None if daemon is not running
+        """
+        key = readAuthkey()
+        if not key: return None
+        try:
+            return RenderClient(connection.Client(address_ if address_ else address(), authkey=key))
+        except (OSError, EOFError, connection.AuthenticationError): return None
+
+    def request(self, request):
+        """send a request and returns daemon response (dict)."""
+        with self.lock:
+            self.conn.send(request)
+            return self.conn.recv()
+
+    def render(self, filename, processPipeDict, size=None, target=None, geometry=False, backend='cpp', output=None, useSidecar=False):
+        """submit a render job.
+
+            Args:
+                filename (str, Required): image filename
+                processPipeDict (list[dict], Required): process-pipe parameters (see hdrCore.processing.ProcessPipe.toDict)
+                size (int, Optionnal): width, None for full size
+                target (str, Optionnal): HDR display tag (clip and scaling), None for linear output
+                geometry (bool, Optionnal): compute geometry process-node
+                backend (str, Optionnal): 'cpp' or 'python'
+                output (str, Optionnal): output filename (.hdr, in a directory granted to daemon), None: the result is returned as image
+                useSidecar (bool, Optionnal): parameters found in image sidecar replace processPipeDict ones
+
+            Returns:
+                (hdrCore.image.Image or str): image or output filename
+
+            Raises:
+                RuntimeError: if the daemon fails
+        """
+        # daemon working directory differs: absolute filenames
+        filename = os.path.abspath(filename)
+        if output: output = os.path.abspath(output)
+        response = self.request({'request': 'render', 'filename': filename, 'processPipeDict': processPipeDict, 'size': size,
+                                 'target': target, 'geometry': geometry, 'backend': backend, 'output': output, 'useSidecar': useSidecar})
+        if response['status'] != 'done': raise RuntimeError(response.get('error', 'render failed'))
+        if 'file' in response: return response['file']
+
+        shm = shared_memory.SharedMemory(name=response['shm'])
+        try:
+            # the daemon owns the shared memory: not tracked by this process
+            if hasattr(os, 'getuid'):
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, 'shared_memory')
+            colorData = np.array(np.ndarray(response['shape'], dtype=np.float32, buffer=shm.buf))
+        finally:
+            shm.close()
+            self.request({'request': 'release', 'shm': response['shm']})
+
+        path, name = os.path.split(filename)
+        res = image.Image(path, name, colorData, image.imageType.HDR, response['linear'], image.ColorSpace.sRGB())
+        res.metadata = image.metadata.metadata(res)
+        return res
+
+    def stats(self): return self.request({'request': 'stats'})
+
+    def shutdown(self): return self.request({'request': 'shutdown'})
+
+    def close(self): self.conn.close()
+# -----------------------------------------------------------------------------
+def main(argv=None):
+    """command line entry point: start (or stop) daemon."""
+    parser = argparse.ArgumentParser(prog='python -m hdrCore.daemon', description='uHDR local render daemon.')
+    parser.add_argument('--stop', action='store_true', help='stop running daemon')
+    parser.add_argument('--stats', action='store_true', help='print statistics of running daemon')
+    parser.add_argument('--allow-output', dest='outputs', action='append', default=[], metavar='DIR', help='directory where results can be written (repeatable)')
+    parser.add_argument('--verbose', action='store_true', help='verbose computation messages')
+    args = parser.parse_args(argv)
+
+    pref.setVerbose(args.verbose)
+    if args.stop or args.stats:
+        client = RenderClient.connect()
+        if not client:
+            print("hdrCore.daemon: daemon is not running", file=sys.stderr)
+            return 1
+        print(client.shutdown() if args.stop else client.stats())
+        client.close()
+        return 0
+
+    RenderServer(allowedOutputs=args.outputs).serve()
+    return 0
+# -----------------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(main())
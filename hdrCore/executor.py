@@ -0,0 +1,254 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+package hdrCore consists of the core classes for HDR imaging.
+
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import copy, os, multiprocessing, threading
+from multiprocessing import shared_memory
+import numpy as np
+from . import image, processing, coreC, trace, profiling
+import preferences.preferences as pref
+from timeit import default_timer as timer
+
+# -----------------------------------------------------------------------------
+# --- Class TileEngine --------------------------------------------------------
+# -----------------------------------------------------------------------------
+class TileEngine(object):
+    """
+    warm engine of a worker process: the execution plan (ProcessPipe.compile) is rebuilt only when parameters change,
+    so that consecutive tiles of an image share it.
+    The geometry process-node is never computed on tiles: it is computed after merging (see TileExecutor.compute).
+
+    Attributes:
+        plan (hdrCore.processing.CompiledPlan): execution plan of current parameters
+
+    Methods:
+        setParameters
+        compute
+    """
+
+    def __init__(self):
+        self.plan = None
+
+    def setParameters(self, processPipeDict):
+        """set process-pipe parameters, execution plan is rebuilt only if parameters change.
+
+            Args:
+                processPipeDict (list[dict], Required): process-pipe parameters (see hdrCore.processing.ProcessPipe.toDict)
+        """
+        if self.plan and (self.plan.processPipeDict == processPipeDict): return
+        self.plan = processing.CompiledPlan(processPipeDict)
+
+    def compute(self, img, backend='cpp'):
+        """compute process-pipe on a tile.
+
+            Args:
+                img (hdrCore.image.Image, Required): tile (linear)
+                backend (str, Optionnal): 'cpp' fused C++ engine (hdrCore.coreC), 'python' process-nodes (hdrCore.processing)
+
+            Returns:
+                (hdrCore.image.Image)
+        """
+        return self.plan.apply(img, backend=backend, geometry=False)
+# -----------------------------------------------------------------------------
+# --- worker functions --------------------------------------------------------
+# -----------------------------------------------------------------------------
+__engine = None
+def engine():
+    """returns the TileEngine of the current (worker) process."""
+    global __engine
+    if not __engine: __engine = TileEngine()
+    return __engine
+
+def initWorker(verbose=None):
+    """worker initializer: warm-up engine (C++ library loaded once per worker).
+
+        Args:
+            verbose (bool, Optionnal): preferences.preferences.verbose of worker process (not inherited by spawned processes)
+    """
+    if verbose != None: pref.setVerbose(verbose)
+    engine()
+    try: coreC.library()
+    except OSError: pass
+
+def _computeTile(task):
+    """compute a tile (horizontal strip) of a shared memory image into the shared memory output image.
+
+        Args:
+            task (tuple, Required): (input shared memory name, output shared memory name, image shape, first line, last line,
+                process-pipe parameters, backend, image type, linear, colorspace name)
+
+        Returns:
+            (tuple): (first line, last line, output linear, output colorspace name, start time, duration, worker pid), 
+                     None if image has been released (cancelled)
+    """
+    inName, outName, shape, y0, y1, processPipeDict, backend, type, linear, colorSpaceName = task
+    start = timer()
+
+    try:
+        shmIn, shmOut = shared_memory.SharedMemory(name=inName), shared_memory.SharedMemory(name=outName)
+    except FileNotFoundError: return None
+
+    try:
+        src = np.ndarray(shape, dtype=np.float32, buffer=shmIn.buf)
+        dst = np.ndarray(shape, dtype=np.float32, buffer=shmOut.buf)
+
+        # strip of input: a view of shared memory (contiguous), processing copies it
+        tile = image.Image('', 'tile', src[y0:y1], type, linear, image.ColorSpace.build(colorSpaceName), 1.0)
+
+        tileEngine = engine()
+        tileEngine.setParameters(processPipeDict)
+        res = tileEngine.compute(tile, backend)
+
+        dst[y0:y1] = res.colorData
+        colorSpace = res.colorSpace.name if res.colorSpace else colorSpaceName
+        linear = res.linear
+        del src, dst, tile, res
+    finally:
+        shmIn.close()
+        shmOut.close()
+
+    return (y0, y1, linear, colorSpace, start, timer() - start, os.getpid())
+# -----------------------------------------------------------------------------
+# --- Class TileExecutor ------------------------------------------------------
+# -----------------------------------------------------------------------------
+class TileExecutor(object):
+    """
+    process-pool executor of process-pipe on image tiles:
+        - input and output images are stored in shared memory (multiprocessing.shared_memory): tiles are neither copied nor pickled,
+        - workers receive only process-pipe parameters (ProcessPipe.toDict) and tile coordinates (horizontal strips),
+        - each worker keeps a warm engine (TileEngine): process-pipe built once, C++ library loaded once,
+        - numpy/colour computations run in separate processes: computation scales with cores (no GIL contention).
+
+    Class Attributes:
+        nbWorkers (int): number of worker processes (None: number of cores)
+        tilesPerWorker (int): number of tiles per worker (load balancing)
+
+    Attributes:
+        pool (multiprocessing.Pool): worker processes (created at first compute)
+        lock (threading.Lock): one computation at a time
+
+    Methods:
+        compute
+        close
+    """
+
+    nbWorkers =         None
+    tilesPerWorker =    4
+
+    def __init__(self):
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def workers(self):
+        """returns number of worker processes."""
+        return TileExecutor.nbWorkers if TileExecutor.nbWorkers else (os.cpu_count() or 1)
+
+    def compute(self, img, processPipeDict, backend='cpp', progress=None, isCancelled=None):
+        """compute process-pipe parameters on image (geometry excepted).
+
+            Args:
+                img (hdrCore.image.Image, Required): input image (linear)
+                processPipeDict (list[dict], Required): process-pipe parameters (see hdrCore.processing.ProcessPipe.toDict)
+                backend (str, Optionnal): 'cpp' (hdrCore.coreC) or 'python' (hdrCore.processing)
+                progress (function, Optionnal): called with percent (int) of tiles done
+                isCancelled (function, Optionnal): checked when a tile is done, computation is abandoned if it returns True
+
+            Returns:
+                (hdrCore.image.Image): output image, None if cancelled
+        """
+        trace.debug('EXECUTOR', "TileExecutor.compute(",img.name,", backend:",backend,")")
+        start = timer()
+        profiler = profiling.profiler()
+
+        with self.lock:
+            if not self.pool: self.pool = multiprocessing.get_context('spawn').Pool(self.workers(), initializer=initWorker, initargs=(pref.verbose,))
+
+            shape = img.colorData.shape
+            nbytes = int(np.prod(shape))*np.dtype(np.float32).itemsize
+            shmIn = shared_memory.SharedMemory(create=True, size=nbytes)
+            shmOut = shared_memory.SharedMemory(create=True, size=nbytes)
+            try:
+                src = np.ndarray(shape, dtype=np.float32, buffer=shmIn.buf)
+                src[:] = img.colorData
+                del src
+
+                # horizontal strips
+                height = shape[0]
+                nbTiles = max(1, min(height, self.workers()*TileExecutor.tilesPerWorker))
+                limits = [(i*height)//nbTiles for i in range(nbTiles)]+[height]
+                colorSpaceName = img.colorSpace.name if img.colorSpace else 'sRGB'
+                tasks = [(shmIn.name, shmOut.name, shape, limits[i], limits[i+1], processPipeDict, backend, img.type, img.linear, colorSpaceName) for i in range(nbTiles)]
+
+                linear, colorSpaceName, cancelled = img.linear, colorSpaceName, False
+                for nbDone, res in enumerate(self.pool.imap_unordered(_computeTile, tasks), start=1):
+                    if res: 
+                        y0, y1, linear, colorSpaceName, tileStart, tileDuration, pid = res
+                        # tile timed by worker process (same clock): one row per worker in Chrome trace
+                        profiler.record('tile', 'tile', tileStart, tileDuration, backend=backend, outShape=(y1-y0,)+tuple(shape[1:]), pid=pid, tid=pid)
+                    if progress: progress(int(nbDone*100/nbTiles))
+                    if isCancelled and isCancelled():
+                        cancelled = True
+                        break
+
+                if cancelled: return None
+
+                dst = np.ndarray(shape, dtype=np.float32, buffer=shmOut.buf)
+                colorData = np.array(dst)
+                del dst
+            finally:
+                shmIn.close(); shmIn.unlink()
+                shmOut.close(); shmOut.unlink()
+
+        res = image.Image(img.path, img.name, colorData, img.type, linear, image.ColorSpace.build(colorSpaceName), img.scalingFactor)
+        if img.metadata:
+            # metadata refers to its image: copy metadata without copying input image
+            res.metadata = copy.copy(img.metadata)
+            res.metadata.metadata = copy.deepcopy(img.metadata.metadata)
+            res.metadata.image = res
+
+        profiler.record('TileExecutor.compute', 'pipe', start, timer() - start, backend=backend, inShape=shape, outShape=res.colorData.shape, 
+                        bytes=res.colorData.nbytes, tiles=nbTiles, workers=self.workers())
+        trace.info('EXECUTOR', "TileExecutor.compute(",img.name,"): done in",timer()-start,"s (",nbTiles,"tiles,",self.workers(),"workers)")
+        return res
+
+    def close(self):
+        """terminate worker processes."""
+        with self.lock:
+            if self.pool:
+                self.pool.close()
+                self.pool.join()
+                self.pool = None
+# -----------------------------------------------------------------------------
+__tileExecutor = None
+def tileExecutor():
+    """returns the TileExecutor of the application (created at first call).
+
+        Returns:
+            (hdrCore.executor.TileExecutor)
+    """
+    global __tileExecutor
+    if not __tileExecutor: __tileExecutor = TileExecutor()
+    return __tileExecutor
@@ -26,7 +26,8 @@ package hdrCoreconsists of the core classes for HDR imaging.
 # -----------------------------------------------------------------------------
 import enum, rawpy, colour, imageio, copy, os, functools, skimage.transform
 import numpy as np
-from . import utils, processing, metadata
+from . import utils, processing, metadata, statistics, trace, profiling
+from timeit import default_timer as timer
 import preferences.preferences as pref
 
 imageio.plugins.freeimage.download()
@@ -145,12 +146,14 @@ class Image(object):
         scalingFactor (float):      scaling factor to range[0..1]
         metadata (hdrCore.metadatametadata): metadata
         histogram(hdrCore.image.Histogram): image histogram   
+        stats (hdrCore.statistics.ImageStatistics): cached statistics (see statistics)
     
     Methods:
         isHDR:                      (boolean) returns True if image is HDR
         process:                    (hdrCore.image.Image) computes a processing and returns a new Image 
         write:                      () write image and json metadata on disk (HDR image only)
         getChannel:                 ()
+        statistics:                 (hdrCore.statistics.ImageStatistics) shared statistics (histograms, percentiles), computed once
         getDynamicRange:
         buildHistogram:
         plot:
@@ -161,7 +164,11 @@ class Image(object):
        read:                        (hdrCore.image.Image) read an image from file
        toOne:                       /!\ not used in uHDR
        buildLchColorData:
+
+    Class Attributes:
+        thumbnailLevels (tuple[int]): widths of the small thumbnails (gallery, thumbnails/<width>/), in addition to the ProcessPipe.maxSize thumbnail
     """
+    thumbnailLevels = (320, 640)
 
     def __init__(self, path, name, colorData, type, linear, colorspace, scalingFactor=1.0):
         """__init__(): constrctor of class image.Image
@@ -189,6 +196,7 @@ class Image(object):
         self.scalingFactor  = scalingFactor                 # scaling to factor to range [0,1] (float)
         self.metadata       = None                          # associated meta data  (hdrCore.metadata.metadata)   
         self.histogram      = None                          # histogram             (hdrCore.image.Histogram)
+        self.stats          = None                          # cached statistics     (hdrCore.statistics.ImageStatistics)
 
     def isHDR(self):
         """isHDR: return True is image is HDR
@@ -216,7 +224,7 @@ class Image(object):
         return process.compute(self,**kwargs)
 
     @staticmethod
-    def read(filename, thumb = False):
+    def read(filename, thumb = False, thumbSize = None):
         """
         Method to read image from its filename. blablabla TODO à compléter.
         
@@ -225,6 +233,8 @@ class Image(object):
                 Filename of the file to read.
             thumb: boolean
                 This flag indicates us if soft have to read the thumbnail or the original file for what the thumbnail will be created.
+            thumbSize: int
+                Optionnal: with thumb, the smallest thumbnail level (see Image.thumbnailLevels) which width is greater than thumbSize is read (created if required).
                 
         Returns:
             image.Image
@@ -237,6 +247,7 @@ class Image(object):
         
         TODO - Exemple à modifier
         """
+        start = timer()
 
         imgDouble, imgDoubleFull = None, None
         # image name
@@ -275,9 +286,22 @@ class Image(object):
         # post processing for HDR scaling to [ ,1]
         elif ext =="hdr":
             if thumb: 
+                # smallest thumbnail level fitting thumbSize
+                levelStr, levelX = None, None
+                if thumbSize:
+                    levels = sorted(filter(lambda l: (l >= thumbSize) and (l < processing.ProcessPipe.maxSize), Image.thumbnailLevels))
+                    if len(levels) > 0: 
+                        levelX = levels[0]
+                        # one sub-directory per level: file names cannot collide with thumbnails of other images
+                        levelStr = os.path.join(path,"thumbnails",str(levelX),"_"+name+"."+ext)
+
                 # do not read input only the thumbnail
                 searchStr = os.path.join(path,"thumbnails","_"+name+"."+ext)
-                if os.path.exists(searchStr): 
+                if levelStr and os.path.exists(levelStr):
+                    imgDouble = colour.read_image(levelStr, bit_depth='float32', method='Imageio') # <--- read small thumbnail of input file
+                    levelStr = None
+
+                elif os.path.exists(searchStr): 
                     imgDouble = colour.read_image(searchStr, bit_depth='float32', method='Imageio') # <--- read thumbnail of input file
 
                 else:
@@ -297,6 +321,14 @@ class Image(object):
 
                     imgDouble = imgThumbnail
 
+                # create small thumbnail level from thumbnail
+                if levelStr:
+                    iY, iX, _ = imgDouble.shape
+                    if levelX < iX:
+                        imgDouble = np.float32(skimage.transform.resize(imgDouble, (int(iY * levelX/iX),levelX )))
+                        os.makedirs(os.path.dirname(levelStr), exist_ok=True)
+                        colour.write_image(imgDouble,levelStr, method='Imageio')
+
             else:
                 # thumb set to False, read input not the thumbnail
                 imgDouble = colour.read_image(filename, bit_depth='float32', method='Imageio')
@@ -331,6 +363,7 @@ class Image(object):
                 scaling = pref.getHDRdisplays()[disp]['scaling']
                 res.colorData = res.colorData/scaling  
 
+        profiling.profiler().record('Image.read', 'io', start, timer() - start, thumb=thumb, outShape=res.colorData.shape, bytes=res.colorData.nbytes)
         return res
 
     def write(self,filename):
@@ -343,8 +376,10 @@ class Image(object):
         """
         if self.isHDR():
 
+            start = timer()
             path, name, ext = utils.filenamesplit(filename)
             colour.write_image(self.colorData,filename, method='Imageio')
+            profiling.profiler().record('Image.write', 'io', start, timer() - start, inShape=self.colorData.shape)
 
             # update filename related metadata before saving
             self.name = name+'.'+ext
@@ -393,6 +428,20 @@ class Image(object):
         else:
             return None
 
+    def statistics(self):
+        """
+        Retrieve the shared statistics of image (computed once, on request)
+
+        Returns:
+            hdrCore.statistics.ImageStatistics
+                statistics, valid while colorData is not replaced
+        """
+        stats = self.stats
+        if not stats or not (stats.colorData is self.colorData) or stats.linear != self.linear:
+            stats = statistics.ImageStatistics(self)
+            self.stats = stats
+        return stats
+
     def getDynamicRange(self,percentile=None):
         """
         Retrieve the dynamic range of image
@@ -406,13 +455,8 @@ class Image(object):
                 The dynamic range of the image
         """
 
-        Y_min,Y_max = None, None
-        Y = self.getChannel(channel.Y)
-
-        if percentile == None : Y_min, Y_max = np.amin(Y[Y>0]), np.amax(Y)                  # use min and max
-        else: Y_min, Y_max = np.percentile(Y[Y>0],percentile), np.percentile(Y,100-percentile)   # percentile
-
-        return np.log2(Y_max)-np.log2(Y_min)
+        # streaming log2 histogram of luminance (by strips, no XYZ image, no sort): percentiles error < 1/128 stop
+        return self.statistics().logLuminance().dynamicRange(percentile)
 
     #def getMinMaxPerChannel(self):
     #    """TODO - documentation de la méthode getMinMaxPerChannel
@@ -806,7 +850,7 @@ class Histogram(object):
             dot2 = np.dot(res.histValue,res.histValue)
             res.histValue = res.histValue/np.sqrt(dot2)
         else:
-            print("WARNING[Histogram.normalise(",self.name,"): unknown norm:", norm,"!]")
+            trace.warning('PROCESS', "Histogram.normalise(",self.name,"): unknown norm:", norm)
         return res
 
     @staticmethod
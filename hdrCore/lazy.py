@@ -0,0 +1,243 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+lazy imports, warm-up and startup profiling:
+    heavy dependencies that are not required to show the main window (torch, sklearn, numba) are imported on
+    first use through LazyModule proxies, or in background after the window is shown (warmUp), together with warm-up
+    tasks (JIT compilation of kernels, loading of networks).
+    StartupProfiler measures import time of each module and duration of initialization phases (uHDR.py --profile-startup).
+
+usage:
+    torch = lazy.module('torch')            # nothing imported
+    torch.load(...)                         # torch imported here (once)
+    sklearn = lazy.module('sklearn')
+    sklearn.cluster.KMeans(...)             # sub-modules are imported on attribute access
+
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import builtins, importlib, sys, threading, contextlib
+from timeit import default_timer as timer
+from . import trace
+
+# -----------------------------------------------------------------------------
+# --- Class LazyModule --------------------------------------------------------
+# -----------------------------------------------------------------------------
+class LazyModule(object):
+    """
+    proxy of a module imported on first attribute access (thread safe: concurrent first accesses import once).
+    Missing attributes are looked up as sub-modules (sklearn.cluster, torch.autograd).
+
+    Attributes:
+        name (str): module name
+
+    Methods:
+        load
+        isLoaded
+    """
+    def __init__(self, name):
+        self.__dict__['name'] = name
+        self.__dict__['_LazyModule__module'] = None
+        self.__dict__['_LazyModule__lock'] = threading.Lock()
+
+    def load(self):
+        """import module (if not yet imported) and returns it.
+
+            Returns:
+                (module)
+        """
+        if self.__module is None:
+            with self.__lock:
+                if self.__module is None:
+                    start = timer()
+                    module = importlib.import_module(self.name)
+                    loadTimes[self.name] = timer() - start
+                    self.__dict__['_LazyModule__module'] = module
+        return self.__module
+
+    def isLoaded(self):
+        """returns True if module has been imported."""
+        return self.__module is not None
+
+    def __getattr__(self, attr):
+        module = self.load()
+        try:
+            return getattr(module, attr)
+        except AttributeError:
+            return importlib.import_module(self.name+'.'+attr)
+
+    def __setattr__(self, attr, value): setattr(self.load(), attr, value)
+
+    def __repr__(self):
+        return "<lazy module '"+self.name+"' ("+("loaded" if self.isLoaded() else "not loaded")+")>"
+# -----------------------------------------------------------------------------
+# key: module name, value: import time (second) of modules imported through LazyModule
+loadTimes = {}
+
+__modules = {}
+__modulesLock = threading.Lock()
+def module(name):
+    """returns the lazy proxy of a module (one proxy per module name).
+
+        Args:
+            name (str, Required): module name
+
+        Returns:
+            (hdrCore.lazy.LazyModule)
+    """
+    with __modulesLock:
+        if name not in __modules: __modules[name] = LazyModule(name)
+        return __modules[name]
+
+def warmUp(names=None, callback=None, tasks=None):
+    """import lazy modules then run warm-up tasks in a background (daemon) thread: called after the main window is shown,
+    first use is then fast.
+
+        Args:
+            names (list[str], Optionnal): module names, None: all lazy modules
+            callback (function, Optionnal): called (from background thread) with dict of times (second) when over,
+                                            key: module or task name, value: None if failed
+            tasks (list[tuple], Optionnal): (name, function) run after imports (e.g. JIT compilation, network loading)
+
+        Returns:
+            (threading.Thread)
+    """
+    def run():
+        with __modulesLock: proxies = [__modules[n] for n in (names if names else list(__modules.keys())) if n in __modules]
+        times = {}
+        for proxy in proxies:
+            try:
+                proxy.load()
+                times[proxy.name] = loadTimes.get(proxy.name, 0.0)
+            except ImportError as e:
+                trace.warning('LAZY', "warmUp: import of",proxy.name,"failed:",repr(e))
+                times[proxy.name] = None
+        for name, function in (tasks if tasks else []):
+            start = timer()
+            try:
+                function()
+                times[name] = timer() - start
+            except Exception as e:
+                # warm-up is an optimization: a failing task is done again on first use
+                trace.warning('LAZY', "warmUp: task",name,"failed:",repr(e))
+                times[name] = None
+        if callback: callback(times)
+    thread = threading.Thread(target=run, name='uHDR-warmup', daemon=True)
+    thread.start()
+    return thread
+# -----------------------------------------------------------------------------
+# --- Class StartupProfiler ---------------------------------------------------
+# -----------------------------------------------------------------------------
+class StartupProfiler(object):
+    """
+    startup profiler: import time per module (inclusive and self time, first import only) and initialization phases.
+    Imports are measured by wrapping builtins.__import__ between start and stop.
+
+    Attributes:
+        imports (dict): key: module name, value: [inclusive time, self time] (second)
+        phases (list): (phase name, duration (second))
+        origin (float): start time
+
+    Methods:
+        start
+        stop
+        phase
+        mark
+        report
+    """
+    def __init__(self):
+        self.imports = {}
+        self.phases = []
+        self.origin = None
+        self.__import = None
+        self.__stack = []
+        self.__last = None
+
+    def start(self):
+        """start measuring imports."""
+        self.origin = self.__last = timer()
+        self.__import = builtins.__import__
+        profiler, original = self, self.__import
+
+        def timedImport(name, globals=None, locals=None, fromlist=(), level=0):
+            # only first import of absolute module names (other imports are dictionary lookups)
+            if level != 0 or name in sys.modules or threading.current_thread() is not threading.main_thread():
+                return original(name, globals, locals, fromlist, level)
+            profiler.__stack.append(0.0)
+            start = timer()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                elapsed = timer() - start
+                children = profiler.__stack.pop()
+                if profiler.__stack: profiler.__stack[-1] += elapsed
+                if name not in profiler.imports: profiler.imports[name] = [elapsed, elapsed - children]
+        builtins.__import__ = timedImport
+
+    def stop(self):
+        """stop measuring imports."""
+        if self.__import: builtins.__import__ = self.__import
+        self.__import = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """context manager that measures an initialization phase.
+
+            Args:
+                name (str, Required): phase name
+        """
+        start = timer()
+        try: yield
+        finally:
+            self.phases.append((name, timer() - start))
+            self.__last = timer()
+
+    def mark(self, name):
+        """record phase that lasted since end of previous phase (e.g. 'window shown').
+
+            Args:
+                name (str, Required): phase name
+        """
+        now = timer()
+        self.phases.append((name, now - self.__last))
+        self.__last = now
+
+    def report(self, nbImports=25, file=None):
+        """print startup report: phases, then slowest imports (inclusive time) with their self time.
+
+            Args:
+                nbImports (int, Optionnal): number of imports reported
+                file (file, Optionnal): output, standard output if None
+        """
+        out = file if file else sys.stdout
+        total = (self.__last - self.origin) if self.origin else 0.0
+        print("uHDR startup profile: "+f"{total:.3f}s", file=out)
+        print("  phases:", file=out)
+        for name, duration in self.phases: print(f"    {duration:8.3f}s  {name}", file=out)
+        print(f"  imports (first {nbImports}, inclusive / self time):", file=out)
+        for name, (inclusive, own) in sorted(self.imports.items(), key=lambda kv: -kv[1][0])[:nbImports]:
+            print(f"    {inclusive:8.3f}s {own:8.3f}s  {name}", file=out)
+        if loadTimes:
+            print("  lazy imports (on first use or warm-up):", file=out)
+            for name, duration in sorted(loadTimes.items(), key=lambda kv: -kv[1]): print(f"    {duration:8.3f}s  {name}", file=out)
+        out.flush()
+# -----------------------------------------------------------------------------
@@ -27,7 +27,7 @@ package hdrCore consists of the core classes for HDR imaging.
 # -----------------------------------------------------------------------------
 import enum, rawpy, colour, imageio, json, os, subprocess, ast, copy
 import numpy as np
-from . import utils, processing, image
+from . import utils, processing, image, trace
 import preferences.preferences as pref
 
 # -----------------------------------------------------------------------------
@@ -167,7 +167,7 @@ class metadata:
                         if keyInFile in res.metadata :
                             res.metadata[keyInFile] = copy.deepcopy(metaInFile[keyInFile])
                         else:
-                            print(f'WARNING[metadata "{keyInFile}" not in "tags.json"  will be deleted! (consider changing "keepAllMeta" to "True" in  preferences.py)]')
+                            trace.warning('META', f'metadata "{keyInFile}" not in "tags.json" will be deleted! (consider changing "keepAllMeta" to "True" in preferences.py)')
 
                 if _image.isHDR(): res.metadata['exif']['Color Space']=   'scRGB'
 
@@ -210,17 +210,17 @@ class metadata:
                         stdin=subprocess.PIPE, stderr=subprocess.PIPE)
                     exifdata = exifdata.splitlines()
                 except:
-                    print("ERROR[metadata.readExif(",filename,"): error while reading!]")
+                    trace.error('META', "metadata.readExif(",filename,"): error while reading!")
                     exifdata =[]
                 # buid exif dict
                 for each in exifdata:
                     tag,val = each.split(':',1)# tags and values are separated by a semi colon
                     exifDict[tag.strip()] = val.strip()
             else: 
-                print("ERROR[metadata.readExif(",filename,"): consider installing exiftool for better exif metadata, degraded mode with imageio!]")
+                trace.error('META', "metadata.readExif(",filename,"): consider installing exiftool for better exif metadata, degraded mode with imageio!")
                 img = imageio.imread(filename)
                 exifDict = img.meta['EXIF_MAIN'] if 'EXIF_MAIN' in img.meta else {}
-        else: print("ERROR[metadata.readExif(",filename,"): file not found]")
+        else: trace.error('META', "metadata.readExif(",filename,"): file not found")
 
         return exifDict
     # ---------------------------------------------------------------------------
@@ -244,7 +244,7 @@ class metadata:
                 elif exif[exifColorSpace[2]]==2:    self.metadata['exif']['Color Space']=   'Adobe RGB (1998)'
                 else:                               self.metadata['exif']['Color Space']=   metadata.defaultColorSpaceName
             else: 
-                print("WARNING[",self.image.name, "exif does not contain 'Color Space' nor 'Profile Description', color space is set to sRGB  or scRGB for HDR images!]")
+                trace.warning('META', self.image.name, "exif does not contain 'Color Space' nor 'Profile Description', color space is set to sRGB or scRGB for HDR images!")
                 self.metadata['exif']['Color Space'] = metadata.defaultColorSpaceName 
 
             # exposure time: 'Exposure Time', 'ExposureTime' 
@@ -313,7 +313,7 @@ class metadata:
         
         else: # exif data = {}
             self.metadata['exif']['Color Space'] = metadata.defaultColorSpaceName
-            print(" [META] >> metadata.recoverData(",self.image.name,").colorSpace undefined set it to:", 'sRGB or scRGB for HDR images')
+            trace.debug('META', "metadata.recoverData(",self.image.name,").colorSpace undefined set it to:", 'sRGB or scRGB for HDR images')
 
         # bit per sample
         if self.metadata['exif']['Bits Per Sample'] == None:
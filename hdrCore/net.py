@@ -24,6 +24,8 @@ package hdrCoreconsists of the core classes for HDR imaging.
 # -----------------------------------------------------------------------------
 # --- Import ------------------------------------------------------------------
 # -----------------------------------------------------------------------------
+import threading
+import numpy as np
 import torch
 import torch.nn as nn
 
@@ -43,4 +45,66 @@ class Net(nn.Module):
         """
         """
         return self.layer(x)
-    
\ No newline at end of file
+    
+# -----------------------------------------------------------------------------
+# --- auto tone curve network -------------------------------------------------
+# -----------------------------------------------------------------------------
+__autoCurveNets = {}
+__autoCurveLock = threading.Lock()
+def autoCurveNet(weightFile='MSESig505_0419.pth'):
+    """returns the auto tone curve network (Net(50,5) with weights of weightFile, eval mode), loaded and traced once per
+    process (torch.jit.trace on a cumulative histogram): the first auto tone curve does not wait for loading or
+    first-inference overhead when it has been called by the warm-up phase.
+
+        Args:
+            weightFile (str, Optionnal): network weights
+
+        Returns:
+            (torch.jit.ScriptModule): traced network, input: (n, 50) float tensor, output: (n, 5) key points in [0,1]
+    """
+    with __autoCurveLock:
+        if weightFile not in __autoCurveNets:
+            model = Net(50,5)
+            model.load_state_dict(torch.load(weightFile))
+            model.eval()
+            with torch.no_grad():
+                example = torch.cumsum(torch.full((1,50), 1.0/50), dim=1)
+                traced = torch.jit.trace(model, example)
+                traced(example)                                 # first inference (allocations, kernel selection)
+            __autoCurveNets[weightFile] = traced
+        return __autoCurveNets[weightFile]
+# -----------------------------------------------------------------------------
+def toneCurveInput(histogram):
+    """returns network input of a luminance histogram: cumulative histogram normalized to [0,1].
+
+        Args:
+            histogram (numpy.ndarray, Required): 50 bins histogram of tone curve input (see hdrCore.statistics.ImageStatistics.histogram)
+
+        Returns:
+            (numpy.ndarray)
+    """
+    histogram = np.asarray(histogram, dtype=np.float64)
+    histogram = histogram/max(np.amax(histogram), 1e-12)
+    cumulative = np.cumsum(histogram)
+    return cumulative/max(np.amax(cumulative), 1e-12)
+
+def predictToneCurves(histograms, weightFile='MSESig505_0419.pth'):
+    """predict tone curve control points of several images in a single (batched) inference.
+
+        Args:
+            histograms (list[numpy.ndarray], Required): 50 bins histograms of tone curve inputs
+            weightFile (str, Optionnal): network weights
+
+        Returns:
+            (list[dict]): tone curve parameters (keys: 'start', 'shadows', 'blacks', 'mediums', 'whites', 'highlights', 'end')
+    """
+    if len(histograms) == 0: return []
+    x = torch.from_numpy(np.float32(np.stack(list(map(toneCurveInput, histograms)))))
+    with torch.no_grad():
+        y = autoCurveNet(weightFile)(x)
+    res = []
+    for kpc in (y*100).tolist():
+        res.append({'start':[0.0,0.0], 'shadows': [10.0,kpc[0]], 'blacks': [30.0,kpc[1]], 'mediums': [50.0,kpc[2]],
+                    'whites': [70.0,kpc[3]], 'highlights': [90.0,kpc[4]], 'end': [100.0,100.0]})
+    return res
+# -----------------------------------------------------------------------------
@@ -26,6 +26,7 @@ package hdrCore consists of the core classes for HDR imaging.
 # -----------------------------------------------------------------------------
 import numba
 import numpy as np
+from timeit import default_timer as timer
 # -----------------------------------------------------------------------------
 # --- Functions: numba version ------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -96,6 +97,34 @@ def cuda_cctf_sRGB_encoding(L):
 def numba_sRGB_to_XYZ(sRGB, cctf_decoding=None):
     pass
 # -----------------------------------------------------------------------------
+# --- Kernel registry and warm-up ---------------------------------------------
+# -----------------------------------------------------------------------------
+# kernels used by hdrCore.processing per computation mode (see preferences.preferences.computation)
+kernels = {
+    'numba':    [numba_cctf_sRGB_encoding, numba_cctf_sRGB_decoding],
+    'cuda':     [cuda_cctf_sRGB_decoding, cuda_cctf_sRGB_encoding]
+    }
+# array shapes kernels are compiled for (images, and pixel vectors)
+warmUpShapes = ((4,4,3), (16,3))
+
+def warmUp(computation, dtype=np.float32):
+    """compile (or load from cache=True artifacts) registered kernels of computation mode for dtype arrays, so that the
+    first edit does not wait for JIT compilation.
+
+        Args:
+            computation (str, Required): computation mode ('python': nothing to compile, 'numba', 'cuda')
+            dtype (numpy.dtype, Optionnal): array type
+
+        Returns:
+            (dict): key: kernel name, value: compilation time (second)
+    """
+    times = {}
+    for kernel in kernels.get(computation, []):
+        start = timer()
+        for shape in warmUpShapes: kernel(np.full(shape, 0.5, dtype=dtype))
+        times[getattr(kernel, '__name__', repr(kernel))] = timer() - start
+    return times
+# -----------------------------------------------------------------------------
 # -----------------------------------------------------------------------------
 #CAT_CAT02 = np.array([
 #    [0.7328, 0.4296, -0.1624],
@@ -26,7 +26,7 @@ package hdrCore consists of the core classes for HDR imaging.
 # --- Import ------------------------------------------------------------------
 # -----------------------------------------------------------------------------
 import copy, colour, skimage.transform, math, os
-import pathos.multiprocessing, multiprocessing, subprocess
+import multiprocessing, subprocess
 import numpy as np
 import skimage.transform
 import functools
@@ -35,7 +35,8 @@ from geomdl import utilities
 from . import image, utils, aesthetics
 # RCZT 2023
 # from . import image, utils, numbafun, aesthetics
-import guiQt.controller as gc
+from . import lazy, trace, profiling
+numbafun = lazy.module('hdrCore.numbafun')      # numba is imported (and kernels compiled) only in numba and cuda computation modes
 import preferences.preferences as pref
 from timeit import default_timer as timer
 
@@ -246,7 +247,6 @@ class exposure(Processing):
         Returns:
             (hdrCore.image.Image): output image
         """
-        start= timer()
         defaultEV = 0.0
         if not kwargs: kwargs = {'EV': defaultEV}  # default value
         
@@ -261,26 +261,20 @@ class exposure(Processing):
             if not res.linear:
                 
                 if pref.computation == 'python':
-                    start = timer()
                     res.colorData =     colour.cctf_decoding(res.colorData, function='sRGB')
                     res.linear =        True
 
                 elif pref.computation == 'numba':
-                    start = timer()
                     res.colorData =     numbafun.numba_cctf_sRGB_decoding(res.colorData) # encode to prime
                     res.linear =        True
 
                 elif pref.computation == 'cuda':
-                    start = timer()
                     res.colorData =     numbafun.cuda_cctf_sRGB_decoding(res.colorData) # encode to prime
                     res.linear =        True
 
-                dt = timer() - start
 
             res.colorData =     res.colorData*math.pow(2,EV)
 
-        end = timer()
-        if pref.verbose: print (" [PROCESS-PROFILING](",end - start,") >> exposure(",img.name,"):", kwargs)
 
         return res
 
@@ -299,26 +293,22 @@ class exposure(Processing):
         minEV, maxEV, step =  -10,10,0.25
         evs = np.linspace(minEV,maxEV,num=int((maxEV-minEV)/step)+1)
 
-        rgb = copy.deepcopy(img.colorData)
-        nbPix = rgb.shape[0]*rgb.shape[1]
-
-        if not img.linear:  rgbLinear = colour.cctf_decoding(rgb,function='sRGB')
-        else:               rgbLinear = rgb
+        # linear subsample shared with other consumers (hdrCore.statistics): decoded once, not per EV
+        rgbLinear = img.statistics().linearRGB(subsample=True)
+        nbPix = rgbLinear.shape[0]*rgbLinear.shape[1]
 
         bins = np.linspace(0,1,25+1)
 
-        # local method for pool (not static!)
         def evEval(ev):
             """
-            TODO - Documentation de la méthode evEval
+            ratio of pixels not in the darkest and brightest bins of luminance histogram after exposure ev
 
             Args:
-                ev: TODO
-                    TODO
+                ev: float
+                    Required: exposure (EV)
                     
             Returns:
-                TODO
-                    TODO
+                float
             """
             rgb_ev = rgbLinear*math.pow(2,ev)
             rgb_ev_prime = colour.cctf_encoding(rgb_ev,function='sRGB')
@@ -331,12 +321,11 @@ class exposure(Processing):
 
             return sumH
 
-        _pool = pathos.multiprocessing.ProcessPool()
-        results = _pool.map( evEval, evs)
-        sumsH  = list(results)
+        # subsample is small: sequential evaluation is faster than starting a process pool
+        sumsH  = list(map(evEval, evs))
         
         bestEV = evs[np.argmax(sumsH)]
-        if pref.verbose: print('  [PROCESS] >> exposure.auto(',img.name,'):BEST EV:',bestEV)
+        trace.debug('PROCESS', 'exposure.auto(',img.name,'):BEST EV:',bestEV)
       
         return {'EV':bestEV}
 # -----------------------------------------------------------------------------
@@ -360,7 +349,6 @@ class contrast(Processing):
         Returns:
             (hdrCore.image.Image,  Required): output image
         """
-        start = timer()
         defaultContrast =   0.0
         maxContrastFactor = 2.0     ###### 5.0
         if not kwargs: kwargs = { "contrast": defaultContrast }  # default value 
@@ -375,21 +363,17 @@ class contrast(Processing):
             # contrast scaling is computed in prime colorspace
             if img.linear: 
                 if pref.computation == 'python':
-                    start = timer()
                     res.colorData =     colour.cctf_encoding(res.colorData, function='sRGB') # encode to prime
                     res.linear =        False
 
                 elif pref.computation == 'numba':
-                    start = timer()
                     res.colorData =     numbafun.numba_cctf_sRGB_encoding(res.colorData) # encode to prime
                     res.linear =        False
 
                 elif pref.computation == 'cuda':
-                    start = timer()
                     res.colorData =     numbafun.cuda_cctf_sRGB_encoding(res.colorData) # encode to prime
                     res.linear =        False
 
-                dt = timer() - start
 
             # scaling contrast
             contrastValue = contrastValue/100 
@@ -402,8 +386,6 @@ class contrast(Processing):
 
             res.colorData = scalingFactor*(res.colorData-0.5)+0.5
         
-        end=timer()    
-        if pref.verbose: print(" [PROCESS-PROFILING] (",end-start,")>> contrast(",img.name,"):", kwargs)
 
         return res
 # -----------------------------------------------------------------------------
@@ -458,9 +440,9 @@ class ColorSpaceTransform(Processing):
         """ 
         # first create a copy
         res = copy.deepcopy(img)
-        if not kwargs: print("WARNING[Processing.ColorSpaceTransform(",img.name,"):", "no destination colour space >> return a copy of image]")
+        if not kwargs: trace.warning('PROCESS', "Processing.ColorSpaceTransform(",img.name,"):", "no destination colour space >> return a copy of image")
         else:
-            if not 'dest'in kwargs: print("WARNING[Processing.ColorSpaceTransform(",img.name,"):", "no 'dest' colour space >> return a copy of image]")
+            if not 'dest'in kwargs: trace.warning('PROCESS', "Processing.ColorSpaceTransform(",img.name,"):", "no 'dest' colour space >> return a copy of image")
             else: # -> 'colorSpace' found
                 if  kwargs['dest'] == 'Lab': # DEST: Lab
                     currentCS = img.colorSpace.name
@@ -499,7 +481,7 @@ class ColorSpaceTransform(Processing):
                     elif currentCS == "sRGB": # sRGB -> sRGB
                         pass # return a copy             
                     else:
-                        print("WARNING[Processing.ColorSpaceTransform(",img.name,"):", "'dest' colour space:",kwargs['dest'] , "not yet implemented !]")
+                        trace.warning('PROCESS', "Processing.ColorSpaceTransform(",img.name,"):", "'dest' colour space:",kwargs['dest'] , "not yet implemented !")
 
                 elif kwargs['dest'] == 'XYZ': # DEST: XYZ
                     currentCS = img.colorSpace.name
@@ -582,7 +564,6 @@ class Ycurve(Processing):
             (hdrCore.image.Image, Required): image
                 result of Ycurve processing
         """ 
-        start =  timer()
         defaultControlPoints = {'start':[0,0], 
                                 'shadows': [10,10], 
                                 'blacks': [30,30], 
@@ -601,21 +582,17 @@ class Ycurve(Processing):
 
             if img.linear: 
                 if pref.computation == 'python':
-                    start = timer()
                     res.colorData =     colour.cctf_encoding(res.colorData, function='sRGB') # encode to prime
                     res.linear =        False
 
                 elif pref.computation == 'numba':
-                    start = timer()
                     res.colorData =     numbafun.numba_cctf_sRGB_encoding(res.colorData) # encode to prime
                     res.linear =        False
 
                 elif pref.computation == 'cuda':
-                    start = timer()
                     res.colorData =     numbafun.cuda_cctf_sRGB_encoding(res.colorData) # encode to prime
                     res.linear =        False
 
-                dt = timer() - start
 
             colorDataY =    sRGB_to_XYZ(res.colorData, apply_cctf_decoding=False)[:,:,1] 
             # change for multi-threading computation
@@ -647,8 +624,6 @@ class Ycurve(Processing):
                 res.colorData[:,:,1] = res.colorData[:,:,1]*colorDataFY/colorDataY
                 res.colorData[:,:,2] = res.colorData[:,:,2]*colorDataFY/colorDataY
         
-        end = timer()        
-        if pref.verbose: print(" [PROCESS-PROFILING] (",end - start,")>> Ycurve(",img.name,"):", kwargs)
 
         return res
 # -----------------------------------------------------------------------------
@@ -673,7 +648,6 @@ class saturation(Processing):
         Returns:
             (hdrCore.image.Image): output image
         """ 
-        start=timer()
         defaultValue= {'saturation': 0.0, 'method': 'gamma'}
 
         if not kwargs: kwargs = defaultValue  # default value 
@@ -705,8 +679,6 @@ class saturation(Processing):
             res.colorSpace = image.ColorSpace.build('Lch')
 
 
-        end = timer()
-        if pref.verbose: print(" [PROCESS-PROFILING] (",end - start,")>> saturation(",img.name,"):", kwargs)
 
         return res
 # -----------------------------------------------------------------------------
@@ -732,7 +704,6 @@ class colorEditor(Processing):
             (hdrCore.image.Image): output image
                 
         """
-        start = timer()
         defaultValue= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)}, 
                        'tolerance': 0.1,
                        'edit': {'hue':0.0,'exposure':0.0,'contrast':0.0,'saturation':0.0}, 
@@ -755,7 +726,6 @@ class colorEditor(Processing):
                 colorLCH = res.colorData
             elif res.colorSpace.name == 'sRGB':
 
-                covnStart = timer()
                 if res.linear: 
 
                     colorLab = sRGB_to_Lab(res.colorData, apply_cctf_decoding=False)
@@ -765,7 +735,6 @@ class colorEditor(Processing):
 
                     colorLab = sRGB_to_Lab(res.colorData, apply_cctf_decoding=True)
                     colorLCH = colour.Lab_to_LCHab(colorLab)
-                covnEnd = timer()
 
             # selection from colorLCH
             colorDataHue =          copy.deepcopy(colorLCH[:,:,2])
@@ -786,13 +755,11 @@ class colorEditor(Processing):
             lightTolerance = kwargs['tolerance']*100    # lightness range ~ 100
 
 
-            maskStart = timer()
 
             lightnessMask =     utils.NPlinearWeightMask(colorDataLightness, lMin, lMax, lightTolerance)
             chromaMask =        utils.NPlinearWeightMask(colorDataChroma, cMin, cMax, chromaTolerance)
             hueMask =           utils.NPlinearWeightMask(colorDataHue, hMin, hMax, hueTolerance)
 
-            maskEnd = timer()
 
             mask = np.minimum(lightnessMask, np.minimum(chromaMask,hueMask))
             compMask = 1.0 - mask
@@ -870,8 +837,6 @@ class colorEditor(Processing):
             res.colorSpace = image.ColorSpace.build('sRGB')
             res.linear = False
 
-        end = timer()
-        if pref.verbose: print(" [PROCESS-PROFILING](",end - start,") >> colorEditor(",img.name,"):", kwargs)
 
         return res
 # -----------------------------------------------------------------------------
@@ -897,7 +862,6 @@ class lightnessMask(Processing):
             TODO
                 TODO
         """
-        start = timer()
         defaultMask = { 'shadows': False, 'blacks': False, 'mediums': False, 'whites': False, 'highlights': False}
         rangeMask = {   'shadows': [0,20], 
                          'blacks': [20,40], 
@@ -929,8 +893,6 @@ class lightnessMask(Processing):
 
             res.colorData = mask
         
-        end = timer()
-        if pref.verbose: print(" [PROCESS-PROFILING](",end - start,") >> lightnessMask(",res.name,"):", kwargs)
 
         return res
 # -----------------------------------------------------------------------------
@@ -956,7 +918,6 @@ class geometry(Processing):
         Returns:
             (hdrCore.image.Image,Required): input image
         """ 
-        start = timer()
         defaultValue = { 'ratio': (16,9), 'up': 0,'rotation': 0.0}
         if not kwargs: kwargs = defaultValue  # default value 
         ratio =     kwargs['ratio']     if 'ratio' in kwargs.keys()     else defaultValue['ratio']
@@ -990,12 +951,63 @@ class geometry(Processing):
             res.colorData = res.colorData[int(h/2-hh/2):int(h/2+hh/2), int(w/2-ww/2):int(w/2+ww/2),:]
             res.shape = res.colorData.shape
 
-        end = timer()
-        if pref.verbose: print(" [PROCESS-PROFILING] (",end-start,")>> geometry(",res.name,"):", kwargs)
 
         return res
 # -----------------------------------------------------------------------------
 
+# -----------------------------------------------------------------------------
+# --- Class RenderContext ----------------------------------------------------
+# -----------------------------------------------------------------------------
+class RenderContext(object):
+    """
+    settings of a render, given to each call (ProcessPipe.setImage, guiQt.thread.cCompute, ...) instead of global flags:
+    concurrent renders (interactive editing, gallery loading, exports) use their own context.
+
+    Attributes:
+        size (int): maximum size (largest side) of input image, larger images are reduced; None for full size
+        quality (str): 'preview' (fast resize) or 'final' (interpolated resize)
+        backend (str): 'python' (process-nodes) or 'cpp' (hdrCore.coreC)
+
+    Methods:
+        interactive (static)
+        full (static)
+        resize
+    """
+
+    def __init__(self, size=None, quality='final', backend='python'):
+        self.size = size
+        self.quality = quality
+        self.backend = backend
+
+    @staticmethod
+    def interactive():
+        """context of interactive editing: input image reduced to ProcessPipe.maxWorking, fast resize."""
+        return RenderContext(size=ProcessPipe.maxWorking, quality='preview', backend='python')
+
+    @staticmethod
+    def full(backend='cpp'):
+        """context of full size render (display, export)."""
+        return RenderContext(size=None, quality='final', backend=backend)
+
+    def resize(self, img):
+        """returns image reduced to context size (largest side), image itself if not larger.
+
+        Args:
+            img (hdrCore.image.Image, Required): image
+
+        Returns:
+            (hdrCore.image.Image)
+        """
+        if not self.size: return img
+        height, width, _ = img.shape
+        antiAliasing = (self.quality == 'final')
+        if (height >= width) and (height > self.size):  return img.process(resize(),size=(self.size,None), anti_aliasing=antiAliasing)
+        elif (width >= height) and (width > self.size): return img.process(resize(),size=(None,self.size), anti_aliasing=antiAliasing)
+        return img
+
+    def __repr__(self): return 'RenderContext(size='+str(self.size)+', quality='+self.quality+', backend='+self.backend+')'
+# -----------------------------------------------------------------------------
+
 # -----------------------------------------------------------------------------
 # --- Class ProcessPipe ------------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -1008,17 +1020,23 @@ class ProcessPipe(object):
         originalImage (hdrCore.image.Image):
         __inputImage (hdrCore.image.Image):
         __outputImage (hdrCore.image.Image):
+        version (int): version of output image, incremented when output image changes
+        __views (dict): key 'linear' or 'display', value (version, hdrCore.image.Image) representations of output image (see getImage)
         processNodes ([ProcessNode]):
         previewHDR (bool):
         previewHDR_process ():
 
     Class Attributes:
-        autoResize (boolean): True resize automatically image for faster computation
-        maxSize (int): 
-        maxWorking (int):       
+        maxSize (int): size of the image thumbnail (see hdrCore.image.Image.read)
+        maxWorking (int): size of input image of interactive editing (see RenderContext.interactive)
+        processes (dict): key: process-node name, value: hdrCore.processing.Processing class
 
     Methods:
         append:                 (int) append a process node (ProcessNode) to process pipe (self)
+        build:                  (ProcessPipe) static, build the uHDR process pipe (default parameters or given ones)
+        fromDict:               (ProcessPipe) static, build a process pipe from its parameters (toDict)
+        clone:                  (ProcessPipe) structural copy: process-nodes and parameters, without images
+        compile:                (CompiledPlan) execution plan of current parameters, applicable to any image
         getName:                (str) return image name associated to processpipe
         setImage:               ()
         getInputImage           ()
@@ -1026,17 +1044,26 @@ class ProcessPipe(object):
         setParameters           ()
         getParameters           ()
         getProcessNodeByName    ()
+        residentBytes           (int) memory used by images held by processpipe
         __repr__                (str)
         __str__                 (str)
         updateProcessPipeMetadata ()
         updateHDRuseCase        ()
-        export                  ()
+        export                  (Image) non destructive export (separate execution context)
     """
     
-    # autoresizing for fast computation
-    autoResize =    True
+    # resizing for fast computation: see RenderContext
     maxSize =       1200 
     maxWorking =    1200 #800
+
+    # processing of process-node according to its name (without index), see fromDict
+    processes = {   'exposure':         exposure,
+                    'contrast':         contrast,
+                    'tonecurve':        Ycurve,
+                    'lightnessmask':    lightnessMask,
+                    'saturation':       saturation,
+                    'colorEditor':      colorEditor,
+                    'geometry':         geometry}
      
     # -------------------------------------------------------------------------
     # --- Class ProcessNode --------------------------------------------------
@@ -1057,6 +1084,7 @@ class ProcessPipe(object):
             condCompute
             setParameters
             getParameters
+            statistics
             toDict
         """
 
@@ -1079,17 +1107,20 @@ class ProcessPipe(object):
 
         def compute(self,img):
 
-            self.outputImage = self.process.compute(img,**self.params)
-            self.requireUpdate = False
+            with profiling.profiler().span(self.name, 'node', backend=pref.computation, cache='miss', inShape=img.shape) as args:
+                self.outputImage = self.process.compute(img,**self.params)
+                self.requireUpdate = False
+                if isinstance(self.outputImage, image.Image):
+                    args['outShape'], args['bytes'] = self.outputImage.colorData.shape, self.outputImage.colorData.nbytes
 
         def condCompute(self,img):
 
            if self.requireUpdate: self.compute(img)
-           pass
+           else: profiling.profiler().record(self.name, 'node', timer(), 0.0, cache='hit')
 
         def setParameters(self,paramDict):
 
-            if pref.verbose: print(" [PROCESS] >> ProcessNode.setParameters(",self.name,"):",paramDict)
+            trace.debug('PROCESS', "ProcessNode.setParameters(",self.name,"):",paramDict)
             self.params=paramDict
             self.requireUpdate = True
 
@@ -1097,6 +1128,11 @@ class ProcessPipe(object):
 
             return self.params
 
+        def statistics(self):
+            """returns statistics of node output (computed once per node version), None if node is not computed."""
+
+            return self.outputImage.statistics() if self.outputImage else None
+
         def toDict(self):
 
             return {self.name: self.params}
@@ -1115,9 +1151,155 @@ class ProcessPipe(object):
         self.__outputImage = None
         self.processNodes = []
 
+        # version of output image, representations of output image (see getImage)
+        self.version = 0
+        self.__views = {}
+
         self.previewHDR = True
         self.previewHDR_process = None
 
+    @staticmethod
+    def build(processPipeDict=None):
+        """build the uHDR process-pipe (process-nodes of the editing GUI, see guiQt.model.EditImageModel.buildProcessPipe):
+            exposure, contrast, tonecurve, lightnessmask, saturation, colorEditor0..4, geometry.
+            The process-pipe does not have input image.
+
+        Args:
+            processPipeDict (list[dict], Optionnal): parameters of process-nodes (see ProcessPipe.toDict), default parameters otherwise
+
+        Returns:
+            (hdrCore.processing.ProcessPipe)
+        """
+        processPipe = ProcessPipe()
+
+        # exposure ---------------------------------------------------------------------------------------------------------
+        defaultParameterEV = {'EV': 0}                                              
+        idExposureProcessNode = processPipe.append(exposure(), paramDict=None,name="exposure")   
+        processPipe.setParameters(idExposureProcessNode, defaultParameterEV)                                        
+
+        # contrast ---------------------------------------------------------------------------------------------------------
+        defaultParameterContrast = {'contrast': 0}                                  
+        idContrastProcessNode = processPipe.append(contrast(), paramDict=None,  name="contrast") 
+        processPipe.setParameters(idContrastProcessNode, defaultParameterContrast)                                  
+
+        #tonecurve ---------------------------------------------------------------------------------------------------------
+        defaultParameterYcurve = {'start':[0,0], 
+                                  'shadows': [10,10],
+                                  'blacks': [30,30], 
+                                  'mediums': [50,50], 
+                                  'whites': [70,70], 
+                                  'highlights': [90,90], 
+                                  'end': [100,100]}                         
+        idYcurveProcessNode = processPipe.append(Ycurve(), paramDict=None,name="tonecurve")      
+        processPipe.setParameters(idYcurveProcessNode, defaultParameterYcurve)   
+        
+        # masklightness ---------------------------------------------------------------------------------------------------------
+        defaultMask = { 'shadows': False, 
+                       'blacks': False, 
+                       'mediums': False, 
+                       'whites': False, 
+                       'highlights': False}
+        idLightnessMaskProcessNode = processPipe.append(lightnessMask(), paramDict=None, name="lightnessmask")  
+        processPipe.setParameters(idLightnessMaskProcessNode, defaultMask)  
+
+        # saturation ---------------------------------------------------------------------------------------------------------
+        defaultValue = {'saturation': 0.0,  'method': 'gamma'}
+        idSaturationProcessNode = processPipe.append(saturation(), paramDict=None, name="saturation")    
+        processPipe.setParameters(idSaturationProcessNode, defaultValue)                     
+
+        # colorEditor0 ---------------------------------------------------------------------------------------------------------
+        defaultParameterColorEditor0= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
+                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
+                                       'mask': False}        
+        idColorEditor0ProcessNode = processPipe.append(colorEditor(), paramDict=None, name="colorEditor0")  
+        processPipe.setParameters(idColorEditor0ProcessNode, defaultParameterColorEditor0)
+
+        # colorEditor1 ---------------------------------------------------------------------------------------------------------
+        defaultParameterColorEditor1= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
+                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
+                                       'mask': False}        
+        idColorEditor1ProcessNode = processPipe.append(colorEditor(), paramDict=None, name="colorEditor1")  
+        processPipe.setParameters(idColorEditor1ProcessNode, defaultParameterColorEditor1)
+        
+        # colorEditor2 ---------------------------------------------------------------------------------------------------------
+        defaultParameterColorEditor2= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
+                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
+                                       'mask': False}        
+        idColorEditor2ProcessNode = processPipe.append(colorEditor(), paramDict=None, name="colorEditor2")  
+        processPipe.setParameters(idColorEditor2ProcessNode, defaultParameterColorEditor2)
+        
+        # colorEditor3 ---------------------------------------------------------------------------------------------------------
+        defaultParameterColorEditor3= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
+                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
+                                       'mask': False}        
+        idColorEditor3ProcessNode = processPipe.append(colorEditor(), paramDict=None, name="colorEditor3")  
+        processPipe.setParameters(idColorEditor3ProcessNode, defaultParameterColorEditor3)
+        
+        # colorEditor4 ---------------------------------------------------------------------------------------------------------
+        defaultParameterColorEditor4= {'selection': {'lightness': (0,100),'chroma': (0,100),'hue':(0,360)},  
+                                       'edit': {'hue': 0.0, 'exposure':0.0, 'contrast':0.0,'saturation':0.0}, 
+                                       'mask': False}        
+        idColorEditor4ProcessNode = processPipe.append(colorEditor(), paramDict=None, name="colorEditor4")  
+        processPipe.setParameters(idColorEditor4ProcessNode, defaultParameterColorEditor4)
+
+        # geometry ---------------------------------------------------------------------------------------------------------
+        defaultValue = { 'ratio': (16,9), 'up': 0,'rotation': 0.0}
+        idGeometryNode = processPipe.append(geometry(), paramDict=None, name="geometry")    
+        processPipe.setParameters(idGeometryNode, defaultValue)
+        # ------------ --------------------------------------------------------------------------------------------------------- 
+
+        if processPipeDict:
+            for pMeta in processPipeDict:
+                name = list(pMeta.keys())[0]
+                idProcess = processPipe.getProcessNodeByName(name)
+                if idProcess != -1: processPipe.setParameters(idProcess, copy.deepcopy(pMeta[name]))
+
+        return processPipe
+
+    @staticmethod
+    def fromDict(processPipeDict):
+        """build a process-pipe (without image) from its parameters (see toDict): process-nodes are created according to their names.
+
+        Args:
+            processPipeDict (list[dict], Required): list of {process-node name: parameters}
+
+        Returns:
+            (hdrCore.processing.ProcessPipe)
+        """
+        processPipe = ProcessPipe()
+        for pMeta in processPipeDict:
+            name = list(pMeta.keys())[0]
+            key = name.rstrip('0123456789')
+            if key in ProcessPipe.processes: 
+                processPipe.append(ProcessPipe.processes[key](), paramDict=copy.deepcopy(pMeta[name]), name=name)
+        return processPipe
+
+    def clone(self):
+        """structural copy of the process-pipe: process-nodes (processing, name, parameters) are copied, images are not.
+            The original image is shared (read only, setImage replaces it): the clone can be set an other image or 
+            given an output (setOutput/getImage) without copying nor modifying images of self.
+
+        Returns:
+            (hdrCore.processing.ProcessPipe)
+        """
+        res = ProcessPipe()
+        for processNode in self.processNodes:
+            node = ProcessPipe.ProcessNode(copy.deepcopy(processNode.process), copy.deepcopy(processNode.params), processNode.name)
+            node.defaultParams = copy.deepcopy(processNode.defaultParams)
+            res.append(node)
+        res.originalImage = self.originalImage
+        res.previewHDR = self.previewHDR
+        res.previewHDR_process = self.previewHDR_process
+        return res
+
+    def compile(self):
+        """returns the execution plan of current parameters (see CompiledPlan).
+
+        Returns:
+            (hdrCore.processing.CompiledPlan)
+        """
+        return CompiledPlan(self.toDict())
+
     def append(self,process,paramDict=None,name=None):
         """
         TODO - Documentation de la méthode append
@@ -1146,10 +1328,10 @@ class ProcessPipe(object):
         """
         return self.__outputImage.name
 
-    def setImage(self,img):
+    def setImage(self,img,context=None):
         """set the input image to the process-pipeline:
             (1) a copy of the image is set to 'originalImage'
-            (2) if ProcessPipe.autoResize: the image is resized
+            (2) the image is resized according to render context
             (3) the (resize) is set to '__inputImage'
             (4) a copy of the resized image is set to '__outputImage' (for display)
             (5) initialize processpipe using 'img.metadata'  
@@ -1157,45 +1339,40 @@ class ProcessPipe(object):
 
         Args:
             img (hdrCore.image.Image, Required) : input image
+            context (hdrCore.processing.RenderContext, Optionnal): render context, None for interactive editing (RenderContext.interactive)
 
         Returns:
             
         """
-        if pref.verbose: print(" [PROCESS] >> ProcessPipe.setImage(",img.name,")")
+        trace.debug('PROCESS', "ProcessPipe.setImage(",img.name,", ",context,")")
 
         # resize input for faster computation
-        if ProcessPipe.autoResize:
-            height, width, channels = img.shape
-            if (height>= width) and (height>ProcessPipe.maxWorking):
-                img = img.process(resize(),size=(ProcessPipe.maxWorking,None))
-
-            elif (width>=height) and (width>ProcessPipe.maxWorking):   
-                img = img.process(resize(),size=(None,ProcessPipe.maxWorking))
+        if not context: context = RenderContext.interactive()
+        img = context.resize(img)
 
         self.originalImage= copy.deepcopy(img)
 
         # a copy is set as __outputImage
         self.__outputImage = copy.deepcopy(img)
+        self.version += 1
      
         if not img.linear: 
 
-
+            start = timer()
             if pref.computation == 'python':
-                start = timer()
                 img.colorData =     np.float32(colour.cctf_decoding(img.colorData, function='sRGB'))
                 img.linear =        True
 
             elif pref.computation == 'numba':
-                start = timer()
                 img.colorData= numbafun.numba_cctf_sRGB_decoding(img.colorData)
                 img.linear =        True
 
             elif pref.computation == 'cuda':
-                start = timer()
                 img.colorData =     numbafun.cuda_cctf_sRGB_decoding(img.colorData) # encode to prime
                 img.linear =        True
 
-            dt = timer() - start
+            profiling.profiler().record('cctf_decoding', 'process', start, timer() - start, backend=pref.computation, 
+                                        outShape=img.colorData.shape, bytes=img.colorData.nbytes)
 
         # input image is set as __inputImage
         self.__inputImage = img
@@ -1220,7 +1397,7 @@ class ProcessPipe(object):
         """setOuput: set the output image
         """
         self.__outputImage = copy.deepcopy(img)
-        pass
+        self.version += 1
 
     def getInputImage(self):
         """return input image
@@ -1231,80 +1408,98 @@ class ProcessPipe(object):
         return self.__inputImage
 
     def getImage(self,toneMap=True):
-        """
-        TODO - Documentation de la méthode getImage
+        """return output image: display-encoded (sRGB cctf encoding) if toneMap, linear otherwise.
+            SDR images (original image not linear) are always returned display-encoded, whatever toneMap: HDR display,
+            export and aesthetics get SDR images encoded as they were read.
+            Both representations are cached with the version of output image: each one is computed at most once per version,
+            the output image is never modified. The returned image is a view: its colorData is read only (copy it, or use
+            processing, to modify it).
 
         Args:
-            toneMap: TODO
-                TODO
+            toneMap (bool, Optionnal): True display-encoded image, False linear image (HDR images only)
                 
         Returns:
-            TODO
-                TODO
+            (hdrCore.image.Image): None if the processpipe has no image
         """
-        if isinstance(self.originalImage, image.Image): # if pipe has an image
-            # conditionnal encoding or decoding to prime, linear
-
-            if (not self.originalImage.linear) and self.__outputImage.linear:
-                self.__outputImage.colorData = colour.cctf_encoding(self.__outputImage.colorData, function='sRGB')
-                self.__outputImage.linear =  False
-
-                if pref.verbose: print(" [PROCESS] >> ProcessPipe.getImage(",self.__outputImage.name,", toneMap:",toneMap,"): encode to sRGB !")
-
-            elif self.__outputImage.isHDR() and self.__outputImage.linear and toneMap:
-                self.__outputImage.colorData = colour.cctf_encoding(self.__outputImage.colorData, function='sRGB')
-                self.__outputImage.linear =  False
-
-                if pref.verbose: print(" [PROCESS] >> ProcessPipe.getImage(",self.__outputImage.name,", ,toneMap:",toneMap,"): tone map using cctf encoding !")
-
-            elif self.__outputImage.isHDR() and (not self.__outputImage.linear) and (not toneMap):
-                self.__outputImage.colorData = colour.cctf_decoding(self.__outputImage.colorData, function='sRGB')
-                self.__outputImage.linear =  True
-
-                if pref.verbose: print(" [PROCESS] >> ProcessPipe.getImage(",self.__outputImage.name,", toneMap:",toneMap,"): decoding to linear colorspace !")
-
-            elif (not self.__outputImage.linear) and (not toneMap):
-                self.__outputImage.colorData = colour.cctf_decoding(self.__outputImage.colorData, function='sRGB')
-                self.__outputImage.linear =  True
-
-                if pref.verbose: print(" [PROCESS] >> ProcessPipe.getImage(",self.__outputImage.name,", toneMap:",toneMap,"): decoding to linear colorspace !")
-
-            else:
-                if pref.verbose: print(" [PROCESS] >> ProcessPipe.getImage(",self.__outputImage.name,", toneMap:",toneMap,"): just return output !")
-
-            return self.__outputImage
-        else: return None
-
-    def compute(self,progress=None):
+        if not isinstance(self.originalImage, image.Image): return None
+
+        encoded = toneMap or (not self.originalImage.linear)
+        key = 'display' if encoded else 'linear'
+        if (key in self.__views) and (self.__views[key][0] == self.version): return self.__views[key][1]
+
+        output = self.__outputImage
+        if output.linear != encoded:    colorData = output.colorData
+        elif encoded:                   colorData = colour.cctf_encoding(output.colorData, function='sRGB')
+        else:                           colorData = colour.cctf_decoding(output.colorData, function='sRGB')
+        trace.debug('PROCESS', "ProcessPipe.getImage(",output.name,", toneMap:",toneMap,"): version",self.version,"(",'converted' if colorData is not output.colorData else 'output',")")
+
+        colorData = colorData.view()
+        colorData.flags.writeable = False
+        view = copy.copy(output)
+        view.colorData, view.linear = colorData, not encoded
+        self.__views[key] = (self.version, view)
+        return view
+
+    def compute(self,progress=None, isCancelled=None, stopAfter=None):
         """compute the processpipe
 
         Args:
             progress: (object with showMessage and repaint method) object used to display progress
+            isCancelled (function, Optionnal): called between process-nodes, computation is abandoned if it returns True.
+                Nodes not yet computed keep requireUpdate set to True, so the next compute() resumes from there.
+            stopAfter (int, Optionnal): index of the last process-node computed (e.g. input of a process-node), None: all
+                process-nodes. The output image is not updated when computation stops before the last process-node.
 
         Returns:
-                
+            (bool): False if computation has been cancelled, True otherwise
         """
-        if self.__inputImage:
+        # frame: node events are grouped (status bar breakdown), a frame of a caller (preview) includes them
+        with profiling.profiler().frame('ProcessPipe.compute'):
+            if self.__inputImage:
 
-            if len(self.processNodes)>0: 
-                # first node
-                if progress:
-                    progress.showMessage('computing: '+self.processNodes[0].name+' start!')
-                    progress.repaint()
-                self.processNodes[0].condCompute(self.__inputImage)
-                if progress:
-                    progress.showMessage('computing: '+self.processNodes[0].name+' done!')
-                    progress.repaint()
-                # other nodes
-                for i,processNode in enumerate(self.processNodes[1:]):
+                if len(self.processNodes)>0:
+                    # first node
                     if progress:
-                        progress.showMessage('computing: '+processNode.name+' start!')
+                        progress.showMessage('computing: '+self.processNodes[0].name+' start!')
                         progress.repaint()
-                    processNode.condCompute(self.processNodes[i].outputImage)
+                    self.processNodes[0].condCompute(self.__inputImage)
                     if progress:
-                        progress.showMessage('computing: '+processNode.name+' done!')
+                        progress.showMessage('computing: '+self.processNodes[0].name+' done!')
                         progress.repaint()
-            self.__outputImage=self.processNodes[-1].outputImage
+                    # other nodes
+                    for i,processNode in enumerate(self.processNodes[1:]):
+                        if (stopAfter != None) and (i >= stopAfter): return True
+                        # cancellation checkpoint
+                        if isCancelled and isCancelled(): return False
+                        if progress:
+                            progress.showMessage('computing: '+processNode.name+' start!')
+                            progress.repaint()
+                        processNode.condCompute(self.processNodes[i].outputImage)
+                        if progress:
+                            progress.showMessage('computing: '+processNode.name+' done!')
+                            progress.repaint()
+                if not (self.__outputImage is self.processNodes[-1].outputImage):
+                    self.__outputImage=self.processNodes[-1].outputImage
+                    self.version += 1
+        return True
+
+    def residentBytes(self):
+        """return memory (bytes) used by the images held by the processpipe: original, input, output and process-node outputs.
+            Images shared between several references are counted once.
+
+        Returns:
+            (int)
+        """
+        images = [self.originalImage, self.__inputImage, self.__outputImage] + list(map(lambda n: n.outputImage, self.processNodes))
+        images += list(map(lambda v: v[1], self.__views.values()))
+        arrays = {}
+        for img in images:
+            if isinstance(img, image.Image) and isinstance(img.colorData, np.ndarray):
+                # views (see getImage) are counted with the array they refer to
+                colorData = img.colorData
+                while isinstance(colorData.base, np.ndarray): colorData = colorData.base
+                arrays[id(colorData)] = colorData.nbytes
+        return sum(arrays.values())
 
     def setParameters(self,id,paramDicts):
         """
@@ -1398,7 +1593,7 @@ class ProcessPipe(object):
         TODO - Documentation de la méthode updateProcessPipeMetadata
         """
         ppMeta = self.toDict()
-        if pref.verbose: print(" [PROCESS] >> ProcessPipe.updateMetadata(","):",ppMeta)
+        trace.debug('PROCESS', "ProcessPipe.updateMetadata(","):",ppMeta)
         if isinstance(self.originalImage,image.Image):  self.originalImage.metadata.metadata['processpipe'] =   copy.deepcopy(ppMeta)
         if isinstance(self.__inputImage,image.Image):   self.__inputImage.metadata.metadata['processpipe'] =    copy.deepcopy(ppMeta)
         if isinstance(self.__outputImage,image.Image):  self.__outputImage.metadata.metadata['processpipe'] =   copy.deepcopy(ppMeta)
@@ -1411,47 +1606,50 @@ class ProcessPipe(object):
             hdrmeta: TODO
                 TODO
         """
-        if pref.verbose: print(" [PROCESS] >> ProcessPipe.updateUserMeta(",")")
+        trace.debug('PROCESS', "ProcessPipe.updateUserMeta(",")")
         if isinstance(self.originalImage,image.Image):  self.originalImage.metadata.metadata[tagRootName] =   copy.deepcopy(meta)
         if isinstance(self.__inputImage,image.Image):   self.__inputImage.metadata.metadata[tagRootName] =    copy.deepcopy(meta)
         if isinstance(self.__outputImage,image.Image):  self.__outputImage.metadata.metadata[tagRootName] =   copy.deepcopy(meta)
 
-    def export(self,dirName,size=None,to=None,progress=None):
-        """
-        TODO - Documentation de la méthode export
+    def export(self,dirName,size=None,to=None,progress=None,context=None):
+        """export image of the processpipe (non destructive): the render is computed by a clone of the processpipe 
+            (separate execution context), images and process-node outputs of the processpipe are neither modified nor 
+            recomputed, editing can go on (from an other thread) during export.
 
         Args:
-            dirName: TODO
-            size: TODO
-            to: TODO
-            progress: TODO
+            dirName (str, Required): export directory, None: exported image is not written
+            size (tuple, Optionnal): (height, width), image is resized to width, None for full size
+            to (dict, Optionnal): HDR display (see preferences.preferences.HDRdisplays): 'scaling', 'tag', 'post'
+            progress (object with showMessage and repaint method, Optionnal): used to display progress
+            context (hdrCore.processing.RenderContext, Optionnal): render context, default: full size, python process-nodes
                 
         Returns:
             (hdrCore.image.Image)
         """
-        # recover input and processpipe metadata
-        input = copy.deepcopy(self.originalImage)
-        input.metadata.metadata['processpipe'] = self.toDict()
-        input.metadata.save()
+        # save processpipe metadata
+        self.updateProcessPipeMetadata()
+        self.originalImage.metadata.save()
 
         # load full size image
         img = image.Image.read(self.originalImage.path+'/'+self.originalImage.name)
         if size: img = img.process(resize(),size=(None, size[1]))
 
-        ProcessPipe.autoResize = False # set off autoresize
-
-        self.setImage(img)
-
-        self.compute(progress=progress)
-        ###### res = hdrCore.coreC.coreCcompute(img, self)
+        # render: clone of processpipe
+        if not context: context = RenderContext.full(backend='python')
+        render = self.clone()
+        render.setImage(img, context)
+        if context.backend == 'cpp':    render.setOutput(render.compile().apply(render.getInputImage(), backend='cpp'))
+        else:                           render.compute(progress=progress)
 
-        res = self.getImage(toneMap=False)
+        res = render.getImage(toneMap=False)
         res = res.process(clip())
 
-        res.metadata = copy.deepcopy(img.metadata)                  # exif, hdr use case, ...
+        # exif, hdr use case, ...: metadata refers to its image, copy metadata without copying image
+        res.metadata = copy.copy(img.metadata)
+        res.metadata.metadata = copy.deepcopy(img.metadata.metadata)
+        res.metadata.image = res
         res.metadata.metadata['processpipe'] = None                  # reset process pipe  
         
-        ProcessPipe.autoResize = True# restore autoresize
         if to:
             res.colorData = res.colorData*to['scaling']
             res.metadata.metadata['display'] = to['tag']     # set display
@@ -1460,8 +1658,80 @@ class ProcessPipe(object):
             pathExport = os.path.join(dirName, img.name[:-4]+to['post']+'.hdr')
             res.write(pathExport)
 
-        #restore input
-        self.setImage(input)
-        self.compute()
-
         return res
+# -----------------------------------------------------------------------------
+# --- Class CompiledPlan ------------------------------------------------------
+# -----------------------------------------------------------------------------
+class CompiledPlan(object):
+    """
+    execution plan of process-pipe parameters (see ProcessPipe.compile): processings and a copy of parameters, no image.
+    The plan is never modified: it can be applied to any image (full size, tile, thumbnail), from any thread, 
+    without modifying the editing process-pipe.
+
+    Attributes:
+        processPipeDict (list[dict]): parameters (see ProcessPipe.toDict)
+        nodes (tuple): (name, processing, parameters) of process-nodes, geometry excepted
+        geometryNode (tuple): (processing, parameters) of geometry process-node, None if no geometry
+
+    Methods:
+        toDict
+        getNode
+        apply
+    """
+
+    def __init__(self, processPipeDict):
+        self.processPipeDict = copy.deepcopy(processPipeDict)
+        nodes, self.geometryNode = [], None
+        for pMeta in self.processPipeDict:
+            name = list(pMeta.keys())[0]
+            key = name.rstrip('0123456789')
+            if key in ProcessPipe.processes:
+                process = ProcessPipe.processes[key]()
+                if isinstance(process, geometry):   self.geometryNode = (process, pMeta[name])
+                else:                               nodes.append((name, process, pMeta[name]))
+        self.nodes = tuple(nodes)
+
+    def toDict(self):
+        """returns a copy of parameters (see ProcessPipe.toDict).
+
+        Returns:
+            (list[dict])
+        """
+        return copy.deepcopy(self.processPipeDict)
+
+    def getNode(self, name):
+        """returns (processing, parameters) of process-node, None if not in plan.
+
+        Args:
+            name (str, Required): process-node name
+
+        Returns:
+            (tuple)
+        """
+        if name == "geometry": return self.geometryNode
+        for n, process, params in self.nodes:
+            if n == name: return (process, params)
+        return None
+
+    def apply(self, img, backend='python', geometry=True, isCancelled=None):
+        """apply plan to image.
+
+        Args:
+            img (hdrCore.image.Image, Required): input image (linear)
+            backend (str, Optionnal): 'python' process-nodes, 'cpp' fused C++ engine (hdrCore.coreC, geometry excepted)
+            geometry (bool, Optionnal): compute geometry process-node
+            isCancelled (function, Optionnal): checked between process-nodes, returns None if it returns True
+
+        Returns:
+            (hdrCore.image.Image)
+        """
+        if backend == 'cpp':
+            img = hdrCore.coreC.coreCcompute(img, self)
+        else:
+            for name, process, params in self.nodes:
+                if isCancelled and isCancelled(): return None
+                img = process.compute(img, **params)
+
+        if geometry and self.geometryNode: img = self.geometryNode[0].compute(img, **self.geometryNode[1])
+        return img
+# -----------------------------------------------------------------------------
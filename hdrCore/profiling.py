@@ -0,0 +1,251 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+profiling registry: timed events of computation (process-nodes, C++ core, tiles, image I/O, caches).
+    - an event is (name, category, start, duration, thread, args), args: 'bytes' (output allocated), 'inShape',
+      'outShape', 'backend', 'cache' ('hit' or 'miss'), ...
+    - events are kept in a bounded registry, aggregated per (category, name) into percentiles (statistics, table),
+      exported as Chrome trace JSON (chrome://tracing, https://ui.perfetto.dev),
+    - a frame groups the events of a computation (e.g. preview update) in a thread: listeners are called with the
+      last frame when it is over (status bar breakdown).
+
+usage:
+    profiler = profiling.profiler()
+    with profiler.frame('preview'):
+        with profiler.span('exposure', 'node', backend='python') as args:
+            img = ...
+            args['outShape'] = img.shape
+    print(profiler.table())
+    profiler.chromeTrace('uHDR.trace.json')
+
+categories: 'frame', 'pipe' (process-pipe computation, contains node or tile events), 'node', 'process', 'core' (C++ core),
+    'tile', 'io', 'cache', 'aesthetics'
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import collections, contextlib, json, os, threading
+import numpy as np
+from timeit import default_timer as timer
+
+# -----------------------------------------------------------------------------
+# --- Class Profiler ----------------------------------------------------------
+# -----------------------------------------------------------------------------
+class Profiler(object):
+    """
+    registry of timed events (thread safe).
+
+    Class Attributes:
+        maxEvents (int): number of events kept (oldest are dropped)
+        percentiles (tuple): percentiles of statistics
+
+    Attributes:
+        enabled (bool): events are recorded
+        events (collections.deque): (name, category, start, duration, thread id, args), start/duration in second
+        lastFrame (dict): last frame over: 'name', 'start', 'duration', 'events', 'args'
+        listeners (list[function]): called with last frame (dict) when a frame is over (from computing thread)
+        origin (float): time origin of Chrome trace
+
+    Methods:
+        record
+        span
+        frame
+        addListener
+        removeListener
+        statistics
+        table
+        chromeTrace
+        reset
+
+    Static methods:
+        breakdown
+    """
+
+    maxEvents =     50000
+    percentiles =   (50, 90, 99)
+
+    def __init__(self):
+        self.enabled = True
+        self.events = collections.deque(maxlen=Profiler.maxEvents)
+        self.lastFrame = None
+        self.listeners = []
+        self.origin = timer()
+        self.__local = threading.local()
+
+    def record(self, name, category, start, duration, **args):
+        """record an event.
+
+            Args:
+                name (str, Required): event name (process-node name, function)
+                category (str, Required): event category
+                start (float, Required): start time (timeit.default_timer)
+                duration (float, Required): duration (second)
+                args: event arguments ('bytes', 'inShape', 'outShape', 'backend', 'cache', ...)
+        """
+        if not self.enabled: return
+        event = (name, category, start, duration, threading.get_ident(), args)
+        self.events.append(event)
+        frame = getattr(self.__local, 'frame', None)
+        if frame != None: frame.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name, category, **args):
+        """context manager that records an event lasting the with block, yields args (dict) that can be completed in
+        the block (e.g. output shape).
+
+            Args:
+                name (str, Required): event name
+                category (str, Required): event category
+                args: event arguments
+        """
+        start = timer()
+        try: yield args
+        finally: self.record(name, category, start, timer() - start, **args)
+
+    @contextlib.contextmanager
+    def frame(self, name, **args):
+        """context manager that records a frame: events of the with block (same thread) are grouped, listeners are called
+        when the frame is over. A frame inside a frame is recorded as a span.
+
+            Args:
+                name (str, Required): frame name
+                args: frame arguments
+        """
+        if (not self.enabled) or (getattr(self.__local, 'frame', None) != None):
+            with self.span(name, 'frame', **args) as a: yield a
+            return
+
+        self.__local.frame = []
+        start = timer()
+        try: yield args
+        finally:
+            duration = timer() - start
+            events, self.__local.frame = self.__local.frame, None
+            self.record(name, 'frame', start, duration, **args)
+            self.lastFrame = {'name': name, 'start': start, 'duration': duration, 'events': events, 'args': args}
+            for listener in list(self.listeners): listener(self.lastFrame)
+
+    def addListener(self, listener):
+        """add function called with last frame (dict) when a frame is over: called from computing thread."""
+        if listener not in self.listeners: self.listeners.append(listener)
+
+    def removeListener(self, listener):
+        if listener in self.listeners: self.listeners.remove(listener)
+
+    def statistics(self):
+        """returns statistics of recorded events per (category, name).
+
+            Returns:
+                (dict): key: (category, name), value: dict with keys 'count', 'total', 'mean', 'max', 'p50', 'p90', 'p99'
+                        (second), 'bytes' (mean bytes allocated, None if unknown), 'hits', 'misses' (cache), 'backends'
+        """
+        groups = collections.OrderedDict()
+        for name, category, start, duration, thread, args in list(self.events):
+            groups.setdefault((category, name), []).append((duration, args))
+
+        res = collections.OrderedDict()
+        for key, items in groups.items():
+            durations = np.array([d for d, a in items])
+            nbytes = [a['bytes'] for d, a in items if a.get('bytes', None) != None]
+            stats = {'count': len(items), 'total': float(np.sum(durations)), 'mean': float(np.mean(durations)), 'max': float(np.amax(durations)),
+                     'bytes': float(np.mean(nbytes)) if nbytes else None,
+                     'hits': len([a for d, a in items if a.get('cache', None) == 'hit']),
+                     'misses': len([a for d, a in items if a.get('cache', None) == 'miss']),
+                     'backends': sorted(set([str(a['backend']) for d, a in items if 'backend' in a]))}
+            for p, value in zip(Profiler.percentiles, np.percentile(durations, Profiler.percentiles)): stats['p'+str(p)] = float(value)
+            res[key] = stats
+        return res
+
+    def table(self):
+        """returns summary table (str) of statistics: one line per (category, name), sorted by total time.
+
+            Returns:
+                (str)
+        """
+        header = f"{'category':<10} {'name':<28} {'count':>6} {'total ms':>10} {'mean ms':>9}" + \
+                 ''.join([f" {'p'+str(p)+' ms':>9}" for p in Profiler.percentiles]) + f" {'max ms':>9} {'MB':>8} {'hit/miss':>9}  backend"
+        lines = [header, '-'*len(header)]
+        for (category, name), s in sorted(self.statistics().items(), key=lambda kv: -kv[1]['total']):
+            line = f"{category:<10} {name[:28]:<28} {s['count']:>6} {s['total']*1000:>10.1f} {s['mean']*1000:>9.2f}"
+            line += ''.join([f" {s['p'+str(p)]*1000:>9.2f}" for p in Profiler.percentiles])
+            line += f" {s['max']*1000:>9.2f}"
+            line += f" {s['bytes']/(1024*1024):>8.1f}" if s['bytes'] != None else f" {'':>8}"
+            line += f" {str(s['hits'])+'/'+str(s['misses']):>9}" if (s['hits'] + s['misses']) > 0 else f" {'':>9}"
+            line += "  "+','.join(s['backends'])
+            lines.append(line)
+        return '\n'.join(lines)
+
+    def chromeTrace(self, filename=None):
+        """returns recorded events in Chrome trace format (complete events, time in microsecond), written to filename if given.
+
+            Args:
+                filename (str, Optionnal): JSON file
+
+            Returns:
+                (dict)
+        """
+        pid = os.getpid()
+        traceEvents = []
+        for name, category, start, duration, thread, args in list(self.events):
+            event = {'name': name, 'cat': category, 'ph': 'X', 'ts': (start - self.origin)*1e6, 'dur': duration*1e6,
+                     'pid': args.get('pid', pid), 'tid': args.get('tid', thread),
+                     'args': dict([(k, v if isinstance(v, (int, float, str, bool, type(None))) else str(v)) for k, v in args.items()])}
+            traceEvents.append(event)
+        res = {'traceEvents': traceEvents, 'displayTimeUnit': 'ms'}
+        if filename:
+            with open(filename, 'w') as f: json.dump(res, f)
+        return res
+
+    def reset(self):
+        """drop recorded events."""
+        self.events.clear()
+        self.lastFrame = None
+
+    @staticmethod
+    def breakdown(frame, nbItems=5):
+        """returns one line description of a frame: duration, then slowest events (cumulated per name).
+
+            Args:
+                frame (dict, Required): frame (see lastFrame)
+                nbItems (int, Optionnal): number of events reported
+
+            Returns:
+                (str)
+        """
+        if not frame: return ''
+        durations = collections.OrderedDict()
+        for name, category, start, duration, thread, args in frame['events']:
+            if category in ('frame', 'pipe'): continue          # containers of other events
+            durations[name] = durations.get(name, 0.0) + duration
+        items = sorted(durations.items(), key=lambda kv: -kv[1])[:nbItems]
+        return frame['name']+f" {frame['duration']*1000:.1f} ms"+(": "+", ".join([f"{n} {d*1000:.1f}" for n, d in items if d > 0]) if items else "")
+# -----------------------------------------------------------------------------
+__profiler = None
+def profiler():
+    """returns the application profiler (created at first call).
+
+        Returns:
+            (hdrCore.profiling.Profiler)
+    """
+    global __profiler
+    if not __profiler: __profiler = Profiler()
+    return __profiler
+# -----------------------------------------------------------------------------
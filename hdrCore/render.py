@@ -0,0 +1,186 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+headless batch renderer (no GUI, PyQt5 is not imported):
+    renders images according to the process-pipe stored in their sidecar metadata (json file) for a target HDR display.
+
+usage (from uHDR directory, preferences/prefs.json is read):
+    python -m hdrCore.render images/ "shoot/*.hdr" -o export/ --target vesaDisplayHDR1000 --workers 8 --report report.json
+    python -m hdrCore.render images/ -o export/ --daemon      (jobs submitted to running render daemon, see hdrCore.daemon,
+                                                               started with --allow-output export/)
+
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import argparse, glob, json, os, sys
+from . import processing, batch, coreC, utils, daemon
+import preferences.preferences as pref
+from timeit import default_timer as timer
+
+# image extensions read by uHDR
+extensions = ('.jpg','.JPG','.hdr','.HDR')
+
+# -----------------------------------------------------------------------------
+# --- functions ---------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def findImages(inputs):
+    """returns image filenames from directories, glob patterns or filenames.
+
+        Args:
+            inputs (list[str], Required): directories, glob patterns or filenames
+
+        Returns:
+            (list[str]): sorted filenames (no duplicate)
+    """
+    filenames = []
+    for i in inputs:
+        if os.path.isdir(i):
+            filenames += list(map(lambda f: os.path.join(i, f), utils.filterlistdir(i, extensions)))
+        else:
+            filenames += list(filter(lambda f: f.endswith(extensions) and os.path.isfile(f), glob.glob(i)))
+    return sorted(set(filenames))
+
+def defaultBackend():
+    """returns 'cpp' if C++ core (HDRip.dll) can be loaded, 'python' otherwise."""
+    try:
+        coreC.library()
+        return 'cpp'
+    except OSError: return 'python'
+
+def buildJobs(filenames, dirName, display, size=None, backend='cpp', geometry=False, useCache=True):
+    """one export job per image: process-pipe is rebuilt as in uHDR GUI (hdrCore.processing.ProcessPipe.build),
+    parameters are read from image sidecar.
+
+        Args:
+            filenames (list[str], Required): images
+            dirName (str, Required): output directory
+            display (dict, Required): HDR display (see preferences.preferences.HDRdisplays)
+            size (int, Optionnal): output width, None for full size
+            backend (str, Optionnal): 'cpp' or 'python'
+            geometry (bool, Optionnal): compute geometry process-node
+            useCache (bool, Optionnal): renders read from (and stored in) render cache (see hdrCore.cache)
+
+        Returns:
+            (list[hdrCore.batch.ExportJob])
+    """
+    defaultDict = processing.ProcessPipe.build().toDict()
+    return [batch.ExportJob(f, defaultDict, dirName, display, useSidecar=True, size=size, backend=backend, geometry=geometry, useCache=useCache) for f in filenames]
+
+def runDaemon(client, jobs, progress=None):
+    """run jobs on the render daemon (sequentially, the daemon computes each image with all its workers).
+
+        Args:
+            client (hdrCore.daemon.RenderClient, Required): connection to daemon
+            jobs (list[hdrCore.batch.ExportJob], Required): jobs
+            progress (function, Optionnal): called with (job, number of jobs over, number of jobs)
+
+        Returns:
+            (dict): report (see hdrCore.batch.BatchExporter.report)
+    """
+    start = timer()
+    for i, job in enumerate(jobs, start=1):
+        jobStart = timer()
+        try:
+            name = os.path.split(job.filename)[1]
+            output = os.path.join(job.dirName, name[:-4]+job.display['post']+'.hdr')
+            job.output = client.render(job.filename, job.processPipeDict, size=job.size, target=job.display['tag'],
+                                       geometry=job.geometry, backend=job.backend, output=output, useSidecar=job.useSidecar)
+            job.status = 'done'
+        except (RuntimeError, EOFError, OSError) as e:
+            job.status, job.error = 'failed', repr(e)
+        job.time = timer() - jobStart
+        if progress: progress(job, i, len(jobs))
+    time = timer() - start
+
+    done = [j for j in jobs if j.status == 'done']
+    failed = [j for j in jobs if j.status == 'failed']
+    return {'jobs':         len(jobs),
+            'done':         len(done),
+            'failed':       len(failed),
+            'workers':      'daemon',
+            'time':         time,
+            'images/s':     len(done)/time if time > 0 else 0.0,
+            'Mpixels/s':    None,
+            'failures':     dict([(j.filename, j.error) for j in failed])}
+
+def main(argv=None):
+    """command line entry point.
+
+        Args:
+            argv (list[str], Optionnal): arguments, sys.argv[1:] if None
+
+        Returns:
+            (int): 0 if all images are rendered, 1 otherwise
+    """
+    parser = argparse.ArgumentParser(prog='python -m hdrCore.render', description='uHDR headless batch renderer: renders images with their sidecar process-pipe.')
+    parser.add_argument('inputs', nargs='+', help='directories, glob patterns or image filenames')
+    parser.add_argument('-o', '--output', default='.', help='output directory (default: current directory)')
+    parser.add_argument('--target', default=None, choices=list(pref.getHDRdisplays().keys()), help='HDR display target (default: prefs.json HDRdisplay)')
+    parser.add_argument('--size', type=int, default=None, help='output width in pixels (default: full size)')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: sized by cores and memory)')
+    parser.add_argument('--backend', default='auto', choices=['auto','cpp','python'], help='computation engine (default: cpp if HDRip.dll can be loaded)')
+    parser.add_argument('--geometry', action='store_true', help='apply geometry (crop/rotation) process-node')
+    parser.add_argument('--report', default=None, help="JSON throughput report filename ('-' for standard output)")
+    parser.add_argument('--no-cache', dest='cache', action='store_false', help='do not use render cache (shared with uHDR GUI)')
+    parser.add_argument('--daemon', action='store_true', help='submit jobs to running render daemon (python -m hdrCore.daemon)')
+    parser.add_argument('--verbose', action='store_true', help='verbose computation messages')
+    args = parser.parse_args(argv)
+
+    pref.setVerbose(args.verbose)
+    display = pref.getHDRdisplays()[args.target] if args.target else pref.getHDRdisplay()
+    backend = defaultBackend() if args.backend == 'auto' else args.backend
+
+    filenames = findImages(args.inputs)
+    if len(filenames) == 0:
+        print("hdrCore.render: no image found", file=sys.stderr)
+        return 1
+    if not os.path.isdir(args.output): os.makedirs(args.output)
+
+    def progress(job, nbDone, nbJobs):
+        status = 'done' if job.status == 'done' else 'FAILED '+str(job.error)
+        print(f"[{nbDone}/{nbJobs}] {job.filename}: {status} ({job.time:.2f}s)", flush=True)
+
+    jobs = buildJobs(filenames, args.output, display, size=args.size, backend=backend, geometry=args.geometry, useCache=args.cache)
+    if args.daemon:
+        client = daemon.RenderClient.connect()
+        if not client:
+            print("hdrCore.render: render daemon is not running", file=sys.stderr)
+            return 1
+        print(f"hdrCore.render: {len(jobs)} images, target: {display['tag']}, backend: {backend}, render daemon", flush=True)
+        report = runDaemon(client, jobs, progress=progress)
+        client.close()
+    else:
+        exporter = batch.BatchExporter(jobs, nbWorkers=args.workers, progress=progress)
+        print(f"hdrCore.render: {len(jobs)} images, target: {display['tag']}, backend: {backend}, workers: {exporter.nbWorkers}", flush=True)
+        exporter.run()
+        report = exporter.report()
+
+    report.update({'target': display['tag'], 'backend': backend, 'size': args.size})
+    if args.report == '-':  print(json.dumps(report, indent=2))
+    elif args.report:
+        with open(args.report, 'w') as f: json.dump(report, f, indent=2)
+    print(f"hdrCore.render: {report['done']}/{report['jobs']} done, {report['failed']} failed, {report['time']:.1f}s, {report['images/s']:.2f} images/s", flush=True)
+
+    return 0 if report['failed'] == 0 else 1
+# -----------------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(main())
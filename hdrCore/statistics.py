@@ -0,0 +1,570 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+shared image statistics (luminance, log-luminance and hue histograms, min/max, percentiles, Lab colour clusters,
+hue segmentation):
+    statistics are attached to an image (see hdrCore.image.Image.statistics) and computed once, on first request,
+    for all consumers (tone curve plot, auto tone curve, auto exposure, dynamic range, palette, auto colour editors).
+    Process-node outputs are new images when the node is recomputed: statistics are computed once per node version.
+
+    LogHistogram streams luminance by strips (no full-size XYZ or Y array, no sort) and estimates percentiles with
+    a bounded error (one bin, 1/128 stop by default): used for dynamic range of full-size images during metadata build.
+
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import math, threading, collections, colour
+import numpy as np
+from . import processing, lazy, trace
+
+# sklearn is imported on first clustering (see hdrCore.lazy)
+sklearn = lazy.module('sklearn')
+
+# luminance (Y) weights of linear sRGB (Y row of sRGB to XYZ matrix, D65)
+weightsY = np.array([0.2126729, 0.7151522, 0.0721750], dtype=np.float32)
+
+# -----------------------------------------------------------------------------
+# --- functions ---------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def luminance(rgb, linear=True):
+    """returns luminance (Y) of sRGB data: float32 dot product with Y weights (no colour-space transform, no copy of XYZ).
+
+        Args:
+            rgb (numpy.ndarray, Required): sRGB data (..., 3), not modified
+            linear (bool, Optionnal): data is linear, decoded (sRGB cctf) otherwise
+
+        Returns:
+            (numpy.ndarray): float32 (...)
+    """
+    rgb = np.asarray(rgb[...,:3], dtype=np.float32)
+    if not linear: rgb = np.where(rgb <= 0.04045, rgb/np.float32(12.92), np.power((rgb+np.float32(0.055))/np.float32(1.055), np.float32(2.4)))
+    return np.dot(rgb, weightsY)
+
+# -----------------------------------------------------------------------------
+# --- Class LogHistogram ------------------------------------------------------
+# -----------------------------------------------------------------------------
+class LogHistogram(object):
+    """
+    streaming histogram of log2 luminance on a fixed range: data are added by strips (or tiles), percentiles are
+    estimated from cumulative counts (interpolated in bins), error is at most one bin (binWidth stops).
+    Zero (and negative) values are counted apart, exact min (non zero) and max are kept.
+
+    Class Attributes:
+        logMin, logMax (float): log2 range of histogram, values out of range are counted in first/last bin
+        nbBins (int): number of bins (default: 1/128 stop bins)
+        stripHeight (int): number of rows per strip (see fromColorData)
+
+    Attributes:
+        counts (numpy.ndarray): counts of non zero values
+        zeros (int): number of zero values
+        minY, maxY (float): min (non zero) and max values
+
+    Methods:
+        fromColorData
+        binWidth
+        add
+        count
+        percentile
+        dynamicRange
+    """
+
+    logMin, logMax =    -48.0, 32.0
+    nbBins =            80*128
+    stripHeight =       64
+
+    def __init__(self):
+        self.counts = np.zeros(LogHistogram.nbBins, dtype=np.int64)
+        self.zeros = 0
+        self.minY, self.maxY = math.inf, -math.inf
+
+    @staticmethod
+    def fromColorData(colorData, linear=True):
+        """returns histogram of luminance of sRGB data, computed by strips of stripHeight rows.
+
+            Args:
+                colorData (numpy.ndarray, Required): sRGB data (height, width, 3)
+                linear (bool, Optionnal): data is linear, decoded (sRGB cctf) otherwise
+
+            Returns:
+                (hdrCore.statistics.LogHistogram)
+        """
+        h = LogHistogram()
+        for row in range(0, colorData.shape[0], LogHistogram.stripHeight):
+            h.add(luminance(colorData[row:row+LogHistogram.stripHeight], linear))
+        return h
+
+    @staticmethod
+    def binWidth():
+        """returns width of bins (log2 unit)."""
+        return (LogHistogram.logMax-LogHistogram.logMin)/LogHistogram.nbBins
+
+    def add(self, Y):
+        """add luminance values.
+
+            Args:
+                Y (numpy.ndarray, Required): luminance values (any shape)
+        """
+        Y = Y.ravel()
+        positive = Y[Y>0]
+        self.zeros += Y.size - positive.size
+        if Y.size: self.maxY = max(self.maxY, float(np.amax(Y)))
+        if positive.size == 0: return
+        self.minY = min(self.minY, float(np.amin(positive)))
+        index = (np.log2(positive) - LogHistogram.logMin)/LogHistogram.binWidth()
+        index = np.clip(index, 0, LogHistogram.nbBins-1).astype(np.intp)
+        self.counts += np.bincount(index, minlength=LogHistogram.nbBins)
+
+    def count(self, positive=False):
+        """returns number of values (non zero values only if positive)."""
+        return int(self.counts.sum()) + (0 if positive else self.zeros)
+
+    def percentile(self, q, positive=False):
+        """returns estimated percentile of luminance.
+
+            Args:
+                q (float, Required): percentile in [0,100]
+                positive (bool, Optionnal): zero values are ignored
+
+            Returns:
+                (float)
+        """
+        nbZeros = 0 if positive else self.zeros
+        total = self.count(positive)
+        if total == 0: return 0.0
+        rank = q/100.0*total
+        if rank <= nbZeros and nbZeros > 0: return 0.0
+        rank -= nbZeros
+
+        cumulative = np.cumsum(self.counts)
+        i = int(np.searchsorted(cumulative, rank, side='left'))
+        i = min(i, LogHistogram.nbBins-1)
+        before = cumulative[i-1] if i > 0 else 0
+        fraction = (rank-before)/self.counts[i] if self.counts[i] > 0 else 0.5
+        logY = LogHistogram.logMin + (i+fraction)*LogHistogram.binWidth()
+        return float(np.clip(math.pow(2.0, logY), self.minY, self.maxY))
+
+    def dynamicRange(self, percentile=None):
+        """returns dynamic range (stops) between min (non zero) and max, or between percentile of non zero values and
+        100-percentile of all values (see hdrCore.image.Image.getDynamicRange).
+
+            Args:
+                percentile (float, Optionnal): percentile, None for min and max
+
+            Returns:
+                (float)
+        """
+        if percentile == None:  minY, maxY = self.minY, self.maxY
+        else:                   minY, maxY = self.percentile(percentile, positive=True), self.percentile(100-percentile)
+        if not (minY > 0 and maxY > 0): return 0.0
+        return math.log2(maxY)-math.log2(minY)
+
+# -----------------------------------------------------------------------------
+# --- Class ImageStatistics ---------------------------------------------------
+# -----------------------------------------------------------------------------
+class ImageStatistics(object):
+    """
+    lazily computed statistics of an image, each statistic is computed once and kept.
+    Statistics can be computed on the full image or on a subsample (regular grid of at most maxPixels pixels):
+    the subsample is enough for display (histogram plots) and for estimations (auto exposure, percentiles).
+
+    Colour clusters (k-means in Lab) are computed on a smaller subsample (clusterPixels) and warm-started from the
+    previous clustering of the same image (previous version of the node) with the same number of clusters, other
+    images are clustered from several initializations (nbInit): results do not depend on the order images are viewed.
+
+    Class Attributes:
+        maxPixels (int): number of pixels of subsample
+        clusterPixels (int): number of pixels of clustering subsample
+        minChroma (float): pixels of lower chroma have no significant hue (hue segmentation)
+        minHueWidth (float): minimum hue width (degrees) of a segment, at most 360/number of segments (hue segmentation)
+        minRangeWidth (float): minimum width of lightness and chroma ranges of a segment (hue segmentation)
+        nbInit (int): number of k-means initializations without previous clustering of the image
+        maxLastCenters (int): number of images whose last clustering is kept (warm start)
+
+    Attributes:
+        colorData (numpy.ndarray): image data (statistics are valid while image data is this array)
+        linear (bool): image data is linear
+        colorSpace (str): image colour space name ('sRGB' or 'Lch' for clustering)
+        imageKey (tuple): (path, name) of image, key of last clustering of the image (warm start), None if image has no name
+        lock (threading.Lock): protects cache (statistics are requested from GUI and compute threads)
+
+    Methods:
+        sample
+        linearRGB
+        luminance
+        histogram
+        logHistogram
+        hueHistogram
+        minMax
+        percentiles
+        logLuminance
+        lab
+        clusters
+        lch
+        hueSegments
+
+    Static methods:
+        checkSegments
+    """
+
+    maxPixels =     256*1024
+    clusterPixels = 32*1024
+    minChroma =     5.0         # pixels of lower chroma have no significant hue (hue segmentation)
+    minHueWidth =   15.0        # minimum hue width (degrees) of a segment (hue segmentation)
+    minRangeWidth = 5.0         # minimum width of lightness and chroma ranges of a segment (hue segmentation)
+
+    nbInit =        4
+    maxLastCenters = 64
+
+    __lastCenters = collections.OrderedDict()   # (imageKey, nbClusters): Lab centers of last clustering of image (warm start, LRU)
+    __lastCentersLock = threading.Lock()
+
+    def __init__(self, img):
+        self.colorData = img.colorData
+        self.linear = img.linear
+        self.colorSpace = img.colorSpace.name if img.colorSpace else 'sRGB'
+        self.imageKey = (img.path, img.name) if getattr(img, 'name', None) else None
+        self.lock = threading.Lock()
+        self.__cache = {}
+
+    def __deepcopy__(self, memo):
+        # copied images get their own statistics: processing modifies copied data in place
+        return None
+
+    def __cached(self, key, function):
+        with self.lock:
+            if key in self.__cache: return self.__cache[key]
+        value = function()
+        with self.lock: self.__cache[key] = value
+        return value
+
+    def sample(self, subsample=True, maxPixels=None):
+        """returns image data (height, width, 3), subsampled if required.
+
+            Args:
+                subsample (bool, Optionnal): regular grid of at most maxPixels pixels (one pixel per grid cell)
+                maxPixels (int, Optionnal): number of pixels of subsample, None: ImageStatistics.maxPixels
+
+            Returns:
+                (numpy.ndarray): view of image data, must not be modified
+        """
+        data = self.colorData[:,:,:3]
+        if not subsample: return data
+        if not maxPixels: maxPixels = ImageStatistics.maxPixels
+        step = int(math.ceil(math.sqrt(data.shape[0]*data.shape[1]/maxPixels)))
+        return data[::step, ::step] if step > 1 else data
+
+    def linearRGB(self, subsample=True):
+        """returns linear RGB data (decoded if image is display-encoded).
+
+            Args:
+                subsample (bool, Optionnal): statistics computed on subsample
+
+            Returns:
+                (numpy.ndarray): must not be modified
+        """
+        def compute():
+            data = self.sample(subsample)
+            return data if self.linear else colour.cctf_decoding(data, function='sRGB')
+        return self.__cached(('linearRGB', subsample), compute)
+
+    def luminance(self, space='linear', subsample=True):
+        """returns luminance (Y).
+
+            Args:
+                space (str, Optionnal): 'linear': Y of linear RGB (decoded if image is display-encoded, not clamped),
+                                        'display': Y of display-encoded RGB (encoded if image is linear) clamped to 1,
+                                        'stored': Y of image data as stored (linear or not) clamped to 1
+                subsample (bool, Optionnal): statistics computed on subsample
+
+            Returns:
+                (numpy.ndarray): (height, width), must not be modified
+        """
+        def compute():
+            if space == 'linear':
+                data = self.linearRGB(subsample)
+            else:
+                data = self.sample(subsample)
+                if space == 'display' and self.linear: data = colour.cctf_encoding(data, function='sRGB')
+                data = np.minimum(data, 1.0)
+            return colour.sRGB_to_XYZ(data, apply_cctf_decoding=False)[:,:,1]
+        return self.__cached(('Y', space, subsample), compute)
+
+    def histogram(self, nbBins=50, space='display', subsample=True):
+        """returns luminance histogram on [0,1] (counts, not normalized).
+
+            Args:
+                nbBins (int, Optionnal): number of bins
+                space (str, Optionnal): see luminance
+                subsample (bool, Optionnal): statistics computed on subsample
+
+            Returns:
+                (tuple): (counts (numpy.ndarray), edges (numpy.ndarray))
+        """
+        def compute():
+            return np.histogram(self.luminance(space, subsample), np.linspace(0,1,nbBins+1))
+        return self.__cached(('histogram', nbBins, space, subsample), compute)
+
+    def logHistogram(self, nbBins=100, subsample=True):
+        """returns log2 histogram of linear luminance (zero values are ignored), bins cover [log2 min, log2 max].
+
+            Args:
+                nbBins (int, Optionnal): number of bins
+                subsample (bool, Optionnal): statistics computed on subsample
+
+            Returns:
+                (tuple): (counts (numpy.ndarray), edges (numpy.ndarray) in log2 unit)
+        """
+        def compute():
+            Y = self.luminance('linear', subsample)
+            logY = np.log2(Y[Y>0])
+            if logY.size == 0: return np.zeros(nbBins, dtype=np.int64), np.linspace(0,1,nbBins+1)
+            return np.histogram(logY, nbBins)
+        return self.__cached(('logHistogram', nbBins, subsample), compute)
+
+    def hueHistogram(self, nbBins=36, subsample=True):
+        """returns hue histogram (HSV hue of display-encoded RGB, weighted by saturation: grey pixels have no hue).
+
+            Args:
+                nbBins (int, Optionnal): number of bins on [0,360[
+                subsample (bool, Optionnal): statistics computed on subsample
+
+            Returns:
+                (tuple): (weights (numpy.ndarray), edges (numpy.ndarray) in degrees)
+        """
+        def compute():
+            data = self.sample(subsample)
+            data = np.clip(colour.cctf_encoding(data, function='sRGB') if self.linear else data, 0.0, 1.0)
+            R, G, B = data[:,:,0], data[:,:,1], data[:,:,2]
+            maxC, minC = np.amax(data, axis=2), np.amin(data, axis=2)
+            delta = maxC - minC
+            safe = np.where(delta > 0, delta, 1.0)
+            hue = np.where(maxC == R, ((G-B)/safe) % 6.0, np.where(maxC == G, (B-R)/safe + 2.0, (R-G)/safe + 4.0))*60.0
+            saturation = np.where(maxC > 0, delta/np.where(maxC > 0, maxC, 1.0), 0.0)
+            return np.histogram(hue, np.linspace(0,360,nbBins+1), weights=saturation)
+        return self.__cached(('hueHistogram', nbBins, subsample), compute)
+
+    def minMax(self, subsample=False):
+        """returns (min, max) of linear luminance, min is the smallest non zero value.
+
+            Args:
+                subsample (bool, Optionnal): statistics computed on subsample
+
+            Returns:
+                (tuple): (float, float)
+        """
+        def compute():
+            Y = self.luminance('linear', subsample)
+            positive = Y[Y>0]
+            return (float(np.amin(positive)) if positive.size else 0.0, float(np.amax(Y)))
+        return self.__cached(('minMax', subsample), compute)
+
+    def percentiles(self, q, positive=False, subsample=True):
+        """returns percentiles of linear luminance.
+
+            Args:
+                q (float or tuple[float], Required): percentiles in [0,100]
+                positive (bool, Optionnal): zero values are ignored
+                subsample (bool, Optionnal): statistics computed on subsample
+
+            Returns:
+                (float or numpy.ndarray)
+        """
+        def compute():
+            Y = self.luminance('linear', subsample)
+            return np.percentile(Y[Y>0] if positive else Y, q)
+        return self.__cached(('percentiles', tuple(np.atleast_1d(q)), positive, subsample), compute)
+
+    def logLuminance(self):
+        """returns streaming log2 histogram of full image luminance (computed by strips, see LogHistogram).
+
+            Returns:
+                (hdrCore.statistics.LogHistogram)
+        """
+        return self.__cached(('logLuminance',), lambda: LogHistogram.fromColorData(self.colorData, self.linear))
+
+    def lab(self, subsample=True, maxPixels=None):
+        """returns Lab data (sRGB images are converted as in hdrCore.processing.ColorSpaceTransform, Lch images are
+        converted to Lab).
+
+            Args:
+                subsample (bool, Optionnal): statistics computed on subsample
+                maxPixels (int, Optionnal): number of pixels of subsample, None: ImageStatistics.maxPixels
+
+            Returns:
+                (numpy.ndarray): (height, width, 3), must not be modified
+        """
+        def compute():
+            data = self.sample(subsample, maxPixels)
+            if self.colorSpace == 'Lch':    return colour.LCHab_to_Lab(data)
+            elif self.colorSpace == 'Lab':  return data
+            else:                           return processing.sRGB_to_Lab(data, apply_cctf_decoding=not self.linear)
+        return self.__cached(('lab', subsample, maxPixels), compute)
+
+    def clusters(self, nbClusters):
+        """returns Lab colour clusters (k-means on clustering subsample, warm-started from last clustering of the image).
+
+            Args:
+                nbClusters (int, Required): number of clusters
+
+            Returns:
+                (numpy.ndarray): cluster centers (nbClusters, 3) in Lab, must not be modified
+        """
+        def compute():
+            pixels = self.lab(True, ImageStatistics.clusterPixels).reshape((-1,3))
+            key = (self.imageKey, nbClusters) if self.imageKey else None
+            with ImageStatistics.__lastCentersLock: previous = ImageStatistics.__lastCenters.get(key, None) if key else None
+            if previous is not None:    kmeans = sklearn.cluster.KMeans(n_clusters=nbClusters, init=previous, n_init=1)
+            else:                       kmeans = sklearn.cluster.KMeans(n_clusters=nbClusters, n_init=ImageStatistics.nbInit)
+            kmeans.fit(pixels)
+            centers = kmeans.cluster_centers_
+            if key:
+                with ImageStatistics.__lastCentersLock:
+                    ImageStatistics.__lastCenters[key] = centers
+                    ImageStatistics.__lastCenters.move_to_end(key)
+                    while len(ImageStatistics.__lastCenters) > ImageStatistics.maxLastCenters: ImageStatistics.__lastCenters.popitem(last=False)
+            return centers
+        return self.__cached(('clusters', nbClusters), compute)
+
+    def lch(self, subsample=True):
+        """returns Lch data (see lab).
+
+            Args:
+                subsample (bool, Optionnal): statistics computed on subsample
+
+            Returns:
+                (numpy.ndarray): (height, width, 3), must not be modified
+        """
+        def compute():
+            if self.colorSpace == 'Lch':    return self.sample(subsample)
+            else:                           return colour.Lab_to_LCHab(self.lab(subsample))
+        return self.__cached(('lch', subsample), compute)
+
+    def hueSegments(self, nbSegments, subsample=False, smoothing=5.0, coverage=(5.0, 95.0)):
+        """returns hue segmentation: peaks of chroma-weighted circular hue histogram (smoothed), segment boundaries are
+        the valleys between consecutive peaks. Lightness and chroma ranges of segments are percentiles of their pixels.
+        Linear in number of pixels: histograms only, no clustering.
+        When peaks are not separated by valleys (segment narrower than minHueWidth), boundaries split the histogram into
+        segments of equal chroma weight; segments are then widened to minHueWidth, ranges to minRangeWidth (checkSegments).
+
+            Args:
+                nbSegments (int, Required): number of segments
+                subsample (bool, Optionnal): statistics computed on subsample
+                smoothing (float, Optionnal): standard deviation (degrees) of histogram smoothing
+                coverage (tuple, Optionnal): percentiles of lightness and chroma ranges
+
+            Returns:
+                (list[dict]): segments sorted by hue {'hue': [min, max], 'chroma': [min, max], 'lightness': [min, max], 'peak': hue},
+                    first segment starts at 0, last one ends at 360
+        """
+        def compute():
+            LCH = self.lch(subsample).reshape((-1,3))
+            L, C, H = LCH[:,0], LCH[:,1], LCH[:,2] % 360.0
+            hueBin = np.intp(H) % 360
+
+            # chroma-weighted hue histogram (1 degree bins), circular gaussian smoothing
+            hist = np.bincount(hueBin, weights=C, minlength=360)
+            radius = int(3*smoothing)
+            kernel = np.exp(-0.5*(np.arange(-radius, radius+1)/smoothing)**2)
+            smooth = np.convolve(np.concatenate((hist[-radius:], hist, hist[:radius])), kernel/kernel.sum(), mode='valid')
+
+            # peaks (circular local maxima) by decreasing height, at least 2*smoothing degrees apart
+            isPeak = (smooth > np.roll(smooth, 1)) & (smooth >= np.roll(smooth, -1))
+            peaks = []
+            for p in sorted(np.nonzero(isPeak)[0], key=lambda i: -smooth[i]):
+                if len(peaks) == nbSegments: break
+                if all(min(abs(p-q), 360-abs(p-q)) >= 2*smoothing for q in peaks): peaks.append(int(p))
+            # not enough peaks: split largest hue gaps
+            while len(peaks) < nbSegments:
+                if not peaks: peaks = [0]; continue
+                ordered = sorted(peaks)
+                gaps = [((ordered[(i+1)%len(ordered)]-ordered[i]) % 360 or 360, ordered[i]) for i in range(len(ordered))]
+                gap, start = max(gaps)
+                peaks.append(int(start+gap//2) % 360)
+            peaks = sorted(peaks)
+
+            # boundaries: valleys between consecutive peaks
+            minWidth = min(ImageStatistics.minHueWidth, 360.0/nbSegments)
+            bounds = [p+int(np.argmin(smooth[p:q+1])) for p, q in zip(peaks[:-1], peaks[1:])]
+            if np.amin(np.diff([0]+bounds+[360])) < minWidth:
+                # no valley between peaks: segments of equal chroma weight
+                cumulative = np.cumsum(smooth)
+                bounds = [int(np.searchsorted(cumulative, k/nbSegments*cumulative[-1])) for k in range(1, nbSegments)]
+            # minimum width: bounds pushed forward then backward
+            for i in range(len(bounds)): bounds[i] = max(bounds[i], (bounds[i-1] if i > 0 else 0)+minWidth)
+            for i in reversed(range(len(bounds))): bounds[i] = min(bounds[i], (bounds[i+1] if i+1 < len(bounds) else 360.0)-minWidth)
+            hues = [0.0]+[float(b) for b in bounds]+[360.0]
+            # peak of each segment: highest bin of segment
+            starts, ends = [int(math.ceil(h)) for h in hues[:-1]], [int(math.ceil(h)) for h in hues[1:]]
+            peaks = [a+int(np.argmax(smooth[a:max(a+1, b)])) for a, b in zip(starts, ends)]
+            segment = np.searchsorted(np.asarray(bounds, dtype=np.float64), H, side='right')
+
+            # lightness and chroma histograms per segment (chromatic pixels)
+            chromatic = C > ImageStatistics.minChroma
+            segment, L, C = segment[chromatic], L[chromatic], C[chromatic]
+            def ranges(values):
+                counts = np.bincount(segment*101 + np.intp(np.clip(values, 0, 100)), minlength=nbSegments*101).reshape((nbSegments, 101))
+                cumulative = np.cumsum(counts, axis=1)
+                res = []
+                for s in range(nbSegments):
+                    total = cumulative[s,-1]
+                    if total == 0: res.append([0.0, 100.0]); continue
+                    lo = float(np.searchsorted(cumulative[s], coverage[0]/100.0*total))
+                    hi = min(100.0, float(np.searchsorted(cumulative[s], coverage[1]/100.0*total))+1.0)
+                    # minimum width: widened around center, kept in [0,100]
+                    missing = max(0.0, ImageStatistics.minRangeWidth - (hi - lo))
+                    lo, hi = lo - missing/2, hi + missing/2
+                    if lo < 0.0:    lo, hi = 0.0, hi - lo
+                    if hi > 100.0:  lo, hi = max(0.0, lo - (hi - 100.0)), 100.0
+                    res.append([lo, hi])
+                return res
+            lightness, chroma = ranges(L), ranges(C)
+
+            res = [{'hue': [hues[s], hues[s+1]], 'chroma': chroma[s], 'lightness': lightness[s], 'peak': float(peaks[s])} for s in range(nbSegments)]
+            if not ImageStatistics.checkSegments(res, minWidth):
+                trace.warning('PROCESS', "ImageStatistics.hueSegments(",nbSegments,"): degenerate segments", res)
+            return res
+        return self.__cached(('hueSegments', nbSegments, subsample, smoothing, tuple(coverage)), compute)
+
+    @staticmethod
+    def checkSegments(segments, minHueWidth=None):
+        """returns True if hue segments (see hueSegments) cover the hue circle (contiguous, from 0 to 360), each segment
+        is at least minHueWidth degrees wide and its lightness and chroma ranges at least minRangeWidth wide.
+
+            Args:
+                segments (list[dict], Required): hue segments
+                minHueWidth (float, Optionnal): minimum hue width, None: ImageStatistics.minHueWidth (at most 360/number of segments)
+
+            Returns:
+                (bool)
+        """
+        if not segments: return False
+        if minHueWidth == None: minHueWidth = min(ImageStatistics.minHueWidth, 360.0/len(segments))
+        eps = 1e-6
+        if (segments[0]['hue'][0] != 0.0) or (segments[-1]['hue'][1] != 360.0): return False
+        for s, segment in enumerate(segments):
+            (h0, h1), (c0, c1), (l0, l1) = segment['hue'], segment['chroma'], segment['lightness']
+            if (s > 0) and (h0 != segments[s-1]['hue'][1]): return False
+            if h1 - h0 < minHueWidth - eps: return False
+            if (c1 - c0 < ImageStatistics.minRangeWidth - eps) or (l1 - l0 < ImageStatistics.minRangeWidth - eps): return False
+            if not (0.0 <= c0 and c1 <= 100.0 and 0.0 <= l0 and l1 <= 100.0): return False
+        return True
+# -----------------------------------------------------------------------------
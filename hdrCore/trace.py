@@ -0,0 +1,204 @@
+# uHDR: HDR image editing software
+#   Copyright (C) 2021  remi cozot
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+# hdrCore project 2020
+# author: remi.cozot@univ-littoral.fr
+
+# -----------------------------------------------------------------------------
+# --- Package hdrCore ---------------------------------------------------------
+# -----------------------------------------------------------------------------
+"""
+tracing: leveled and categorized trace records in place of verbose prints.
+    - a record is (time, thread, level, category, message), the message is built from arguments as print does,
+    - formatting is lazy: arguments are converted to string only when the record is emitted, callable arguments are
+      called at that time (costly arguments: lambda: processPipe.toDict()),
+    - a disabled record costs a function call and a comparison (threshold of level of output and buffer),
+    - optional ring buffer of last records (even the ones that are not written) dumped post-mortem (uncaught exception)
+      or on demand.
+
+usage:
+    from hdrCore import trace
+    trace.configure(level=trace.DEBUG, categories=['PROCESS','THREAD'], bufferSize=2048)
+    trace.debug('PROCESS', "ProcessPipe.compute(", img.name, ")")
+    trace.debug('MODEL', "setProcessPipe(", lambda: processPipe.toDict(), ")")     # toDict() called only if emitted
+    trace.installPostMortem()                                                       # dump buffer on uncaught exception
+
+categories (tags of messages): 'CONTROL', 'CB' (GUI callbacks), 'MODEL', 'VIEW', 'EVENT', 'THREAD', 'PROCESS', 'CORE', 'META',
+    'EXECUTOR', 'BATCH', 'CACHE', 'PREF', 'PROFILING', 'LAZY', 'TRACE'
+
+"""
+
+# -----------------------------------------------------------------------------
+# --- Import ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+import sys, threading, collections
+from timeit import default_timer as timer
+
+# -----------------------------------------------------------------------------
+# --- levels ------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+DEBUG =     10
+INFO =      20
+WARNING =   30
+ERROR =     40
+NONE =      100     # nothing recorded
+
+levelNames = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+
+# -----------------------------------------------------------------------------
+# --- configuration -----------------------------------------------------------
+# -----------------------------------------------------------------------------
+level =         WARNING         # minimum level of written records
+categories =    None            # written categories (set[str]), None: all
+output =        sys.stdout      # file where records are written, None: records are not written
+bufferLevel =   DEBUG           # minimum level of buffered records
+buffer =        None            # ring buffer of last records (collections.deque), None: no buffer
+
+__threshold =   WARNING         # min(level, bufferLevel if buffer): records below are discarded at once
+__origin =      timer()
+__lock =        threading.Lock()
+
+def configure(level=None, categories=None, output=None, bufferSize=None, bufferLevel=None):
+    """configure tracing, arguments left to None are not changed.
+
+        Args:
+            level (int, Optionnal): minimum level of written records (DEBUG, INFO, WARNING, ERROR, NONE)
+            categories (list[str], Optionnal): written categories, [] or ['*']: all categories
+            output (file, Optionnal): file where records are written
+            bufferSize (int, Optionnal): number of records of ring buffer, 0: no buffer
+            bufferLevel (int, Optionnal): minimum level of buffered records
+    """
+    global __threshold, buffer
+    module = sys.modules[__name__]
+    with __lock:
+        if level != None:           module.level = level
+        if categories != None:      module.categories = set(categories) if (categories and ('*' not in categories)) else None
+        if output != None:          module.output = output
+        if bufferLevel != None:     module.bufferLevel = bufferLevel
+        if bufferSize != None:      buffer = collections.deque(list(buffer) if buffer else [], maxlen=bufferSize) if bufferSize > 0 else None
+        __threshold = min(module.level, module.bufferLevel) if buffer != None else module.level
+
+def settings():
+    """returns configuration (except output) as keyword arguments of configure: configuration of worker processes.
+
+        Returns:
+            (dict)
+    """
+    return {'level': level, 'categories': sorted(categories) if categories else [], 'bufferLevel': bufferLevel,
+            'bufferSize': buffer.maxlen if buffer != None else 0}
+
+def isEnabled(level_, category):
+    """returns True if a record of level and category would be written or buffered: guard of costly trace code.
+
+        Args:
+            level_ (int, Required): level of record
+            category (str, Required): category of record
+
+        Returns:
+            (bool)
+    """
+    if level_ < __threshold: return False
+    return (buffer != None and level_ >= bufferLevel) or (level_ >= level and (categories == None or category in categories))
+
+# -----------------------------------------------------------------------------
+# --- records -----------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def message(args):
+    """returns message of record: arguments converted to string (callable ones are called) and separated by space.
+
+        Args:
+            args (tuple, Required): arguments of record
+
+        Returns:
+            (str)
+    """
+    return ' '.join([str(a() if callable(a) else a) for a in args])
+
+def record(level_, category, *args):
+    """write and/or buffer a record (formatted at most once).
+
+        Args:
+            level_ (int, Required): level of record
+            category (str, Required): category of record
+            args: message arguments (as print)
+    """
+    if level_ < __threshold: return
+    written = output != None and level_ >= level and (categories == None or category in categories)
+    buffered = buffer != None and level_ >= bufferLevel
+    if not (written or buffered): return
+
+    text = message(args)
+    if buffered: buffer.append((timer() - __origin, threading.current_thread().name, level_, category, text))
+    if written:
+        prefix = " ["+category+"]" if level_ < WARNING else " ["+category+"]["+levelNames.get(level_, str(level_))+"]"
+        print(prefix+" >> "+text, file=output, flush=level_ >= WARNING)
+
+def debug(category, *args):
+    """record function call, parameters (see record)."""
+    if DEBUG < __threshold: return
+    record(DEBUG, category, *args)
+
+def info(category, *args):
+    """record noticeable event: timings, end of background work (see record)."""
+    if INFO < __threshold: return
+    record(INFO, category, *args)
+
+def warning(category, *args):
+    """record unexpected but handled event (see record)."""
+    record(WARNING, category, *args)
+
+def error(category, *args):
+    """record failure (see record)."""
+    record(ERROR, category, *args)
+
+# -----------------------------------------------------------------------------
+# --- post-mortem -------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def dump(file=None):
+    """write buffered records (oldest first): time (second since start), thread, level, category and message.
+
+        Args:
+            file (file, Optionnal): output, standard error if None
+    """
+    out = file if file else sys.stderr
+    records = list(buffer) if buffer != None else []
+    print("uHDR trace: last "+str(len(records))+" records", file=out)
+    for t, thread, level_, category, text in records:
+        print(f"{t:12.6f} {thread:<24} {levelNames.get(level_, str(level_)):<8} [{category}] {text}", file=out)
+    out.flush()
+
+def installPostMortem(filename=None):
+    """dump buffered records when an exception is not caught (main thread or other threads), then call previous hooks.
+
+        Args:
+            filename (str, Optionnal): dump file (appended), standard error if None
+    """
+    def postMortem():
+        if filename:
+            with open(filename, 'a') as f: dump(f)
+        else: dump()
+
+    previousHook = sys.excepthook
+    def excepthook(type_, value, traceback):
+        error('TRACE', "uncaught exception:", repr(value))
+        postMortem()
+        previousHook(type_, value, traceback)
+    sys.excepthook = excepthook
+
+    previousThreadHook = threading.excepthook
+    def threadExcepthook(args):
+        error('TRACE', "uncaught exception in thread", args.thread.name if args.thread else '?', ":", repr(args.exc_value))
+        postMortem()
+        previousThreadHook(args)
+    threading.excepthook = threadExcepthook
+# -----------------------------------------------------------------------------
@@ -28,15 +28,16 @@ package preferences contains all global variables that stup the preferences.
 # RCZT 2023
 # import numba, json, os, copy
 import numpy as np, json, os
+from hdrCore import trace
 
 # -----------------------------------------------------------------------------
 # --- Preferences -------------------------------------------------------------
 # -----------------------------------------------------------------------------
 target = ['python','numba','cuda']
 computation = target[0]
-# verbose mode: print function call 
-#   usefull for debug
-verbose = True
+# verbose mode: trace function calls (see hdrCore.trace, setVerbose)
+#   usefull for debug, off by default: traces are on hot paths (slider changes)
+verbose = False
 # list of HDR display takien into account
 #   red from prefs.json file
 #   display info:
@@ -79,31 +80,52 @@ def savePref():
             "HDRdisplay"  : HDRdisplay,
             "imagePath"   : imagePath
         }
-    if verbose: print(" [PREF] >> savePref(",pUpdate,")")
+    trace.debug('PREF', "savePref(",pUpdate,")")
     with open('./preferences/prefs.json', "w") as f: json.dump(pUpdate,f)
 # -----------------------------------------------------------------------------
 # -----------------------------------------------------------------------------
 # loading pref
 # -----------------------------------------------------------------------------
 # -----------------------------------------------------------------------------
-print("uHDRv6: loading preferences")
-p = loadPref()
-if p :
-    HDRdisplays = p["HDRdisplays"]
-    HDRdisplay = p["HDRdisplay"]
-    imagePath = p["imagePath"]
-else:
-    HDRdisplays = {
-        'none' :                {'shape':(2160,3840), 'scaling':1,   'post':'',                          'tag': "none"},
-        'vesaDisplayHDR1000' :  {'shape':(2160,3840), 'scaling':12,  'post':'_vesa_DISPLAY_HDR_1000',    'tag':'vesaDisplayHDR1000'},
-        'vesaDisplayHDR400' :   {'shape':(2160,3840), 'scaling':4.8, 'post':'_vesa_DISPLAY_HDR_400',     'tag':'vesaDisplayHDR400'},
-        'HLG1' :                {'shape':(2160,3840), 'scaling':1,   'post':'_HLG_1',                    'tag':'HLG1'}
-        }
-    # current display
-    HDRdisplay = 'vesaDisplayHDR1000'
-    imagePath = '.'
-print(f"       target display: {HDRdisplay}")
-print(f"       image path: {imagePath}")
+def load():
+    """set preferences from prefs.json (default values if it is empty): called once at import.
+
+            Args:
+
+            Returns:
+    """
+    global HDRdisplays
+    global HDRdisplay
+    global imagePath
+    p = loadPref()
+    if p :
+        HDRdisplays = p["HDRdisplays"]
+        HDRdisplay = p["HDRdisplay"]
+        imagePath = p["imagePath"]
+    else:
+        HDRdisplays = {
+            'none' :                {'shape':(2160,3840), 'scaling':1,   'post':'',                          'tag': "none"},
+            'vesaDisplayHDR1000' :  {'shape':(2160,3840), 'scaling':12,  'post':'_vesa_DISPLAY_HDR_1000',    'tag':'vesaDisplayHDR1000'},
+            'vesaDisplayHDR400' :   {'shape':(2160,3840), 'scaling':4.8, 'post':'_vesa_DISPLAY_HDR_400',     'tag':'vesaDisplayHDR400'},
+            'HLG1' :                {'shape':(2160,3840), 'scaling':1,   'post':'_HLG_1',                    'tag':'HLG1'}
+            }
+        # current display
+        HDRdisplay = 'vesaDisplayHDR1000'
+        imagePath = '.'
+    trace.debug('PREF', "load(): target display:",HDRdisplay,", image path:",imagePath)
+# -----------------------------------------------------------------------------
+def setVerbose(on):
+    """set verbose mode: function calls are traced (level DEBUG) when on, only warnings and errors otherwise.
+
+            Args:
+                on (bool, Required): verbose mode
+    """
+    global verbose
+    verbose = on
+    trace.configure(level=trace.DEBUG if on else trace.WARNING)
+# -----------------------------------------------------------------------------
+setVerbose(verbose)
+load()
 # -----------------------------------------------------------------------------
 # --- Functions computation ---------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -159,7 +181,7 @@ def getImagePath(): return imagePath if os.path.isdir(imagePath) else '.'
 def setImagePath(path): 
     global imagePath
     imagePath = path
-    if verbose: print(" [PREF] >> setImagePath(",path,"):",imagePath)
+    trace.debug('PREF', "setImagePath(",path,"):",imagePath)
     savePref()
 # ----------------------------------------------------------------------------
              
\ No newline at end of file
@@ -5,23 +5,72 @@
 
 
 """Only contains main program.
+
+usage:
+    python uHDR.py
+    python uHDR.py --profile-startup        (prints import and initialization time per module when window is shown)
+    python uHDR.py --verbose                (traces function calls, see hdrCore.trace)
+    python uHDR.py --post-mortem            (keeps last trace records, dumped on uncaught exception)
 """
 
+import sys
+from multiprocessing import freeze_support
+import hdrCore.lazy, hdrCore.trace
 
-from PyQt5.QtCore import Qt
+# startup profiler started before any heavy import
+profiler = hdrCore.lazy.StartupProfiler() if '--profile-startup' in sys.argv else None
+if profiler: profiler.start()
+
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtWidgets import QApplication, QDesktopWidget
-import guiQt.controller
-from multiprocessing import freeze_support
+import guiQt.controller, guiQt.thread
 
-import sys
+if profiler: profiler.mark('imports')
+# ------------------------------------------------------------------------------------------
+def warmUpTasks():
+    """returns background warm-up tasks: JIT compilation of kernels of computation mode (hdrCore.numbafun) and loading of
+    auto tone curve network (hdrCore.net)."""
+    import preferences.preferences as pref
+    tasks = [('auto tone curve network', lambda: guiQt.controller.net.autoCurveNet())]
+    if pref.computation != 'python':
+        tasks.insert(0, (pref.computation+' kernels', lambda: hdrCore.processing.numbafun.warmUp(pref.computation)))
+    return tasks
+# ------------------------------------------------------------------------------------------
+def windowShown():
+    """called by the event loop once the main window is shown: profiling report, then background warm-up (lazy modules,
+    kernels, network), status bar shows when application is hot."""
+    if profiler:
+        profiler.mark('window shown (first event loop iteration)')
+        profiler.stop()
+        profiler.report()
+
+    def warmedUp(times):
+        # called from warm-up thread: status bar is updated in GUI thread
+        failed = [n for n, t in times.items() if t == None]
+        message = "uHDR ready"+(" (warm-up failed: "+", ".join(failed)+")" if failed else "")
+        guiQt.thread.invokeInGui(lambda: mcQt.view.statusBar().showMessage(message, 5000))
+        if profiler:
+            print("uHDR warm-up (background):", ", ".join([f"{n}: {t:.3f}s" if t != None else f"{n}: failed" for n, t in times.items()]), flush=True)
+    hdrCore.lazy.warmUp(callback=warmedUp, tasks=warmUpTasks())
 # ------------------------------------------------------------------------------------------
 if __name__ == '__main__':
     freeze_support()
     print("uHDRv6 (C++ core)")
 
-    app = QApplication(sys.argv)
+    import preferences.preferences as pref
+    if '--verbose' in sys.argv: pref.setVerbose(True)
+    if '--post-mortem' in sys.argv:
+        hdrCore.trace.configure(bufferSize=4096, bufferLevel=hdrCore.trace.DEBUG)
+        hdrCore.trace.installPostMortem()
+
+    if profiler:
+        with profiler.phase('QApplication'): app = QApplication([a for a in sys.argv if a != '--profile-startup'])
+        with profiler.phase('AppController (main window)'): mcQt = guiQt.controller.AppController(app)
+    else:
+        app = QApplication(sys.argv)
+        mcQt = guiQt.controller.AppController(app)
 
-    mcQt = guiQt.controller.AppController(app)
+    QTimer.singleShot(0, windowShown)
 
     sys.exit(app.exec_())
 # ------------------------------------------------------------------------------------------